@@ -0,0 +1,180 @@
+"""
+Arény načítané z data/arenas/*.json a zkompilované do plochých polí - O(1) dotazy na pasti,
+spawny a obsazenost buněk. Každá mapa se validuje a kompiluje jen jednou, místnosti sdílejí
+stejný neměnný objekt.
+"""
+import json
+import os
+from array import array
+from typing import Dict, List, NamedTuple, Tuple
+
+ARENAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "arenas")
+NO_OWNER = -1
+
+class TrapDef(NamedTuple):
+    """Statická definice pasti - sdílená všemi zápasy na dané mapě"""
+    id: str
+    type: str
+    damage: int
+    weight: float
+    min_active: int
+    max_active: int
+    zone: Tuple[Tuple[int, int], ...]
+
+class ArenaLayout:
+    """Neměnná aréna; buňka má index y * cols + x"""
+    def __init__(self, name: str, cols: int, rows: int, background: str, traps: Tuple[TrapDef, ...],
+                 spawn_zones: Tuple[Tuple[Tuple[int, int], ...], ...], spawn_positions: Tuple[Tuple[int, int], ...]):
+        self.name = name
+        self.cols = cols
+        self.rows = rows
+        self.size = cols * rows
+        self.background = background
+        self.traps = traps
+        self.spawn_positions = spawn_positions
+        # cell -> (x, y), players store only the cell index
+        self.coords = tuple((x, y) for y in range(rows) for x in range(cols))
+        # cell -> bitmask of trap indices covering the cell
+        cell_traps = [0] * self.size
+        for i, trap in enumerate(traps):
+            for x, y in trap.zone:
+                cell_traps[self.cell(x, y)] |= 1 << i
+        self.cell_traps = tuple(cell_traps)
+        # cell -> cells of its 8-neighbourhood inside the grid (movement graph)
+        self.neighbours = tuple(
+            tuple(
+                self.cell(nx, ny)
+                for ny in (y - 1, y, y + 1) for nx in (x - 1, x, x + 1)
+                if (nx, ny) != (x, y) and self.in_bounds(nx, ny)
+            )
+            for y in range(rows) for x in range(cols)
+        )
+        # cell -> index of the player whose spawn zone contains the cell
+        self.spawn_owner = array("b", [NO_OWNER] * self.size)
+        for owner, zone in enumerate(spawn_zones):
+            for x, y in zone:
+                self.spawn_owner[self.cell(x, y)] = owner
+        # Wire form of the static data, sent once per match with the full snapshot
+        self.wire = {
+            "name": name,
+            "cols": cols,
+            "rows": rows,
+            "background": background
+        }
+        self.trap_defs = {
+            trap.id: {"type": trap.type, "damage": trap.damage, "zone": [list(cell) for cell in trap.zone]}
+            for trap in traps
+        }
+
+    def cell(self, x: int, y: int) -> int:
+        return y * self.cols + x
+
+    def pos(self, cell: int) -> Dict:
+        """Drátový tvar pozice {"x", "y"}"""
+        x, y = self.coords[cell]
+        return {"x": x, "y": y}
+
+    def distance(self, a: int, b: int) -> int:
+        """Manhattanská vzdálenost dvou buněk"""
+        ax, ay = self.coords[a]
+        bx, by = self.coords[b]
+        return abs(ax - bx) + abs(ay - by)
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.cols and 0 <= y < self.rows
+
+    def new_occupancy(self) -> bytearray:
+        """Obsazenost buněk pro jeden zápas - 0 volno, 1 stojí tam hráč"""
+        return bytearray(self.size)
+
+class ArenaError(ValueError):
+    """Neplatná definice arény"""
+
+def parse_zone(spec: Dict, cols: int, rows: int, what: str) -> Tuple[Tuple[int, int], ...]:
+    """Zóna jako {"rect": [x1, y1, x2, y2]} (včetně krajů) nebo {"cells": [[x, y], ...]}"""
+    if "rect" in spec:
+        x1, y1, x2, y2 = spec["rect"]
+        if x1 > x2 or y1 > y2:
+            raise ArenaError(f"{what}: prázdný obdélník {spec['rect']}")
+        cells = [(x, y) for x in range(x1, x2 + 1) for y in range(y1, y2 + 1)]
+    elif "cells" in spec:
+        cells = [tuple(cell) for cell in spec["cells"]]
+    else:
+        raise ArenaError(f"{what}: zóna musí mít 'rect' nebo 'cells'")
+    for x, y in cells:
+        if type(x) is not int or type(y) is not int or not (0 <= x < cols and 0 <= y < rows):
+            raise ArenaError(f"{what}: buňka {(x, y)} je mimo grid {cols}x{rows}")
+    if len(set(cells)) != len(cells):
+        raise ArenaError(f"{what}: zóna obsahuje duplicitní buňky")
+    return tuple(cells)
+
+def compile_layout(data: Dict) -> ArenaLayout:
+    """Zvaliduje definici arény a zkompiluje ji"""
+    name = data.get("name", "?")
+    cols, rows = data.get("cols"), data.get("rows")
+    if type(cols) is not int or type(rows) is not int or cols <= 0 or rows <= 0:
+        raise ArenaError(f"{name}: cols a rows musí být kladná celá čísla")
+
+    spawns = data.get("spawns", [])
+    if len(spawns) != 2:
+        raise ArenaError(f"{name}: aréna musí mít přesně 2 spawny")
+    spawn_zones, spawn_positions = [], []
+    for i, spawn in enumerate(spawns):
+        zone = parse_zone(spawn.get("zone", {}), cols, rows, f"{name} spawn {i}")
+        start = tuple(spawn.get("start", ()))
+        if start not in zone:
+            raise ArenaError(f"{name} spawn {i}: start {start} není ve spawn zóně")
+        spawn_zones.append(zone)
+        spawn_positions.append(start)
+    if spawn_positions[0] == spawn_positions[1]:
+        raise ArenaError(f"{name}: oba spawny mají stejnou startovní pozici")
+
+    traps = []
+    for trap in data.get("traps", []):
+        trap_id = trap.get("id")
+        what = f"{name} {trap_id}"
+        if not trap_id or any(t.id == trap_id for t in traps):
+            raise ArenaError(f"{what}: chybějící nebo duplicitní id pasti")
+        if not trap.get("damage", 0) > 0 or not 0 <= trap.get("weight", -1) <= 1:
+            raise ArenaError(f"{what}: damage musí být > 0 a weight v rozsahu 0-1")
+        if not 1 <= trap.get("min_active", 0) <= trap.get("max_active", 0):
+            raise ArenaError(f"{what}: musí platit 1 <= min_active <= max_active")
+        traps.append(TrapDef(
+            id=trap_id,
+            type=trap.get("type", "trap"),
+            damage=trap["damage"],
+            weight=trap["weight"],
+            min_active=trap["min_active"],
+            max_active=trap["max_active"],
+            zone=parse_zone(trap.get("zone", {}), cols, rows, what)
+        ))
+
+    return ArenaLayout(
+        name=name,
+        cols=cols,
+        rows=rows,
+        background=data.get("background", "/static/arena/arena.svg"),
+        traps=tuple(traps),
+        spawn_zones=tuple(spawn_zones),
+        spawn_positions=tuple(spawn_positions)
+    )
+
+_layouts: Dict[str, ArenaLayout] = {}
+
+def load_layout(name: str = "default") -> ArenaLayout:
+    """Vrátí zkompilovanou arénu; soubor se načte a zvaliduje jen při prvním použití"""
+    layout = _layouts.get(name)
+    if layout is None:
+        path = os.path.join(ARENAS_DIR, os.path.basename(name) + ".json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                layout = compile_layout(json.load(f))
+        except FileNotFoundError:
+            # Typo in ARENA_MAP - fail at startup with the names that would work
+            raise ArenaError(f"Neznámá aréna {name!r}, dostupné: {', '.join(available_layouts())}") from None
+        _layouts[name] = layout
+    return layout
+
+def available_layouts() -> List[str]:
+    """Názvy map v data/arenas (bez přípony .json)"""
+    return sorted(f[:-5] for f in os.listdir(ARENAS_DIR) if f.endswith(".json"))
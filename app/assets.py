@@ -0,0 +1,247 @@
+"""
+Statické soubory - z /app/static se sestaví build adresář: kopie s otiskem obsahu v názvu,
+předkomprimované varianty (gzip, brotli) a sprite atlas ikon robotů (Pillow).
+Soubory s otiskem se posílají s neměnnou cache, ostatní se revalidují přes ETag.
+
+Sestavení běží při startu serveru (nezměněné zdroje se jen načtou z manifestu),
+v image předem: python assets.py
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+import brotli
+from PIL import Image
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = "/app/static"
+URL_PREFIX = "/static/"
+BUILD_VERSION = 2  # Bump when the build output changes for the same sources
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".ico", ".html", ".txt"}
+SPRITE_DIR = "images/robots"  # <robot_id>.png icons packed into one atlas
+SPRITE_COLUMNS = 4
+IMMUTABLE = "public, max-age=31536000, immutable"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # Preference order
+CSS_URL = re.compile(r"""url\((['"]?)/static/([^'")?#]+)\1\)""")
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=5).hexdigest()
+
+def fingerprint(path: str, digest: str) -> str:
+    """css/style.css -> css/style.<otisk>.css"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+def build_atlas(images: Dict[str, bytes], size: int = settings.SPRITE_SIZE) -> Tuple[bytes, int, Dict[str, List[int]]]:
+    """Sbalí ikony do mřížky SPRITE_COLUMNS sloupců; vrací PNG, velikost buňky a pozice [x, y] podle názvu"""
+    icons = {}
+    for name, data in sorted(images.items()):
+        with Image.open(io.BytesIO(data)) as image:
+            icon = image.convert("RGBA")
+        # Pillow resamples RGBA premultiplied, so transparent edges do not darken
+        icon.thumbnail((size, size), Image.LANCZOS)
+        icons[name] = icon
+    cell = max(max(icon.size) for icon in icons.values())
+    columns = min(SPRITE_COLUMNS, len(icons))
+    atlas = Image.new("RGBA", (columns * cell, -(-len(icons) // columns) * cell), (0, 0, 0, 0))
+    cells = {}
+    for index, (name, icon) in enumerate(icons.items()):
+        x, y = (index % columns) * cell, (index // columns) * cell
+        # Centred in its cell
+        atlas.paste(icon, (x + (cell - icon.width) // 2, y + (cell - icon.height) // 2))
+        cells[name] = [x, y]
+    out = io.BytesIO()
+    atlas.save(out, "PNG", optimize=True)
+    return out.getvalue(), cell, cells
+
+def compress(data: bytes) -> Dict[str, bytes]:
+    """Předkomprimované varianty, které se vyplatí (aspoň o 10 % menší)"""
+    variants = {"gzip": gzip.compress(data, 9, mtime=0), "br": brotli.compress(data, quality=11)}
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data) * 0.9}
+
+def write_file(path: str, data: bytes):
+    """Atomický zápis - workery clusteru mohou sestavovat současně"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+        f.write(data)
+    os.replace(temp, path)
+
+class AssetPipeline:
+    """Build adresář se statickými soubory a manifest zdrojová cesta -> cesta s otiskem"""
+    def __init__(self, source: str = STATIC_DIR, target: str = settings.ASSET_BUILD_DIR):
+        self.source = source
+        self.target = target
+        self.files: Dict[str, str] = {}  # css/style.css -> css/style.<hash>.css
+        self.assets: Dict[str, Dict] = {}  # fingerprinted path -> {"hash": ..., "encodings": [...]}
+        self.sprites: Optional[Dict] = None  # {"url", "size", "cells": {robot_id: [x, y]}}
+
+    def scan(self) -> Dict[str, bytes]:
+        sources = {}
+        for root, dirs, names in os.walk(self.source, followlinks=True):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(names):
+                if not name.startswith("."):
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f:
+                        sources[os.path.relpath(path, self.source).replace(os.sep, "/")] = f.read()
+        return sources
+
+    def build(self) -> bool:
+        """Sestaví build adresář, pokud se zdroje od minula změnily; vrací True, když sestavoval"""
+        try:
+            sources = self.scan()
+            digest = hashlib.blake2b(f"{BUILD_VERSION}:{settings.SPRITE_SIZE}".encode())
+            for path, data in sources.items():
+                digest.update(f"{path}:{content_hash(data)}\n".encode())
+            source_digest = digest.hexdigest()
+            manifest_path = os.path.join(self.target, "manifest.json")
+            try:
+                with open(manifest_path) as f:
+                    manifest = json.load(f)
+                if manifest.get("source") == source_digest:
+                    self.load(manifest)
+                    return False
+            except (OSError, ValueError):
+                pass
+            manifest = self.compile(sources)
+            manifest["source"] = source_digest
+            self.prune()
+            write_file(manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode())
+            logger.info("Statické soubory sestaveny do %s (%d souborů)", self.target, len(self.assets))
+            return True
+        except OSError:
+            # Unwritable build dir - plain files from the source directory still work
+            logger.exception("Sestavení statických souborů selhalo")
+            self.load({})
+            return False
+
+    def compile(self, sources: Dict[str, bytes]) -> Dict:
+        self.files, self.assets, self.sprites = {}, {}, None
+        # Stylesheets last - their url() references point at the fingerprinted files
+        for path in sorted(sources, key=lambda path: (path.endswith(".css"), path)):
+            data = sources[path]
+            if path.endswith(".css"):
+                data = CSS_URL.sub(lambda m: f"url({m.group(1)}{self.url(m.group(2))}{m.group(1)})", data.decode()).encode()
+            self.files[path] = self.emit(path, data)
+        icons = {
+            os.path.splitext(os.path.basename(path))[0]: data for path, data in sources.items()
+            if os.path.dirname(path) == SPRITE_DIR and path.endswith(".png")
+        }
+        if icons:
+            try:
+                atlas, size, cells = build_atlas(icons)
+                self.sprites = {"url": self.emit(SPRITE_DIR + ".png", atlas), "size": size, "cells": cells}
+            except (OSError, ValueError):
+                # Unreadable icon - robots are then loaded one by one
+                logger.exception("Sprite atlas robotů nešel sestavit")
+        return {"version": BUILD_VERSION, "files": self.files, "assets": self.assets, "sprites": self.sprites}
+
+    def emit(self, path: str, data: bytes) -> str:
+        """Zapíše soubor pod názvem s otiskem a jeho komprimované varianty"""
+        digest = content_hash(data)
+        name = fingerprint(path, digest)
+        variants = compress(data) if os.path.splitext(path)[1] in COMPRESSIBLE else {}
+        target = os.path.join(self.target, name)
+        if not os.path.exists(target):
+            write_file(target, data)
+        for encoding, suffix in ENCODINGS:
+            # Checked one by one - an earlier build may have lacked an encoding
+            if encoding in variants and not os.path.exists(target + suffix):
+                write_file(target + suffix, variants[encoding])
+        self.assets[name] = {"hash": digest, "encodings": [encoding for encoding, _ in ENCODINGS if encoding in variants]}
+        return name
+
+    def prune(self):
+        """Smaže výstupy předchozích sestavení"""
+        keep = {os.path.join(self.target, "manifest.json")}
+        for name, info in self.assets.items():
+            keep.add(os.path.join(self.target, name))
+            keep.update(os.path.join(self.target, name) + suffix for encoding, suffix in ENCODINGS if encoding in info["encodings"])
+        for root, _, names in os.walk(self.target):
+            for name in names:
+                path = os.path.join(root, name)
+                if path not in keep and not name.endswith(".tmp"):
+                    os.remove(path)
+
+    def load(self, manifest: Dict):
+        self.files = manifest.get("files", {})
+        self.assets = manifest.get("assets", {})
+        self.sprites = manifest.get("sprites")
+
+    def url(self, path: str) -> str:
+        """URL souboru ze static/ - s otiskem, pokud je sestavený"""
+        return URL_PREFIX + self.files.get(path, path)
+
+    def client_manifest(self) -> Dict:
+        """Manifest pro klienta (window.ASSETS) - cesty, které skládá JavaScript, a atlas robotů"""
+        sprites = None
+        if self.sprites is not None:
+            sprites = dict(self.sprites, url=URL_PREFIX + self.sprites["url"])
+        return {"files": {URL_PREFIX + path: URL_PREFIX + name for path, name in self.files.items()}, "sprites": sprites}
+
+def accepted_encodings(scope: Scope) -> set:
+    header = Headers(scope=scope).get("accept-encoding", "")
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        quality = params.strip()
+        try:
+            weight = float(quality[2:]) if quality.startswith("q=") else 1.0
+        except ValueError:
+            weight = 1.0
+        if weight > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+class AssetFiles(StaticFiles):
+    """/static - soubory s otiskem neměnně cachované a předkomprimované, ostatní ze zdrojového adresáře s ETagem"""
+    def __init__(self, pipeline: AssetPipeline):
+        super().__init__(directory=pipeline.target, check_dir=False)
+        self.pipeline = pipeline
+        # Original names are still served (stale pages, version.json) - from the source directory
+        self.all_directories = [pipeline.target, pipeline.source]
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        info = self.pipeline.assets.get(path.replace(os.sep, "/"))
+        if info is None or scope["method"] not in ("GET", "HEAD"):
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("cache-control", "no-cache")
+            return response
+        accepted = accepted_encodings(scope)
+        encoding = next((encoding for encoding in info["encodings"] if encoding in accepted), None)
+        suffix = dict(ENCODINGS)[encoding] if encoding else ""
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+        if stat_result is None:
+            raise HTTPException(status_code=404)
+        headers = {"cache-control": IMMUTABLE, "etag": f'"{info["hash"]}{"-" + encoding if encoding else ""}"'}
+        if info["encodings"]:
+            headers["vary"] = "Accept-Encoding"
+        if encoding:
+            headers["content-encoding"] = encoding
+        response = FileResponse(
+            full_path, stat_result=stat_result, method=scope["method"], headers=headers,
+            media_type=mimetypes.guess_type(path)[0] or "application/octet-stream"
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    AssetPipeline().build()
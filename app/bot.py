@@ -0,0 +1,187 @@
+"""
+AI soupeř - Monte Carlo prohledávání celého tahu: UCB1 vybírá mezi kandidátními plány tahu
+(cesta na dosažitelnou buňku + útoky), každý plán se hodnotí rollouty skriptovanou strategií.
+Náhoda pastí se v rolloutech losuje znovu, bot tedy nevyužívá rng_seed zápasu.
+Hledání běží v procesech ProcessPoolExecutor, event loop serveru neblokuje.
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import engine
+import settings
+from arena import load_layout
+from engine import CATALOG
+from policy import greedy_action
+
+logger = logging.getLogger(__name__)
+
+class SearchBudget(NamedTuple):
+    time_limit: float  # seconds per decision
+    iterations: int  # rollouts per decision
+    depth: int  # whole turns simulated after the candidate plan
+
+# Difficulty -> search budget (whichever limit comes first)
+LEVELS = {
+    "easy": SearchBudget(0.05, 40, 1),
+    "normal": SearchBudget(0.25, 400, 4),
+    "hard": SearchBudget(1.0, 2000, 8)
+}
+DEFAULT_LEVEL = "normal"
+
+EXPLORATION = 0.7  # UCB1 exploration constant (values are in [-1, 1])
+
+def path_to(state: engine.GameState, costs: Dict[int, int], target: int) -> List[int]:
+    """Buňky cesty do cíle podle cen z reachable_cells (bez výchozí buňky)"""
+    neighbours = state.layout.neighbours
+    path = [target]
+    cell = target
+    while costs[cell] > 1:
+        cell = next(n for n in neighbours[cell] if costs.get(n) == costs[cell] - 1)
+        path.append(cell)
+    path.reverse()
+    return path
+
+def candidate_plans(state: engine.GameState, me: engine.Player, enemy: engine.Player) -> List[List[Dict]]:
+    """Kandidátní tahy: dojít na dosažitelnou buňku a útočit zbylými AP, nebo nejdřív útočit a pak ustoupit"""
+    layout = state.layout
+    cols = layout.cols
+    player_id = me.player_id
+    ap = state.ap_remaining
+    start = me.cell
+    costs = engine.reachable_cells(state, me)
+    attack = {"type": "attack", "player_id": player_id, "target_player_id": enemy.player_id}
+    end_turn = {"type": "end_turn", "player_id": player_id}
+    can_attack_now = engine.is_valid_attack(layout, me, enemy)
+
+    plans = []
+    for cell, cost in [(start, 0)] + list(costs.items()):
+        moves = [
+            {"type": "move", "player_id": player_id, "to_x": step % cols, "to_y": step // cols}
+            for step in (path_to(state, costs, cell) if cost else [])
+        ]
+        spare = ap - cost
+        # Move first, then attack from the destination if it is in range
+        attacker = me.copy()
+        attacker.cell = cell
+        if spare and engine.is_valid_attack(layout, attacker, enemy):
+            plans.append(moves + [attack] * spare + [end_turn])
+        else:
+            plans.append(moves + [end_turn])
+        # Hit and run - attack from the current cell, then move away
+        if can_attack_now and cost and spare:
+            plans.append([attack] * spare + moves + [end_turn])
+    return plans
+
+def evaluate(state: engine.GameState, player_id: str) -> float:
+    """Hodnota stavu pro hráče v [-1, 1] - výhra/prohra, jinak rozdíl podílu zbylých HP"""
+    if state.status == "finished":
+        return 1.0 if state.winner_id == player_id else -1.0
+    score = 0.0
+    for player in state.players:
+        robot = CATALOG.robot(player.robot_id)
+        share = player.hp / robot["hpMax"] if robot else 0.0
+        score += share if player.player_id == player_id else -share
+    return score / 2
+
+def rollout(state: engine.GameState, plan: List[Dict], player_id: str, depth: int, rng: random.Random) -> float:
+    """Zahraje plán a depth dalších tahů skriptovanou strategií s nově vylosovanými pastmi"""
+    sim = engine.clone_state(state)
+    # Trap RNG is a chance node - resample it instead of reading the match seed
+    sim.rng_seed = rng.randrange(1, 1000000)
+    try:
+        engine.apply_turn(sim, plan)
+    except engine.ActionError:
+        return -1.0
+    end_turn = sim.turn_number + depth
+    while sim.status == "playing" and sim.turn_number < end_turn:
+        engine.apply(sim, greedy_action(sim))
+    return evaluate(sim, player_id)
+
+def search(state: engine.GameState, player_id: str, budget: SearchBudget, rng: random.Random) -> Tuple[List[Dict], int]:
+    """UCB1 nad kandidátními plány; vrací nejčastěji zkoušený plán a počet rolloutů"""
+    me = engine.get_player(state, player_id)
+    enemy = next(p for p in state.players if p is not me)
+    plans = candidate_plans(state, me, enemy)
+    if len(plans) == 1:
+        return plans[0], 0
+
+    visits = [0] * len(plans)
+    totals = [0.0] * len(plans)
+    deadline = time.perf_counter() + budget.time_limit
+    iterations = 0
+    while iterations < budget.iterations and time.perf_counter() < deadline:
+        if iterations < len(plans):
+            # Every plan once, in random order so a tight budget does not favour early plans
+            if iterations == 0:
+                order = list(range(len(plans)))
+                rng.shuffle(order)
+            choice = order[iterations]
+        else:
+            log_total = math.log(iterations)
+            choice = max(
+                range(len(plans)),
+                key=lambda i: totals[i] / visits[i] + EXPLORATION * math.sqrt(log_total / visits[i]) if visits[i] else math.inf
+            )
+        totals[choice] += rollout(state, plans[choice], player_id, budget.depth, rng)
+        visits[choice] += 1
+        iterations += 1
+    best = max(range(len(plans)), key=lambda i: (visits[i], totals[i] / visits[i] if visits[i] else -math.inf))
+    return plans[best], iterations
+
+def choose_turn(state_data: Dict, arena: str, player_id: str, level: str = DEFAULT_LEVEL,
+                seed: Optional[int] = None) -> List[Dict]:
+    """Vstupní bod pro worker proces - stav jako dict, výsledek je seznam akcí pro apply_turn"""
+    CATALOG.reload_if_changed()
+    state = engine.GameState.from_dict(state_data, load_layout(arena))
+    budget = LEVELS.get(level, LEVELS[DEFAULT_LEVEL])
+    plan, _ = search(state, player_id, budget, random.Random(seed))
+    return plan
+
+def warm_up() -> bool:
+    """Načte moduly a arénu ve worker procesu předem, první tah bota pak nečeká na import"""
+    load_layout()
+    return True
+
+class BotPool:
+    """Procesy pro hledání tahů botů; tah se počítá mimo event loop a výsledek se jen aplikuje"""
+    def __init__(self, workers: int = settings.BOT_WORKERS):
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.rng = random.Random()
+
+    def start(self):
+        if self.executor is None and self.workers > 0:
+            # Spawned workers do not inherit the server's event loop, sockets or threads
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(self.workers):
+                self.executor.submit(warm_up)
+
+    @property
+    def running(self) -> bool:
+        return self.executor is not None
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def choose_turn(self, state: engine.GameState, player_id: str, level: str) -> List[Dict]:
+        """Tah bota; bez workerů nebo při chybě hledání bot jen ukončí tah"""
+        end_turn = [{"type": "end_turn", "player_id": player_id}]
+        if self.executor is None:
+            return end_turn
+        # Detached copy - pickling happens later in the executor's feeder thread
+        state_data = engine.clone_state(state).to_dict()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, choose_turn, state_data, state.layout.name, player_id, level, self.rng.randrange(1 << 30)
+            )
+        except Exception:
+            logger.exception("Hledání tahu bota selhalo")
+            return end_turn
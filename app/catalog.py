@@ -0,0 +1,80 @@
+"""
+Katalog robotů a zbraní ze seed.json - indexy podle id, předpočítané odvozené hodnoty
+a předem zakódovaná zpráva "seed" s ETagem. Lze znovu načíst bez restartu serveru.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Union
+
+from codec import ENCODINGS, encode
+
+SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "seed.json")
+HEAL_RATIO = 0.25  # Spawn heal as a fraction of max HP
+DEFAULT_RANGE = 1  # Range used when a player has no weapon
+
+logger = logging.getLogger(__name__)
+
+class SeedCatalog:
+    """Indexovaná seed data; reload() vymění obsah na místě, takže odkazy na katalog zůstávají platné"""
+    def __init__(self, path: str = SEED_PATH):
+        self.path = path
+        self.mtime = 0.0
+        self.robots: List[Dict] = []
+        self.weapons: List[Dict] = []
+        self.robots_by_id: Dict[str, Dict] = {}
+        self.weapons_by_id: Dict[str, Dict] = {}
+        self.heal_amount: Dict[str, float] = {}  # robot_id -> HP healed on spawn
+        self.weapon_range: Dict[Optional[str], int] = {}  # weapon_id -> effective range (None = no weapon)
+        self.etag = ""
+        self.frames: Dict[str, Union[str, bytes]] = {}  # encoding -> pre-encoded seed message
+        self.reload()
+
+    def reload(self):
+        """Načte seed.json a atomicky nahradí indexy i zakódovanou zprávu"""
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        mtime = os.path.getmtime(self.path)
+        data = json.loads(raw)
+        robots, weapons = data["robots"], data["weapons"]
+        robots_by_id = {robot["id"]: robot for robot in robots}
+        weapons_by_id = {weapon["id"]: weapon for weapon in weapons}
+        if len(robots_by_id) != len(robots) or len(weapons_by_id) != len(weapons):
+            raise ValueError("seed.json: duplicitní id robota nebo zbraně")
+
+        weapon_range: Dict[Optional[str], int] = {None: DEFAULT_RANGE}
+        weapon_range.update((weapon["id"], weapon.get("range", DEFAULT_RANGE)) for weapon in weapons)
+        etag = hashlib.sha256(raw).hexdigest()[:16]
+
+        # Swap everything without awaiting in between - no reader sees a half-updated catalog
+        self.robots, self.weapons = robots, weapons
+        self.robots_by_id, self.weapons_by_id = robots_by_id, weapons_by_id
+        self.heal_amount = {robot["id"]: robot["hpMax"] * HEAL_RATIO for robot in robots}
+        self.weapon_range = weapon_range
+        self.etag = etag
+        message = {"type": "seed", "etag": etag, "robots": robots, "weapons": weapons}
+        self.frames = {encoding: encode(message, encoding) for encoding in ENCODINGS}
+        self.mtime = mtime
+
+    def reload_if_changed(self) -> bool:
+        """Znovu načte katalog, pokud se soubor od posledního načtení změnil; chybný soubor se ignoruje"""
+        try:
+            if os.path.getmtime(self.path) == self.mtime:
+                return False
+            self.reload()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Seed data nelze znovu načíst, zůstává verze %s: %s", self.etag, e)
+            return False
+        logger.info("Seed data znovu načtena, verze %s", self.etag)
+        return True
+
+    def robot(self, robot_id: Optional[str]) -> Optional[Dict]:
+        return self.robots_by_id.get(robot_id)
+
+    def weapon(self, weapon_id: Optional[str]) -> Optional[Dict]:
+        return self.weapons_by_id.get(weapon_id)
+
+    def range_of(self, weapon_id: Optional[str]) -> int:
+        """Efektivní dosah zbraně; neznámá nebo žádná zbraň má výchozí dosah"""
+        return self.weapon_range.get(weapon_id, DEFAULT_RANGE)
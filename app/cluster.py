@@ -0,0 +1,220 @@
+"""
+Režim více workerů - každou místnost vlastní právě jeden proces (konzistentní hashování id místnosti),
+klient připojený jinam dostane přesměrování na vlastníka. Sdílený stav lobby (otevřené místnosti,
+místnosti založené matchmakingem pro jiný worker, ratingy) drží výměnný backend: v paměti pro jeden
+proces, SQLite soubor pro workery na jednom stroji.
+
+Spuštění: python cluster.py [další argumenty uvicornu] (WORKERS procesů na portech PORT..PORT+WORKERS-1)
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import settings
+from assets import AssetPipeline
+
+logger = logging.getLogger(__name__)
+
+MATCHMAKING_KEY = "matchmaking"  # The queue lives on the worker this key hashes to
+
+def stable_hash(key: str) -> int:
+    """Stejná hodnota ve všech procesech (vestavěný hash() je v každém procesu jinak osolený)"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Konzistentní hashování s virtuálními uzly - při změně počtu workerů se přesune jen malá část místností"""
+    def __init__(self, nodes: int, vnodes: int = settings.CLUSTER_VNODES):
+        points = sorted((stable_hash(f"{node}#{i}"), node) for node in range(nodes) for i in range(vnodes))
+        self.hashes = [point for point, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> int:
+        index = bisect.bisect(self.hashes, stable_hash(key))
+        return self.nodes[index % len(self.nodes)]
+
+class MemoryBackend:
+    """Sdílený stav v paměti - jediný proces a testy"""
+    def __init__(self):
+        self.open_rooms: Dict[str, int] = {}  # room_id -> worker, in opening order
+        self.reservations: Dict[str, Tuple[float, List[Dict]]] = {}  # room_id -> (created_at, players)
+        self.ratings: Dict[str, int] = {}
+
+    def clear_worker(self, worker: int):
+        for room_id in [room_id for room_id, owner in self.open_rooms.items() if owner == worker]:
+            del self.open_rooms[room_id]
+
+    def room_opened(self, room_id: str, worker: int):
+        self.open_rooms[room_id] = worker
+
+    def room_closed(self, room_id: str):
+        self.open_rooms.pop(room_id, None)
+
+    def find_open_room(self, exclude_worker: int) -> Optional[Tuple[str, int]]:
+        """Nejstarší otevřená místnost jiného workeru"""
+        return next(((room_id, worker) for room_id, worker in self.open_rooms.items() if worker != exclude_worker), None)
+
+    def reserve(self, room_id: str, players: List[Dict]):
+        now = time.time()
+        for stale in [key for key, (created_at, _) in self.reservations.items() if created_at < now - settings.RECONNECT_GRACE]:
+            del self.reservations[stale]
+        self.reservations[room_id] = (now, players)
+
+    def claim(self, room_id: str) -> Optional[List[Dict]]:
+        """Vydá rezervaci právě jednou"""
+        entry = self.reservations.pop(room_id, None)
+        return entry[1] if entry else None
+
+    def get_rating(self, name: str) -> Optional[int]:
+        return self.ratings.get(name)
+
+    def set_ratings(self, ratings: Dict[str, int]):
+        self.ratings.update(ratings)
+
+class SQLiteBackend:
+    """Sdílený stav v SQLite souboru (WAL) - workery na jednom stroji; dotazy jsou krátké a běží přímo v event loopu"""
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS open_rooms (room_id TEXT PRIMARY KEY, worker INTEGER NOT NULL, opened_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS open_rooms_by_time ON open_rooms (opened_at)",
+        "CREATE TABLE IF NOT EXISTS reservations (room_id TEXT PRIMARY KEY, players TEXT NOT NULL, created_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS ratings (name TEXT PRIMARY KEY, rating INTEGER NOT NULL)",
+    )
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit - every statement is its own short transaction
+        self.db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self.db.execute(statement)
+
+    def clear_worker(self, worker: int):
+        self.db.execute("DELETE FROM open_rooms WHERE worker = ?", (worker,))
+
+    def room_opened(self, room_id: str, worker: int):
+        self.db.execute("INSERT OR REPLACE INTO open_rooms VALUES (?, ?, ?)", (room_id, worker, time.time()))
+
+    def room_closed(self, room_id: str):
+        self.db.execute("DELETE FROM open_rooms WHERE room_id = ?", (room_id,))
+
+    def find_open_room(self, exclude_worker: int) -> Optional[Tuple[str, int]]:
+        row = self.db.execute(
+            "SELECT room_id, worker FROM open_rooms WHERE worker != ? ORDER BY opened_at LIMIT 1", (exclude_worker,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def reserve(self, room_id: str, players: List[Dict]):
+        now = time.time()
+        self.db.execute("DELETE FROM reservations WHERE created_at < ?", (now - settings.RECONNECT_GRACE,))
+        self.db.execute("INSERT OR REPLACE INTO reservations VALUES (?, ?, ?)", (room_id, json.dumps(players), now))
+
+    def claim(self, room_id: str) -> Optional[List[Dict]]:
+        row = self.db.execute("DELETE FROM reservations WHERE room_id = ? RETURNING players", (room_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_rating(self, name: str) -> Optional[int]:
+        row = self.db.execute("SELECT rating FROM ratings WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_ratings(self, ratings: Dict[str, int]):
+        self.db.executemany("INSERT OR REPLACE INTO ratings VALUES (?, ?)", ratings.items())
+
+def open_backend(url: str):
+    """"memory" nebo "sqlite:///cesta/k/souboru.db\""""
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    raise ValueError(f"Neznámý CLUSTER_BACKEND: {url}")
+
+class Redirect(Exception):
+    """Místnost (nebo fronta) patří jinému workeru - klient se připojí tam a zprávu zopakuje"""
+    def __init__(self, worker: int):
+        super().__init__(worker)
+        self.worker = worker
+
+class Cluster:
+    """Tento worker v rámci clusteru - vlastnictví místností, adresy ostatních workerů a sdílený backend"""
+    def __init__(self, workers: int = settings.WORKERS, worker_id: int = settings.WORKER_ID,
+                 urls: List[str] = settings.WORKER_URLS, backend: str = settings.CLUSTER_BACKEND):
+        self.workers = workers
+        self.worker_id = worker_id
+        self.urls = urls
+        self.ring = HashRing(workers)
+        self.backend = open_backend(backend)
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    def owner(self, key: str) -> int:
+        return self.ring.owner(key) if self.workers > 1 else self.worker_id
+
+    def owns(self, key: str) -> bool:
+        return self.owner(key) == self.worker_id
+
+    def url(self, worker: int, host: Optional[str] = None) -> str:
+        """Veřejná adresa /ws workeru; bez WORKER_URLS stejný host jako požadavek a port PORT + worker"""
+        if worker < len(self.urls):
+            return self.urls[worker]
+        host = host or "localhost"
+        hostname = host if host.endswith("]") else host.rsplit(":", 1)[0]
+        return f"ws://{hostname}:{settings.PORT + worker}/ws"
+
+    def redirect_message(self, worker: int, host: Optional[str]) -> Dict:
+        return {"type": "redirect", "worker": worker, "url": self.url(worker, host)}
+
+def token_room(token: str) -> Optional[str]:
+    """Id místnosti z tokenu hráče ("<room_id>.<uuid>"); tokeny ze starších žurnálů ho nemají"""
+    room_id, separator, _ = token.partition(".")
+    return room_id if separator else None
+
+def main():
+    """Spustí workery a hlídá je - spadlý worker se nastartuje znovu a místnosti obnoví ze žurnálu"""
+    logging.basicConfig(level=logging.INFO)
+    # Built once here - the workers then only load the manifest
+    AssetPipeline().build()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", settings.HOST] + sys.argv[1:]
+    if settings.WORKERS == 1:
+        os.execv(sys.executable, command + ["--port", str(settings.PORT)])
+    env = dict(os.environ)
+    if settings.CLUSTER_BACKEND == "memory":
+        # Separate processes cannot share memory - fall back to a local SQLite file
+        env["CLUSTER_BACKEND"] = "sqlite:///" + os.path.join(tempfile.gettempdir(), "arena-cluster.db")
+
+    def spawn(worker: int) -> subprocess.Popen:
+        return subprocess.Popen(command + ["--port", str(settings.PORT + worker)], env=dict(env, WORKER_ID=str(worker)))
+
+    processes = [spawn(worker) for worker in range(settings.WORKERS)]
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while not stopping:
+        time.sleep(1)
+        for worker, process in enumerate(processes):
+            if process.poll() is not None and not stopping:
+                logger.error("Worker %d skončil s kódem %s, spouštím znovu", worker, process.returncode)
+                processes[worker] = spawn(worker)
+    for process in processes:
+        process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Kódování zpráv na drátě - JSON (výchozí) a MessagePack s kompaktními celočíselnými klíči.
+Klient si binární kódování vyjedná v join/reconnect; tabulky klíčů a typů dostane v odpovědi.
+MessagePack je volitelný pro ne-prohlížečové klienty (boti, zátěžové testy, nativní klienti) -
+webový klient zůstává u JSON, který prohlížeč dekóduje nativně.
+"""
+import json
+from typing import Any, Dict, Union
+
+import msgpack
+
+JSON = "json"
+MSGPACK = "msgpack"
+ENCODINGS = (JSON, MSGPACK)
+
+# Append-only tables - the position is the wire id, never reorder or remove entries
+KEYS = (
+    "type", "seq", "state", "players", "traps", "traps_runtime", "trap_defs", "turn_options",
+    "player_id", "pos", "x", "y", "hp", "connected", "ready", "robot_id", "weapon_id", "name",
+    "status", "turn_player_id", "ap_remaining", "turn_number", "winner_id", "rng_seed",
+    "armingTurnsRemaining", "remainingActiveTurns", "damage", "zone", "arena", "cols", "rows",
+    "background", "moves", "attack_targets", "events", "target_player_id", "amount", "trap_id",
+    "can_start", "message", "code", "reason", "authoritative_pos", "index", "client_action_id",
+    "client_turn_id", "to_x", "to_y", "actions", "token", "room_id", "seed_etag", "encoding",
+    "etag", "robots", "weapons", "id", "description", "hpMax", "armorPct", "range", "keys", "types",
+    "delay", "viewers", "match_id", "rating", "queued", "spawn", "opponent", "waited", "bot",
+    "level", "turn_time",
+    "last_seq", "resumed",
+    "worker", "url", "redirected"
+)
+TYPES = (
+    # Server -> client
+    "game_state", "game_delta", "lobby_state", "game_over", "seed", "error", "join_ok",
+    "reconnect_ok", "action_rejected", "turn_ok", "turn_rejected",
+    # Client -> server
+    "join", "reconnect", "select_loadout", "set_ready", "action_move", "action_attack",
+    "submit_turn", "end_turn", "resync",
+    # Engine events and submit_turn actions
+    "moved", "healed", "attacked", "trap_damage", "turn_started", "move", "attack",
+    # Spectators
+    "spectate", "spectate_ok", "room_closed",
+    # Matchmaking
+    "queue", "leave_queue", "queued", "match_found",
+    # AI opponents
+    "add_bot",
+    # Timers and heartbeats
+    "forfeited", "ping", "pong",
+    # Multi-worker routing
+    "redirect"
+)
+KEY_IDS = {key: i for i, key in enumerate(KEYS)}
+TYPE_IDS = {name: i for i, name in enumerate(TYPES)}
+
+def _compact(value: Any) -> Any:
+    """Nahradí známé klíče (a hodnoty "type") jejich číselným id"""
+    if type(value) is dict:
+        compact = {}
+        for key, item in value.items():
+            kind = type(item)
+            if kind is dict or kind is list or kind is tuple:
+                item = _compact(item)
+            elif key == "type":
+                type_id = TYPE_IDS.get(item)
+                if type_id is not None:
+                    compact[0] = type_id
+                    continue
+            compact[KEY_IDS.get(key, key)] = item
+        return compact
+    # Protocol lists are homogeneous - lists of scalars (coordinates, turn option triples) are packed as they are
+    if value:
+        kind = type(value[0])
+        if kind is dict or kind is list or kind is tuple:
+            return [_compact(item) for item in value]
+    return value
+
+def _expand(value: Any) -> Any:
+    """Opak _compact; neznámá čísla klíčů zůstanou jako čísla (validace je odmítne)"""
+    if type(value) is dict:
+        expanded = {}
+        for key, item in value.items():
+            name = KEYS[key] if type(key) is int and 0 <= key < len(KEYS) else key
+            if name == "type" and type(item) is int and 0 <= item < len(TYPES):
+                expanded[name] = TYPES[item]
+            else:
+                expanded[name] = _expand(item)
+        return expanded
+    if type(value) is list:
+        return [_expand(item) for item in value]
+    return value
+
+def encode(message: Dict, encoding: str = JSON) -> Union[str, bytes]:
+    """Serializuje zprávu jednou pro všechny příjemce se stejným kódováním"""
+    if encoding == MSGPACK:
+        return msgpack.packb(_compact(message))
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+def decode_msgpack(frame: bytes) -> Any:
+    """Binární rámec klienta -> zpráva se jmennými klíči; chyba formátu -> ValueError"""
+    return _expand(msgpack.unpackb(frame, strict_map_key=False))
+
+def wire_tables() -> Dict:
+    """Tabulky pro klienta, který si vyjednal MessagePack"""
+    return {"keys": KEYS, "types": TYPES}
@@ -0,0 +1,121 @@
+"""
+Delta kódování stavu hry - verze stavu místnosti a posílání pouze změněných polí
+"""
+from typing import Dict, Optional, Tuple
+
+from engine import turn_options
+
+# Dynamic fields tracked between broadcasts
+STATE_FIELDS = ("status", "turn_player_id", "ap_remaining", "turn_number", "winner_id")
+PLAYER_FIELDS = ("hp", "connected", "ready", "robot_id", "weapon_id")
+TRAP_FIELDS = ("state", "armingTurnsRemaining", "remainingActiveTurns")  # Wire names of TrapState slots
+
+def take_snapshot(state) -> Dict:
+    """Zachytí dynamická pole stavu v podobě vhodné k porovnání"""
+    coords = state.layout.coords
+    return {
+        "state": tuple(getattr(state, field) for field in STATE_FIELDS),
+        "players": {
+            p.player_id: coords[p.cell] + tuple(getattr(p, field) for field in PLAYER_FIELDS)
+            for p in state.players
+        },
+        "traps": {
+            trap_def.id: (trap.state, trap.arming, trap.remaining)
+            for trap_def, trap in zip(state.layout.traps, state.traps)
+        }
+    }
+
+def diff_snapshots(prev: Dict, curr: Dict) -> Dict:
+    """Vrátí pouze změněná pole (prázdný dict, pokud se nic nezměnilo)"""
+    changes = {}
+
+    state_changes = {
+        field: value
+        for field, old, value in zip(STATE_FIELDS, prev["state"], curr["state"])
+        if old != value
+    }
+    if state_changes:
+        changes["state"] = state_changes
+
+    player_changes = {}
+    for player_id, values in curr["players"].items():
+        old = prev["players"].get(player_id)
+        if old == values:
+            continue
+        changed = {}
+        if old is None or old[:2] != values[:2]:
+            changed["pos"] = {"x": values[0], "y": values[1]}
+        for i, field in enumerate(PLAYER_FIELDS, start=2):
+            if old is None or old[i] != values[i]:
+                changed[field] = values[i]
+        player_changes[player_id] = changed
+    if player_changes:
+        changes["players"] = player_changes
+
+    trap_changes = {
+        trap_id: {
+            field: value
+            for field, old_value, value in zip(TRAP_FIELDS, prev["traps"].get(trap_id, (None,) * len(TRAP_FIELDS)), values)
+            if old_value != value
+        }
+        for trap_id, values in curr["traps"].items()
+        if prev["traps"].get(trap_id) != values
+    }
+    if trap_changes:
+        changes["traps"] = trap_changes
+
+    return changes
+
+class StateTracker:
+    """Sleduje verzi stavu místnosti a poslední odeslaný snapshot"""
+    __slots__ = ("seq", "snapshot", "options_key", "options")
+
+    def __init__(self):
+        self.seq = 0
+        self.snapshot: Optional[Dict] = None
+        # Turn options are computed once per state version and turn - seq alone misses changes made
+        # without a broadcast (turn timer, state restored from the journal)
+        self.options_key: Optional[Tuple] = None
+        self.options: Optional[Dict] = None
+
+    def reset(self):
+        """Další broadcast bude plný snapshot (nový zápas)"""
+        self.snapshot = None
+
+    def turn_options(self, state) -> Optional[Dict]:
+        """Dosažitelné buňky a cíle útoku pro aktuální verzi stavu (cache podle seq, tahu a hráče na tahu)"""
+        key = (self.seq, state.status, state.turn_number, state.turn_player_id, state.ap_remaining)
+        if self.options_key != key:
+            self.options = turn_options(state)
+            self.options_key = key
+        return self.options
+
+    def full(self, state) -> Dict:
+        """Plný snapshot včetně statických dat arény a pastí - pro start, join, reconnect a resync"""
+        if self.snapshot is None:
+            self.seq += 1
+            self.snapshot = take_snapshot(state)
+        message = {
+            "type": "game_state",
+            "seq": self.seq,
+            **{field: getattr(state, field) for field in STATE_FIELDS},
+            "players": state.players_dict(),
+            "rng_seed": state.rng_seed,
+            "traps_runtime": state.traps_dict(),
+            "turn_options": self.turn_options(state),
+            "arena": state.layout.wire,
+            "trap_defs": state.layout.trap_defs
+        }
+        return message
+
+    def delta(self, state) -> Optional[Dict]:
+        """Rozdílová zpráva proti poslednímu snapshotu, None pokud se nic nezměnilo"""
+        if self.snapshot is None:
+            return self.full(state)
+        current = take_snapshot(state)
+        changes = diff_snapshots(self.snapshot, current)
+        if not changes:
+            return None
+        self.seq += 1
+        self.snapshot = current
+        return {"type": "game_delta", "seq": self.seq, **changes, "turn_options": self.turn_options(state)}
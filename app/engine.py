@@ -0,0 +1,510 @@
+"""
+Herní engine - pravidla hry nezávislá na FastAPI a WebSocketech
+"""
+import copy
+import random
+from typing import Dict, List, Optional, Tuple
+
+from arena import ArenaLayout, load_layout
+from catalog import SeedCatalog
+
+# Robots and weapons indexed by id (shared, hot-reloadable)
+CATALOG = SeedCatalog()
+
+AP_PER_TURN = 3
+
+class Player:
+    """Hráč zápasu; pozice je index buňky arény (y * cols + x), do drátového tvaru se převádí až při odeslání"""
+    __slots__ = ("player_id", "name", "connected", "robot_id", "weapon_id", "hp", "cell", "ready", "bot")
+
+    def __init__(self, player_id: str, name: str, robot_id: Optional[str] = None, weapon_id: Optional[str] = None,
+                 hp: int = 0, cell: int = 0, connected: bool = True, ready: bool = False, bot: Optional[str] = None):
+        self.player_id = player_id
+        self.name = name
+        self.connected = connected
+        self.robot_id = robot_id
+        self.weapon_id = weapon_id
+        self.hp = hp
+        self.cell = cell
+        self.ready = ready
+        self.bot = bot  # Difficulty level of a server-played opponent
+
+    def to_dict(self, layout: ArenaLayout) -> Dict:
+        data = {
+            "player_id": self.player_id,
+            "name": self.name,
+            "connected": self.connected,
+            "robot_id": self.robot_id,
+            "weapon_id": self.weapon_id,
+            "hp": self.hp,
+            "pos": layout.pos(self.cell),
+            "ready": self.ready
+        }
+        if self.bot is not None:
+            data["bot"] = self.bot
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict, layout: ArenaLayout) -> "Player":
+        pos = data["pos"]
+        return cls(data["player_id"], data["name"], data["robot_id"], data["weapon_id"], data["hp"],
+                   layout.cell(pos["x"], pos["y"]), data["connected"], data["ready"], data.get("bot"))
+
+    def copy(self) -> "Player":
+        return Player(self.player_id, self.name, self.robot_id, self.weapon_id, self.hp, self.cell,
+                      self.connected, self.ready, self.bot)
+
+class TrapState:
+    """Měnitelný stav jedné pasti v zápase; statická definice (TrapDef) zůstává sdílená v aréně"""
+    __slots__ = ("state", "arming", "remaining")
+
+    def __init__(self, state: str = "idle", arming: int = 0, remaining: int = 0):
+        self.state = state  # idle, arming, active
+        self.arming = arming  # turns until an arming trap becomes active
+        self.remaining = remaining  # turns an active trap stays active
+
+    def to_dict(self) -> Dict:
+        return {"state": self.state, "armingTurnsRemaining": self.arming, "remainingActiveTurns": self.remaining}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TrapState":
+        return cls(data["state"], data["armingTurnsRemaining"], data["remainingActiveTurns"])
+
+    def copy(self) -> "TrapState":
+        return TrapState(self.state, self.arming, self.remaining)
+
+# Game state
+class GameState:
+    __slots__ = ("status", "players", "turn_player_id", "ap_remaining", "turn_number", "traps", "rng_seed",
+                 "winner_id", "layout", "occupancy")
+
+    def __init__(self, layout: Optional[ArenaLayout] = None):
+        self.status = "waiting"  # waiting, playing, finished
+        self.players: List[Player] = []
+        self.turn_player_id: Optional[str] = None
+        self.ap_remaining = 0
+        self.turn_number = 0
+        self.traps: List[TrapState] = []  # Same order as layout.traps, empty until the match starts
+        self.rng_seed = random.randint(1, 1000000)
+        self.winner_id: Optional[str] = None
+        self.layout: ArenaLayout = layout or load_layout()
+        self.occupancy = self.layout.new_occupancy()  # cell -> 1 if a player stands there
+
+    def players_dict(self) -> List[Dict]:
+        return [player.to_dict(self.layout) for player in self.players]
+
+    def traps_dict(self) -> Dict[str, Dict]:
+        """Stav pastí v drátovém tvaru {trap_id: {...}}"""
+        return {trap_def.id: trap.to_dict() for trap_def, trap in zip(self.layout.traps, self.traps)}
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "players": self.players_dict(),
+            "turn_player_id": self.turn_player_id,
+            "ap_remaining": self.ap_remaining,
+            "turn_number": self.turn_number,
+            "traps_runtime": self.traps_dict(),
+            "rng_seed": self.rng_seed,
+            "winner_id": self.winner_id
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, layout: Optional[ArenaLayout] = None) -> "GameState":
+        """Opak to_dict - obnova stavu ze žurnálu"""
+        state = cls(layout)
+        state.status = data["status"]
+        state.players = [Player.from_dict(player, state.layout) for player in data["players"]]
+        state.turn_player_id = data["turn_player_id"]
+        state.ap_remaining = data["ap_remaining"]
+        state.turn_number = data["turn_number"]
+        traps = data["traps_runtime"]
+        state.traps = [TrapState.from_dict(traps[trap_def.id]) for trap_def in state.layout.traps] if traps else []
+        state.rng_seed = data["rng_seed"]
+        state.winner_id = data["winner_id"]
+        rebuild_occupancy(state)
+        return state
+
+def new_player(player_id: str, name: str, robot_id: Optional[str] = None, weapon_id: Optional[str] = None) -> Player:
+    """Vytvoří hráče; s vybraným robotem má rovnou plné HP"""
+    robot = CATALOG.robot(robot_id)
+    return Player(player_id, name, robot_id, weapon_id, robot["hpMax"] if robot else 0)
+
+def set_player_pos(state: GameState, player: Player, x: int, y: int):
+    """Přesune hráče a udržuje mapu obsazenosti buněk"""
+    state.occupancy[player.cell] = 0
+    player.cell = state.layout.cell(x, y)
+    state.occupancy[player.cell] = 1
+
+def rebuild_occupancy(state: GameState):
+    """Znovu sestaví obsazenost z pozic hráčů (start zápasu, obnovení stavu)"""
+    layout = state.layout
+    state.occupancy = layout.new_occupancy()
+    for player in state.players:
+        state.occupancy[player.cell] = 1
+
+def is_valid_move(state: GameState, from_cell: int, x: int, y: int) -> bool:
+    """Validuje pohyb na (x, y) - 8-směr, sousední buňka, neblokovaná"""
+    layout = state.layout
+    
+    # Check bounds
+    if x < 0 or x >= layout.cols or y < 0 or y >= layout.rows:
+        return False
+    
+    # Must be adjacent (8-directional)
+    from_x, from_y = layout.coords[from_cell]
+    dx = abs(x - from_x)
+    dy = abs(y - from_y)
+    if dx > 1 or dy > 1 or (dx == 0 and dy == 0):
+        return False
+    
+    # Check if cell is occupied
+    return not state.occupancy[y * layout.cols + x]
+
+def is_in_spawn_zone(layout: ArenaLayout, cell: int, player_index: int) -> bool:
+    """Zkontroluje, zda je buňka ve startovací zóně hráče"""
+    return layout.spawn_owner[cell] == player_index
+
+def has_enemy_nearby(layout: ArenaLayout, player: Player, all_players: List[Player]) -> bool:
+    """Zkontroluje, zda je v okolí protihráč v dosahu své zbraně (nebo blíž)"""
+    for other_player in all_players:
+        if other_player.player_id == player.player_id:
+            continue
+        
+        # Enemy's weapon range (default range of 1 without a weapon)
+        weapon_range = CATALOG.range_of(other_player.weapon_id)
+        
+        # Manhattan distance - check if enemy is within or at weapon range
+        if layout.distance(other_player.cell, player.cell) <= weapon_range:
+            return True
+    
+    return False
+
+def reachable_cells(state: GameState, player: Player) -> Dict[int, int]:
+    """BFS po 8-okolí v rámci zbývajících AP - buňka -> cena v AP (stejná pravidla jako is_valid_move)"""
+    layout = state.layout
+    occupancy = state.occupancy
+    neighbours = layout.neighbours
+    start = player.cell
+    costs = {start: 0}
+    frontier = [start]
+    for cost in range(1, state.ap_remaining + 1):
+        next_frontier = []
+        for cell in frontier:
+            for neighbour in neighbours[cell]:
+                if neighbour not in costs and not occupancy[neighbour]:
+                    costs[neighbour] = cost
+                    next_frontier.append(neighbour)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    del costs[start]
+    return costs
+
+def turn_options(state: GameState) -> Optional[Dict]:
+    """Platné tahy hráče na tahu - dosažitelné buňky s cenou a cíle útoku z aktuální pozice"""
+    if state.status != "playing":
+        return None
+    player = get_player(state, state.turn_player_id)
+    if not player or state.ap_remaining <= 0:
+        return {"player_id": state.turn_player_id, "moves": [], "attack_targets": []}
+    layout = state.layout
+    cols = layout.cols
+    return {
+        "player_id": player.player_id,
+        "moves": [[cell % cols, cell // cols, cost] for cell, cost in reachable_cells(state, player).items()],
+        "attack_targets": [
+            p.player_id for p in state.players
+            if p is not player and is_valid_attack(layout, player, p)
+        ]
+    }
+
+def heal_on_spawn(state: GameState, player: Player) -> float:
+    """Uzdraví hráče o 25% max HP, pokud je na startovací pozici a není tam protihráč; vrací vyléčené HP"""
+    all_players = state.players
+    # Find player index
+    player_index = None
+    for i, p in enumerate(all_players):
+        if p.player_id == player.player_id:
+            player_index = i
+            break
+    
+    if player_index is None:
+        return 0
+    
+    # Check if in spawn zone
+    if not is_in_spawn_zone(state.layout, player.cell, player_index):
+        return 0
+    
+    # Check if enemy nearby (within their weapon range)
+    if has_enemy_nearby(state.layout, player, all_players):
+        return 0
+    
+    # Heal 25% of max HP
+    robot = CATALOG.robot(player.robot_id)
+    if robot:
+        max_hp = robot["hpMax"]
+        heal_amount = CATALOG.heal_amount[robot["id"]]
+        old_hp = player.hp
+        player.hp = min(max_hp, player.hp + heal_amount)
+        return player.hp - old_hp
+    return 0
+
+def is_valid_attack(layout: ArenaLayout, attacker: Player, target: Player) -> bool:
+    """Validuje útok - pouze 4-směr (N/E/S/W), kontrola range"""
+    # Get weapon
+    if attacker.weapon_id not in CATALOG.weapons_by_id:
+        return False
+    
+    range_val = CATALOG.range_of(attacker.weapon_id)
+    
+    # Check if target is in same row or column (4-directional)
+    target_x, target_y = layout.coords[target.cell]
+    attacker_x, attacker_y = layout.coords[attacker.cell]
+    dx = target_x - attacker_x
+    dy = target_y - attacker_y
+    
+    # Must be cardinal direction (not diagonal)
+    if dx != 0 and dy != 0:
+        return False
+    
+    # Check range
+    distance = abs(dx) + abs(dy)
+    if distance == 0 or distance > range_val:
+        return False
+    
+    return True
+
+def start_game(state: GameState):
+    """Spustí hru - inicializuje pozice, HP, pasti, první tah"""
+    state.status = "playing"
+    state.turn_number = 1
+    
+    # Initialize player positions on their spawn zones; a rematch starts at full HP as well
+    for player, (x, y) in zip(state.players, state.layout.spawn_positions):
+        player.cell = state.layout.cell(x, y)
+        robot = CATALOG.robot(player.robot_id)
+        player.hp = robot["hpMax"] if robot else 0
+    rebuild_occupancy(state)
+    
+    # Initialize traps runtime state (static definitions stay shared in the layout)
+    state.traps = [TrapState() for _ in state.layout.traps]
+    
+    # First player's turn
+    state.turn_player_id = state.players[0].player_id
+    state.ap_remaining = AP_PER_TURN
+
+def next_turn(state: GameState):
+    """Přepne na další tah"""
+    state.turn_number += 1
+    
+    # Switch to next player
+    current_idx = next((i for i, p in enumerate(state.players) if p.player_id == state.turn_player_id), 0)
+    next_idx = (current_idx + 1) % len(state.players)
+    state.turn_player_id = state.players[next_idx].player_id
+    state.ap_remaining = AP_PER_TURN
+
+def process_traps(state: GameState) -> List[Dict]:
+    """Zpracuje pasti - arming, active, damage; vrací události poškození"""
+    events = []
+    rng = random.Random(state.rng_seed + state.turn_number)
+    
+    # Trap bitmask of every player's cell
+    layout = state.layout
+    player_cells = [
+        (player, layout.cell_traps[player.cell])
+        for player in state.players
+    ]
+    
+    # Phase 1: Process current states
+    for trap_index, (trap_def, trap) in enumerate(zip(layout.traps, state.traps)):
+        if trap.state == "arming":
+            # Arming -> Active transition
+            trap.state = "active"
+            trap.remaining = rng.randint(trap_def.min_active, trap_def.max_active)
+            trap.arming = 0
+        elif trap.state == "active":
+            # Apply damage to players in zone
+            trap_bit = 1 << trap_index
+            for player, cell_traps in player_cells:
+                if player.hp > 0:
+                    if cell_traps & trap_bit:
+                        player.hp = max(0, player.hp - trap_def.damage)
+                        events.append({"type": "trap_damage", "trap_id": trap_def.id, "player_id": player.player_id, "damage": trap_def.damage})
+                        # Check for game over
+                        if player.hp <= 0 and state.status == "playing":
+                            # Find the winner (other player)
+                            winner = next((p for p in state.players if p.player_id != player.player_id and p.hp > 0), None)
+                            if winner:
+                                state.status = "finished"
+                                state.winner_id = winner.player_id
+            
+            # Decrement active turns
+            trap.remaining -= 1
+            if trap.remaining <= 0:
+                trap.state = "idle"
+    
+    # Phase 2: Randomly arm new traps (weighted)
+    for trap_def, trap in zip(layout.traps, state.traps):
+        if trap.state == "idle":
+            # Weighted random chance to start arming
+            if rng.random() < trap_def.weight * 0.3:  # 30% of weight as base chance
+                trap.state = "arming"
+                trap.arming = 1  # Arms for 1 turn, then becomes active
+    
+    return events
+
+class ActionError(Exception):
+    """Akce hráče byla odmítnuta"""
+    REASONS = {
+        "not_playing": "Hra neprobíhá",
+        "not_your_turn": "Není váš tah",
+        "no_ap": "Nemáte žádné akce",
+        "invalid_move": "Neplatný pohyb",
+        "invalid_target": "Neplatný cíl",
+        "invalid_attack": "Útok mimo dosah nebo neplatný směr",
+        "unknown_action": "Neznámá akce",
+        "invalid_turn": "Neplatný počet akcí v tahu"
+    }
+
+    def __init__(self, code: str, index: Optional[int] = None):
+        super().__init__(code)
+        self.code = code
+        self.reason = self.REASONS.get(code, code)
+        self.index = index  # Position of the rejected action within a submitted turn
+
+def get_player(state: GameState, player_id: Optional[str]) -> Optional[Player]:
+    return next((p for p in state.players if p.player_id == player_id), None)
+
+def apply(state: GameState, action: Dict) -> Tuple[GameState, List[Dict]]:
+    """Provede akci (move, attack, end_turn, forfeit) a vrátí stav a vzniklé události
+
+    Stav se mění na místě; neplatná akce vyvolá ActionError a stav nechá beze změny.
+    """
+    action_type = action.get("type")
+    player = get_player(state, action.get("player_id"))
+    
+    if state.status != "playing":
+        raise ActionError("not_playing")
+    
+    events: List[Dict] = []
+    
+    if action_type == "forfeit":
+        # Issued by the server (player did not come back in time) - allowed out of turn
+        if not player:
+            raise ActionError("invalid_target")
+        winner = next((p for p in state.players if p is not player), None)
+        state.status = "finished"
+        state.winner_id = winner.player_id if winner else None
+        events.append({"type": "forfeited", "player_id": player.player_id})
+        events.append({"type": "game_over", "winner_id": state.winner_id})
+        return state, events
+    
+    if not player or state.turn_player_id != player.player_id:
+        raise ActionError("not_your_turn")
+    
+    if action_type == "move":
+        if state.ap_remaining <= 0:
+            raise ActionError("no_ap")
+        
+        to_x = action.get("to_x")
+        to_y = action.get("to_y")
+        if type(to_x) is not int or type(to_y) is not int:
+            raise ActionError("invalid_move")
+        
+        if not is_valid_move(state, player.cell, to_x, to_y):
+            raise ActionError("invalid_move")
+        
+        set_player_pos(state, player, to_x, to_y)
+        events.append({"type": "moved", "player_id": player.player_id, "pos": {"x": to_x, "y": to_y}})
+        
+        # Check if player moved to spawn zone and heal if no enemy nearby
+        healed = heal_on_spawn(state, player)
+        if healed:
+            events.append({"type": "healed", "player_id": player.player_id, "amount": healed})
+        
+        state.ap_remaining -= 1
+    
+    elif action_type == "attack":
+        if state.ap_remaining <= 0:
+            raise ActionError("no_ap")
+        
+        target = get_player(state, action.get("target_player_id"))
+        if not target:
+            raise ActionError("invalid_target")
+        
+        if not is_valid_attack(state.layout, player, target):
+            raise ActionError("invalid_attack")
+        
+        weapon = CATALOG.weapon(player.weapon_id)
+        if weapon:
+            target.hp = max(0, target.hp - weapon["damage"])
+            events.append({"type": "attacked", "player_id": player.player_id, "target_player_id": target.player_id, "damage": weapon["damage"]})
+        
+        state.ap_remaining -= 1
+        
+        # Check for game over
+        if target.hp <= 0:
+            state.status = "finished"
+            state.winner_id = player.player_id
+    
+    elif action_type == "end_turn":
+        events.extend(process_traps(state))
+        
+        if state.status == "playing":
+            next_turn(state)
+            events.append({"type": "turn_started", "player_id": state.turn_player_id, "turn_number": state.turn_number})
+    
+    else:
+        raise ActionError("unknown_action")
+    
+    if state.status == "finished":
+        events.append({"type": "game_over", "winner_id": state.winner_id})
+    
+    return state, events
+
+def clone_state(state: GameState) -> GameState:
+    """Kopie měnitelných částí stavu (hráči, pasti, obsazenost); aréna zůstává sdílená"""
+    clone = copy.copy(state)
+    clone.players = [p.copy() for p in state.players]
+    clone.traps = [trap.copy() for trap in state.traps]
+    clone.occupancy = bytearray(state.occupancy)
+    return clone
+
+def commit_state(state: GameState, work: GameState):
+    """Přenese výsledek z pracovní kopie do původního stavu (zachová identitu objektů hráčů)"""
+    for player, updated in zip(state.players, work.players):
+        for field in Player.__slots__:
+            setattr(player, field, getattr(updated, field))
+    for trap, updated in zip(state.traps, work.traps):
+        trap.state, trap.arming, trap.remaining = updated.state, updated.arming, updated.remaining
+    state.occupancy[:] = work.occupancy
+    state.status = work.status
+    state.turn_player_id = work.turn_player_id
+    state.ap_remaining = work.ap_remaining
+    state.turn_number = work.turn_number
+    state.winner_id = work.winner_id
+
+def apply_turn(state: GameState, actions: List[Dict]) -> Tuple[GameState, List[Dict]]:
+    """
+    Provede seznam akcí jednoho hráče atomicky - buď projdou všechny, nebo se stav nezmění.
+    Akcí smí být nejvýše ap_remaining (+ závěrečný end_turn); akce po konci hry se ignorují.
+    Odmítnutí nese v ActionError.index pořadí akce, která neprošla.
+    """
+    if not actions or len(actions) > state.ap_remaining + 1:
+        raise ActionError("invalid_turn")
+    
+    work = clone_state(state)
+    events: List[Dict] = []
+    for index, action in enumerate(actions):
+        if work.status != "playing" and index > 0:
+            break
+        try:
+            _, action_events = apply(work, action)
+        except ActionError as e:
+            e.index = index
+            raise
+        events.extend(action_events)
+    
+    commit_state(state, work)
+    return state, events
@@ -0,0 +1,105 @@
+"""
+Rozesílání zpráv - jedna serializace na zprávu, fronta a zapisovač pro každé připojení
+"""
+import asyncio
+import logging
+from typing import Dict, Set, Union
+from fastapi import WebSocket
+
+import settings
+from codec import JSON, encode
+
+logger = logging.getLogger(__name__)
+
+class FanoutStats:
+    """Čítače rozesílání (hloubka front, zahozené zprávy, odpojení)"""
+    def __init__(self):
+        self.frames_queued = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.evictions = 0
+        self.send_errors = 0
+        self.heartbeat_timeouts = 0
+        self.connections: Set["Connection"] = set()
+
+    def to_dict(self) -> Dict:
+        depths = [conn.queue.qsize() for conn in self.connections]
+        return {
+            "connections": len(depths),
+            "queue_depth": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "frames_queued": self.frames_queued,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "evictions": self.evictions,
+            "send_errors": self.send_errors,
+            "heartbeat_timeouts": self.heartbeat_timeouts
+        }
+
+stats = FanoutStats()
+closing: Set[asyncio.Task] = set()  # Forced socket closes in flight - the loop keeps only weak references to tasks
+
+class Connection:
+    """WebSocket s omezenou odchozí frontou, kterou vyprazdňuje vlastní task"""
+    def __init__(self, websocket: WebSocket, max_queue: int = settings.SEND_QUEUE_MAX):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self.encoding = JSON  # Negotiated in join/reconnect
+        self.last_seen = asyncio.get_running_loop().time()  # Last frame received from the client
+        self.writer = asyncio.create_task(self._write_loop())
+        stats.connections.add(self)
+
+    def send(self, frame: Union[str, bytes]) -> bool:
+        """Zařadí již serializovanou zprávu; pomalého klienta při přetečení fronty odpojí"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            stats.frames_dropped += 1
+            stats.evictions += 1
+            logger.warning("Odchozí fronta přetekla (%d zpráv), klient odpojen", self.queue.qsize())
+            self.close(code=1013)
+            return False
+        stats.frames_queued += 1
+        return True
+
+    def send_message(self, message: Dict) -> bool:
+        """Odpověď jen tomuto klientovi - jde stejnou frontou, aby bylo zachováno pořadí"""
+        return self.send(encode(message, self.encoding))
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                if type(frame) is str:
+                    await self.websocket.send_text(frame)
+                else:
+                    await self.websocket.send_bytes(frame)
+                stats.frames_sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            stats.send_errors += 1
+            self.close()
+
+    def close(self, code: int = 1000):
+        """Ukončí zapisovač; při vynuceném odpojení zavře i socket"""
+        if self.closed:
+            return
+        self.closed = True
+        stats.connections.discard(self)
+        stats.frames_dropped += self.queue.qsize()
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        if code != 1000:
+            task = asyncio.create_task(self._close_socket(code))
+            closing.add(task)
+            task.add_done_callback(closing.discard)
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
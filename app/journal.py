@@ -0,0 +1,191 @@
+"""
+Žurnál místností - přijaté akce se připisují do append-only logu (JSON řádky), pravidelný
+snapshot log zkrátí. Zápis probíhá v dávkách mimo event loop; po restartu se místnosti
+obnoví z disku (poslední snapshot + přehrání krátkého konce logu) a hráči se vrátí přes token.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import engine
+import settings
+from arena import load_layout
+
+logger = logging.getLogger(__name__)
+
+# Record kinds (first item of every log line)
+SNAPSHOT = "s"
+ACTION = "a"
+TURN = "t"
+
+def encode_record(kind: str, payload) -> str:
+    return json.dumps([kind, payload], ensure_ascii=False, separators=(",", ":")) + "\n"
+
+def snapshot_room(room) -> Dict:
+    """Úplný stav místnosti včetně tokenů hráčů a verze stavu"""
+    return {
+        "room_id": room.room_id,
+        "arena": room.state.layout.name,
+        "state": room.state.to_dict(),
+        "tokens": room.player_tokens,
+        "seq": room.tracker.seq
+    }
+
+class Journal:
+    """Dávkový zapisovač žurnálu; bez adresáře (JOURNAL_DIR="") nic nezapisuje"""
+    def __init__(self, directory: str = settings.JOURNAL_DIR,
+                 snapshot_every: int = settings.JOURNAL_SNAPSHOT_EVERY,
+                 flush_interval: float = settings.JOURNAL_FLUSH_INTERVAL):
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.snapshot_every = snapshot_every
+        self.flush_interval = flush_interval
+        # room_id -> pending writes in order: ("append" | "snapshot" | "delete", line)
+        self.pending: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        self.records_since_snapshot: Dict[str, int] = {}
+        self.flusher: Optional[asyncio.Task] = None
+
+    def path(self, room_id: str) -> str:
+        return os.path.join(self.directory, room_id + ".log")
+
+    # Recording (called from the event loop, never blocks)
+
+    def snapshot(self, room):
+        """Zapíše úplný stav místnosti; starší záznamy v logu tím zaniknou"""
+        if not self.enabled:
+            return
+        self.pending.setdefault(room.room_id, []).append(("snapshot", encode_record(SNAPSHOT, snapshot_room(room))))
+        self.records_since_snapshot[room.room_id] = 0
+
+    def _append(self, room, record: str):
+        if not self.enabled:
+            return
+        count = self.records_since_snapshot.get(room.room_id, 0) + 1
+        if count >= self.snapshot_every:
+            self.snapshot(room)
+            return
+        self.records_since_snapshot[room.room_id] = count
+        self.pending.setdefault(room.room_id, []).append(("append", record))
+
+    def record_action(self, room, action: Dict):
+        """Přijatá akce enginu (už aplikovaná na stav místnosti)"""
+        self._append(room, encode_record(ACTION, action))
+
+    def record_turn(self, room, actions: List[Dict]):
+        """Přijatý celý tah ze submit_turn"""
+        self._append(room, encode_record(TURN, actions))
+
+    def drop(self, room_id: str):
+        """Místnost zanikla - smaže její log"""
+        if not self.enabled:
+            return
+        self.pending[room_id] = [("delete", None)]
+        self.records_since_snapshot.pop(room_id, None)
+
+    # Writing (worker thread)
+
+    def _write_batch(self, batch: Dict[str, List[Tuple[str, Optional[str]]]]):
+        for room_id, writes in batch.items():
+            path = self.path(room_id)
+            try:
+                for op, record in writes:
+                    if op == "delete":
+                        if os.path.exists(path):
+                            os.remove(path)
+                    elif op == "snapshot":
+                        # Snapshot replaces the whole log atomically
+                        tmp = path + ".tmp"
+                        with open(tmp, "w", encoding="utf-8") as f:
+                            f.write(record)
+                        os.replace(tmp, path)
+                    else:
+                        with open(path, "a", encoding="utf-8") as f:
+                            f.write(record)
+            except OSError as e:
+                logger.error("Zápis žurnálu místnosti %s selhal: %s", room_id, e)
+
+    def _take_batch(self) -> Dict[str, List[Tuple[str, Optional[str]]]]:
+        batch, self.pending = self.pending, {}
+        for room_id, writes in batch.items():
+            # Only writes after the last snapshot/delete matter
+            for i in range(len(writes) - 1, -1, -1):
+                if writes[i][0] != "append":
+                    batch[room_id] = writes[i:]
+                    break
+        return batch
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.pending:
+                await asyncio.to_thread(self._write_batch, self._take_batch())
+
+    def start(self):
+        if self.enabled and self.flusher is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Zastaví zapisovač a dopíše zbývající záznamy"""
+        if self.flusher is not None:
+            self.flusher.cancel()
+            self.flusher = None
+        if self.pending:
+            await asyncio.to_thread(self._write_batch, self._take_batch())
+
+    # Recovery
+
+    def restore(self, registry) -> int:
+        """Obnoví místnosti z logů do registru; vrací počet obnovených místností"""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return 0
+        restored = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".log"):
+                continue
+            if registry.cluster is not None and not registry.cluster.owns(name[:-len(".log")]):
+                continue  # Shared directory - the room belongs to another worker
+            try:
+                self._restore_room(registry, os.path.join(self.directory, name))
+            except (OSError, ValueError, KeyError, IndexError, engine.ActionError) as e:
+                logger.error("Místnost z žurnálu %s nelze obnovit: %s", name, e)
+                continue
+            restored += 1
+        return restored
+
+    def _restore_room(self, registry, path: str):
+        """Poslední snapshot + přehrání akcí za ním"""
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Torn last line after a crash mid-write
+                logger.warning("Poškozený záznam v %s přeskočen", path)
+        if not records or records[0][0] != SNAPSHOT:
+            raise ValueError("log nezačíná snapshotem")
+
+        snapshot = records[0][1]
+        if snapshot["arena"] != registry.layout.name:
+            raise ValueError(f"jiná aréna ({snapshot['arena']})")
+        state = engine.GameState.from_dict(snapshot["state"], load_layout(snapshot["arena"]))
+        for kind, payload in records[1:]:
+            if kind == ACTION:
+                engine.apply(state, payload)
+            elif kind == TURN:
+                engine.apply_turn(state, payload)
+        for player in state.players:
+            # Bots play on without a connection
+            player.connected = bool(player.bot)
+            if state.status != "playing" and not player.connected:
+                # A lobby must not start a match against somebody who has not come back yet
+                player.ready = False
+
+        room = registry.restore_room(snapshot["room_id"], state, snapshot["tokens"])
+        # Every replayed record produced at most one delta - keeps seq monotonic for clients
+        room.tracker.seq = snapshot["seq"] + len(records) - 1
+        self.records_since_snapshot[room.room_id] = len(records) - 1
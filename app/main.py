@@ -1,65 +1,92 @@
 """
 FastAPI aplikace pro Robot Arena - síťová tahová hra 1v1
 """
-import json
-import os
+import asyncio
 import random
+import time
 import uuid
-from typing import Dict, List, Optional
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 import uvicorn
 
+import bot
+import codec
+import engine
+import metrics
+import protocol
+import settings
+from assets import AssetFiles, AssetPipeline
+from engine import CATALOG
+from cluster import MATCHMAKING_KEY, Cluster, Redirect, token_room
+from delta import StateTracker
+from fanout import Connection, stats as fanout_stats
+from journal import Journal
+from matchmaking import Matchmaker, Ratings, Ticket
+from protocol import ClientError
+from ratelimit import new_limiter
+from replay import ReplayStore
+from rooms import Room, RoomRegistry, new_token
+from timers import Timer, TimerWheel
+
 app = FastAPI(title="Robot Arena")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="/app/static"), name="static")
+# Static files - fingerprinted, precompressed copies built on startup (a no-op when the sources are unchanged)
+assets = AssetPipeline()
+assets.build()
+app.mount("/static", AssetFiles(assets), name="static")
 
 # Templates
 templates = Jinja2Templates(directory="/app/templates")
+templates.env.globals["asset"] = assets.url
+templates.env.globals["asset_manifest"] = assets.client_manifest
+
+cluster = Cluster()
+registry = RoomRegistry(cluster=cluster)
+journal = Journal()
+replays = ReplayStore()
+matchmaker = Matchmaker()
+ratings = Ratings(backend=cluster.backend)
+bots = bot.BotPool()
+bot_turns: Dict[str, asyncio.Task] = {}  # room_id -> bot turn being searched
+timers = TimerWheel()
+grace_timers: Dict[str, Timer] = {}  # player_id -> reconnect deadline (disconnected mid-game, or absent after a restart)
+timer_tasks: Set[asyncio.Task] = set()  # Coroutines started by timer callbacks - the loop keeps only weak references
+
+@app.on_event("startup")
+async def startup():
+    if cluster.enabled:
+        # Open rooms this worker published before a restart are gone (restored ones are published again)
+        cluster.backend.clear_worker(cluster.worker_id)
+    # Rooms of matches interrupted by a restart - players come back with their tokens
+    journal.restore(registry)
+    journal.start()
+    # Their replays start from the restored state
+    for room in registry.rooms.values():
+        if room.state.status == "playing":
+            replays.start_match(room)
+    bots.start()
+    timers.start()
+    # Every message type is exported from the first scrape, not only after its first use
+    for msg_type in HANDLERS:
+        metrics.message_duration.labels(msg_type)
+    for room in registry.rooms.values():
+        schedule_bot_turn(room)
+        schedule_turn_deadline(room)
+        # Nobody is connected after a restart - players get the usual grace period to come back,
+        # lobbies and finished rooms included, otherwise their absent players would stay there forever
+        for player in room.state.players:
+            if not player.connected:
+                start_grace_period(room, player.player_id)
+    matchmaker.start(start_matched_room, lambda: registry.max_rooms - len(registry.rooms))
 
-# Load seed data
-def load_seed_data():
-    seed_path = "/app/data/seed.json"
-    with open(seed_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-SEED_DATA = load_seed_data()
-
-# Game state
-class GameState:
-    def __init__(self):
-        self.status = "waiting"  # waiting, playing, finished
-        self.players: List[Dict] = []
-        self.turn_player_id: Optional[str] = None
-        self.ap_remaining = 0
-        self.turn_number = 0
-        self.traps_runtime: Dict[str, Dict] = {}
-        self.rng_seed = random.randint(1, 1000000)
-        self.winner_id: Optional[str] = None
-    
-    def to_dict(self):
-        return {
-            "status": self.status,
-            "players": self.players,
-            "turn_player_id": self.turn_player_id,
-            "ap_remaining": self.ap_remaining,
-            "turn_number": self.turn_number,
-            "traps_runtime": self.traps_runtime,
-            "rng_seed": self.rng_seed,
-            "winner_id": self.winner_id
-        }
-
-game_state = GameState()
-active_connections: Dict[str, WebSocket] = {}
-player_tokens: Dict[str, str] = {}  # player_id -> token
-token_players: Dict[str, str] = {}  # token -> player_id
-
-# Grid settings
-GRID_COLS = 18
-GRID_ROWS = 12
+@app.on_event("shutdown")
+async def shutdown():
+    matchmaker.stop()
+    bots.stop()
+    timers.stop()
+    await journal.stop()
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -69,562 +96,771 @@ async def index(request: Request):
 async def health():
     return {"status": "ok"}
 
+@app.get("/stats")
+async def stats():
+    return {
+        "worker": cluster.worker_id,
+        "workers": cluster.workers,
+        "rooms": len(registry.rooms),
+        "open_rooms": len(registry.open_rooms),
+        "spectators": sum(len(room.feed.viewers) for room in registry.rooms.values() if room.feed is not None),
+        "seed_etag": CATALOG.etag,
+        "matchmaking": matchmaker.stats(),
+        "timers": timers.stats(),
+        "fanout": fanout_stats.to_dict()
+    }
+
+def rooms_by_status() -> Dict[str, int]:
+    counts = {"waiting": 0, "playing": 0, "finished": 0}
+    for room in registry.rooms.values():
+        counts[room.state.status] = counts.get(room.state.status, 0) + 1
+    return counts
+
+metrics.registry.gauge("arena_connections", "Otevřená WebSocket spojení", lambda: len(fanout_stats.connections))
+metrics.registry.gauge("arena_rooms", "Místnosti podle stavu hry", rooms_by_status, "status")
+metrics.registry.gauge("arena_spectators", "Připojení diváci",
+                       lambda: sum(len(room.feed.viewers) for room in registry.rooms.values() if room.feed is not None))
+metrics.registry.gauge("arena_matchmaking_queued", "Hráči ve frontě matchmakingu", lambda: len(matchmaker.tickets))
+metrics.registry.gauge("arena_timers_pending", "Naplánované časovače", lambda: timers.size)
+metrics.registry.gauge("arena_frames_sent_total", "Odeslané rámce", lambda: fanout_stats.frames_sent, kind="counter")
+metrics.registry.gauge("arena_frames_dropped_total", "Zahozené rámce", lambda: fanout_stats.frames_dropped, kind="counter")
+metrics.registry.gauge("arena_evictions_total", "Klienti odpojení pro přetečení fronty",
+                       lambda: fanout_stats.evictions, kind="counter")
+metrics.registry.gauge("arena_heartbeat_timeouts_total", "Klienti odpojení pro mlčení",
+                       lambda: fanout_stats.heartbeat_timeouts, kind="counter")
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Plain def - Starlette runs these in its threadpool, loading a replay decodes the file and re-simulates the match
+@app.get("/replays")
+def list_replays(limit: int = 50):
+    return {"replays": replays.list(limit)}
+
+def get_replay(match_id: str):
+    replay = replays.load(match_id)
+    if replay is None:
+        raise HTTPException(status_code=404, detail="Záznam nenalezen")
+    return replay
+
+@app.get("/replays/{match_id}")
+def replay_summary(match_id: str):
+    return get_replay(match_id).summary()
+
+@app.get("/replays/{match_id}/state")
+def replay_state(match_id: str, turn: int = 1):
+    """Stav zápasu na začátku tahu turn (stejný tvar jako game_state)"""
+    state, _ = get_replay(match_id).state_at(turn)
+    return StateTracker().full(state)
+
+@app.get("/replays/{match_id}/frames")
+def replay_frames(match_id: str, turn: int = 1):
+    """Přehrání od tahu turn jako NDJSON - seed, game_state, game_delta..., game_over"""
+    replay = get_replay(match_id)
+
+    def lines():
+        yield CATALOG.frames[codec.JSON] + "\n"
+        for message in replay.frames(turn):
+            yield codec.encode(message) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+class Session:
+    """Stav jednoho WebSocket spojení - připojení, hráč a jeho místnost"""
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.player_id: Optional[str] = None
+        self.token: Optional[str] = None
+        self.room: Optional[Room] = None
+        self.spectating: Optional[Room] = None
+        self.ticket: Optional[Ticket] = None  # waiting in the matchmaking queue
+
+    def require_player(self) -> engine.Player:
+        """Hráč tohoto spojení; bez připojení ke hře ClientError"""
+        player = self.room.get_player(self.player_id) if self.player_id else None
+        if not player:
+            raise ClientError("not_joined")
+        return player
+
+# Message type -> handler(session, message); messages arrive already validated by protocol.decode
+HANDLERS: Dict[str, Callable[[Session, Dict], Awaitable[None]]] = {}
+
+def handles(msg_type: str):
+    def register(handler):
+        HANDLERS[msg_type] = handler
+        return handler
+    return register
+
+def player_name(msg: Dict) -> str:
+    name = msg["name"].strip()
+    if not name or len(name) > 20:
+        raise ClientError("invalid_name")
+    return name
+
+@handles("join")
+async def on_join(session: Session, msg: Dict):
+    # A second player on the same socket would orphan the first one in room.connections
+    if session.player_id:
+        raise ClientError("already_joined")
+    if session.ticket:
+        raise ClientError("already_queued")
+    name = player_name(msg)
+    
+    # Join requested room or get the first room with a free slot
+    room_id = msg.get("room_id")
+    if room_id:
+        if not cluster.owns(room_id):
+            raise Redirect(cluster.owner(room_id))
+        room = registry.get(room_id)
+        if not room:
+            raise ClientError("room_not_found")
+    else:
+        room = registry.find_open_room(create=False)
+        if room is None and cluster.enabled and not msg.get("redirected"):
+            # Somebody may be waiting for an opponent on another worker
+            elsewhere = cluster.backend.find_open_room(cluster.worker_id)
+            if elsewhere is not None:
+                raise Redirect(elsewhere[1])
+        room = room or registry.create_room()
+        if not room:
+            raise ClientError("server_full")
+    
+    # Check if lobby is full
+    if not room.is_open():
+        raise ClientError("lobby_full")
+    
+    # Check if name is already taken
+    if any(p.name == name for p in room.state.players):
+        raise ClientError("name_taken")
+    
+    # A spectator becomes a player - the feed would keep sending the watched room
+    if session.spectating:
+        session.spectating.feed.unsubscribe(session.conn)
+        session.spectating = None
+    
+    # Create player
+    session.room = room
+    session.player_id = str(uuid.uuid4())
+    player = engine.new_player(session.player_id, name)
+    session.token = registry.add_player(room, player, session.conn)
+    
+    send_handshake(session.conn, {
+        "type": "join_ok",
+        "player_id": session.player_id,
+        "token": session.token,
+        "room_id": room.room_id
+    }, msg.get("encoding", codec.JSON))
+    
+    send_seed(session.conn, msg.get("seed_etag"))
+    
+    # Send lobby state
+    await broadcast_lobby_state(room)
+    journal.snapshot(room)
+
+@handles("reconnect")
+async def on_reconnect(session: Session, msg: Dict):
+    room, player_id = registry.resolve_token(msg["token"])
+    if not room:
+        room_id = token_room(msg["token"])
+        if room_id is not None and not cluster.owns(room_id):
+            raise Redirect(cluster.owner(room_id))
+        if room_id is not None and open_reserved_room(room_id):
+            room, player_id = registry.resolve_token(msg["token"])
+    if not room:
+        raise ClientError("invalid_token")
+    
+    player = room.get_player(player_id)
+    if not player:
+        raise ClientError("player_not_found")
+    
+    session.room = room
+    session.player_id = player_id
+    session.token = msg["token"]
+    # A flaky client often reconnects before the server noticed the old socket dropped
+    was_connected = player.connected
+    player.connected = True
+    room.connections[player_id] = session.conn
+    grace_timer = grace_timers.pop(player_id, None)
+    if grace_timer is not None:
+        grace_timer.cancel()
+    
+    missed = None
+    if room.state.status == "playing" and msg.get("last_seq") is not None:
+        missed = room.missed_since(msg["last_seq"])
+    
+    send_handshake(session.conn, {
+        "type": "reconnect_ok",
+        "player_id": player_id,
+        "room_id": room.room_id,
+        "resumed": missed is not None  # Client keeps its state and applies only the missed deltas
+    }, msg.get("encoding", codec.JSON))
+    
+    send_seed(session.conn, msg.get("seed_etag"))
+    
+    if room.state.status == "playing":
+        if missed is None:
+            # Gap already evicted from the ring buffer (or a client without state) - full snapshot
+            session.conn.send_message(room.tracker.full(room.state))
+        for message in missed or ():
+            session.conn.send_message(message)
+        if not was_connected:
+            # Everyone (this client included) gets the connected flag as a regular delta
+            await broadcast_game_state(room)
+    elif was_connected:
+        session.conn.send_message(lobby_message(room))
+    else:
+        await broadcast_lobby_state(room)
+
+@handles("select_loadout")
+async def on_select_loadout(session: Session, msg: Dict):
+    player = session.require_player()
+    
+    # Validate robot and weapon
+    robot = CATALOG.robot(msg["robot_id"])
+    if not robot or not CATALOG.weapon(msg["weapon_id"]):
+        raise ClientError("invalid_loadout")
+    
+    player.robot_id = msg["robot_id"]
+    player.weapon_id = msg["weapon_id"]
+    player.hp = robot["hpMax"]
+    
+    await broadcast_lobby_state(session.room)
+    journal.snapshot(session.room)
+
+@handles("set_ready")
+async def on_set_ready(session: Session, msg: Dict):
+    player = session.require_player()
+    if not player.robot_id or not player.weapon_id:
+        raise ClientError("loadout_required")
+    
+    room = session.room
+    player.ready = msg.get("ready", False)
+    await broadcast_lobby_state(room)
+    
+    # Check if both players are ready
+    state = room.state
+    if len(state.players) == 2 and all(p.ready for p in state.players):
+        engine.start_game(state)
+        registry.refresh(room)
+        # New match - everyone gets a full snapshot including trap zones
+        room.tracker.reset()
+        replays.start_match(room)
+        await broadcast_game_state(room)
+    
+    journal.snapshot(room)
+
+@handles("add_bot")
+async def on_add_bot(session: Session, msg: Dict):
+    # Fill the free slot with an AI opponent - always ready, plays from the bot pool
+    session.require_player()
+    if not bots.running:
+        # BOT_WORKERS=0 - a bot would only ever end its turns
+        raise ClientError("bots_disabled")
+    room = session.room
+    if not room.is_open():
+        raise ClientError("lobby_full")
+    
+    level = msg.get("level", bot.DEFAULT_LEVEL)
+    robot = random.choice(CATALOG.robots)
+    weapon = random.choice(CATALOG.weapons)
+    player = engine.new_player(str(uuid.uuid4()), f"Bot ({level})", robot["id"], weapon["id"])
+    player.bot = level
+    player.ready = True
+    registry.add_bot(room, player)
+    
+    await broadcast_lobby_state(room)
+    journal.snapshot(room)
+
+@handles("action_move")
+async def on_action_move(session: Session, msg: Dict):
+    if not session.player_id:
+        return
+    await run_action(session.room, session.conn, {
+        "type": "move",
+        "player_id": session.player_id,
+        "to_x": msg["to_x"],
+        "to_y": msg["to_y"]
+    }, msg.get("client_action_id"))
+
+@handles("action_attack")
+async def on_action_attack(session: Session, msg: Dict):
+    if not session.player_id:
+        return
+    await run_action(session.room, session.conn, {
+        "type": "attack",
+        "player_id": session.player_id,
+        "target_player_id": msg["target_player_id"]
+    }, msg.get("client_action_id"))
+
+@handles("submit_turn")
+async def on_submit_turn(session: Session, msg: Dict):
+    # Whole turn in one message - applied atomically, one broadcast
+    if not session.player_id:
+        return
+    await run_turn(session.room, session.conn, [
+        {**action, "player_id": session.player_id} for action in msg["actions"]
+    ], msg.get("client_turn_id"))
+
+@handles("end_turn")
+async def on_end_turn(session: Session, msg: Dict):
+    if not session.player_id:
+        return
+    await run_action(session.room, session.conn, {"type": "end_turn", "player_id": session.player_id})
+
+@handles("spectate")
+async def on_spectate(session: Session, msg: Dict):
+    # Read-only subscription to a room's delayed stream
+    if session.player_id:
+        raise ClientError("already_joined")
+    if session.ticket:
+        raise ClientError("already_queued")
+    if not cluster.owns(msg["room_id"]):
+        raise Redirect(cluster.owner(msg["room_id"]))
+    room = registry.get(msg["room_id"])
+    if not room:
+        raise ClientError("room_not_found")
+    feed = room.spectator_feed()
+    if feed.is_full():
+        raise ClientError("spectators_full")
+    
+    if session.spectating:
+        session.spectating.feed.unsubscribe(session.conn)
+    session.spectating = room
+    send_handshake(session.conn, {
+        "type": "spectate_ok",
+        "room_id": room.room_id,
+        "delay": feed.delay,
+        "viewers": len(feed.viewers) + 1
+    }, msg.get("encoding", codec.JSON))
+    state_message = room.tracker.full(room.state) if room.state.status != "waiting" else None
+    feed.subscribe(session.conn, lobby_message(room), state_message)
+
+@handles("queue")
+async def on_queue(session: Session, msg: Dict):
+    # Wait for an opponent of similar rating instead of picking a room
+    if session.player_id:
+        raise ClientError("already_joined")
+    if session.ticket:
+        raise ClientError("already_queued")
+    name = player_name(msg)
+    if not cluster.owns(MATCHMAKING_KEY):
+        # One queue for the whole cluster, so everybody sees every opponent
+        raise Redirect(cluster.owner(MATCHMAKING_KEY))
+    if session.spectating:
+        session.spectating.feed.unsubscribe(session.conn)
+        session.spectating = None
+    
+    rating = ratings.get(name)
+    session.ticket = matchmaker.enqueue(name, rating, asyncio.get_running_loop().time(), session)
+    send_handshake(session.conn, {
+        "type": "queued",
+        "rating": rating,
+        "queued": len(matchmaker)
+    }, msg.get("encoding", codec.JSON))
+    send_seed(session.conn, msg.get("seed_etag"))
+
+@handles("leave_queue")
+async def on_leave_queue(session: Session, msg: Dict):
+    if session.ticket:
+        matchmaker.remove(session.ticket)
+        session.ticket = None
+
+async def start_matched_room(first: Ticket, second: Ticket):
+    """Založí místnost pro dvojici z fronty; nižší rating dostane první spawn a první tah"""
+    # Matches are spread over the workers - the room lives wherever a random id hashes to
+    room_id = uuid.uuid4().hex[:8]
+    if not cluster.owns(room_id):
+        reserve_remote_room(room_id, first, second)
+        return
+    room = registry.create_room()
+    if room is None:
+        for ticket in (first, second):
+            ticket.payload.ticket = None
+            ticket.payload.conn.send_message(ClientError("server_full").to_message())
+        return
+    
+    tickets = sorted((first, second), key=lambda t: t.rating)
+    for ticket in tickets:
+        session = ticket.payload
+        session.ticket = None
+        session.room = room
+        session.player_id = str(uuid.uuid4())
+        player = engine.new_player(session.player_id, ticket.name)
+        session.token = registry.add_player(room, player, session.conn)
+    
+    now = asyncio.get_running_loop().time()
+    for spawn, ticket in enumerate(tickets):
+        opponent = tickets[1 - spawn]
+        session = ticket.payload
+        session.conn.send_message({
+            "type": "match_found",
+            "room_id": room.room_id,
+            "player_id": session.player_id,
+            "token": session.token,
+            "spawn": spawn,
+            "opponent": {"name": opponent.name, "rating": opponent.rating},
+            "waited": round(now - ticket.enqueued_at, 3)
+        })
+    
+    await broadcast_lobby_state(room)
+    journal.snapshot(room)
+
+def reserve_remote_room(room_id: str, first: Ticket, second: Ticket):
+    """Dvojice hraje na jiném workeru - místnost se tam založí z rezervace, až se první z hráčů připojí"""
+    tickets = sorted((first, second), key=lambda t: t.rating)
+    players = [
+        {"player_id": str(uuid.uuid4()), "name": ticket.name, "token": new_token(room_id)}
+        for ticket in tickets
+    ]
+    cluster.backend.reserve(room_id, players)
+    worker = cluster.owner(room_id)
+    now = asyncio.get_running_loop().time()
+    for spawn, (ticket, player) in enumerate(zip(tickets, players)):
+        opponent = tickets[1 - spawn]
+        session = ticket.payload
+        session.ticket = None
+        session.conn.send_message({
+            "type": "match_found",
+            "room_id": room_id,
+            "player_id": player["player_id"],
+            "token": player["token"],
+            "spawn": spawn,
+            "opponent": {"name": opponent.name, "rating": opponent.rating},
+            "waited": round(now - ticket.enqueued_at, 3),
+            "url": cluster.url(worker, session.conn.websocket.headers.get("host"))  # Reconnect there with the token
+        })
+
+def open_reserved_room(room_id: str) -> Optional[Room]:
+    """Místnost spárovaná matchmakingem jiného workeru; hráči nejsou připojeni, dokud nepřijdou s tokenem"""
+    players = cluster.backend.claim(room_id) if cluster.enabled else None
+    if players is None or registry.get(room_id) is not None:
+        return None
+    state = engine.GameState(registry.layout)
+    state.players = [engine.new_player(player["player_id"], player["name"]) for player in players]
+    for player in state.players:
+        player.connected = False
+    room = registry.restore_room(room_id, state, {player["player_id"]: player["token"] for player in players})
+    # Whoever does not show up within the grace period leaves the lobby
+    for player in state.players:
+        start_grace_period(room, player.player_id)
+    journal.snapshot(room)
+    return room
+
+@handles("pong")
+async def on_pong(session: Session, msg: Dict):
+    # Liveness is tracked for every received frame, nothing else to do
+    pass
+
+@handles("resync")
+async def on_resync(session: Session, msg: Dict):
+    # Client detected a gap in delta sequence numbers
+    if not session.player_id or session.room.state.status == "waiting":
+        return
+    session.conn.send_message(session.room.tracker.full(session.room.state))
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    player_id = None
-    token = None
+    conn = Connection(websocket)
+    session = Session(conn)
+    timers.schedule(settings.HEARTBEAT_INTERVAL, heartbeat, conn)
+    loop = asyncio.get_running_loop()
+    limiter = new_limiter(loop.time())
     
     try:
         while True:
-            data = await websocket.receive_json()
-            msg_type = data.get("type")
-            
-            if msg_type == "join":
-                name = data.get("name", "").strip()
-                if not name or len(name) > 20:
-                    await websocket.send_json({"type": "error", "message": "Neplatné jméno"})
-                    continue
-                
-                # Check if lobby is full
-                if len(game_state.players) >= 2:
-                    await websocket.send_json({"type": "error", "message": "Lobby je plné (max 2 hráči)"})
-                    continue
-                
-                # Check if name is already taken
-                if any(p["name"] == name for p in game_state.players):
-                    await websocket.send_json({"type": "error", "message": "Jméno je již obsazené"})
-                    continue
-                
-                # Create player
-                player_id = str(uuid.uuid4())
-                token = str(uuid.uuid4())
-                
-                player = {
-                    "player_id": player_id,
-                    "name": name,
-                    "connected": True,
-                    "robot_id": None,
-                    "weapon_id": None,
-                    "hp": 0,
-                    "pos": {"x": 0, "y": 0},
-                    "ready": False
-                }
-                
-                game_state.players.append(player)
-                active_connections[player_id] = websocket
-                player_tokens[player_id] = token
-                token_players[token] = player_id
-                
-                await websocket.send_json({
-                    "type": "join_ok",
-                    "player_id": player_id,
-                    "token": token
-                })
-                
-                # Send seed data
-                await websocket.send_json({
-                    "type": "seed",
-                    "robots": SEED_DATA["robots"],
-                    "weapons": SEED_DATA["weapons"]
-                })
-                
-                # Send lobby state
-                await broadcast_lobby_state()
-            
-            elif msg_type == "reconnect":
-                token = data.get("token")
-                if not token or token not in token_players:
-                    await websocket.send_json({"type": "error", "message": "Neplatný token"})
-                    continue
-                
-                player_id = token_players[token]
-                player = next((p for p in game_state.players if p["player_id"] == player_id), None)
-                
-                if not player:
-                    await websocket.send_json({"type": "error", "message": "Hráč nenalezen"})
-                    continue
-                
-                player["connected"] = True
-                active_connections[player_id] = websocket
-                
-                await websocket.send_json({
-                    "type": "reconnect_ok",
-                    "player_id": player_id
-                })
-                
-                # Send seed data
-                await websocket.send_json({
-                    "type": "seed",
-                    "robots": SEED_DATA["robots"],
-                    "weapons": SEED_DATA["weapons"]
-                })
-                
-                # Send current state
-                if game_state.status == "playing":
-                    await websocket.send_json({
-                        "type": "game_state",
-                        **game_state.to_dict()
-                    })
-                else:
-                    await broadcast_lobby_state()
-            
-            elif msg_type == "select_loadout":
-                if not player_id:
-                    await websocket.send_json({"type": "error", "message": "Nejste připojeni"})
-                    continue
-                
-                robot_id = data.get("robot_id")
-                weapon_id = data.get("weapon_id")
-                
-                player = next((p for p in game_state.players if p["player_id"] == player_id), None)
-                if not player:
-                    continue
-                
-                # Validate robot and weapon
-                robot = next((r for r in SEED_DATA["robots"] if r["id"] == robot_id), None)
-                weapon = next((w for w in SEED_DATA["weapons"] if w["id"] == weapon_id), None)
-                
-                if not robot or not weapon:
-                    await websocket.send_json({"type": "error", "message": "Neplatný robot nebo zbraň"})
-                    continue
-                
-                player["robot_id"] = robot_id
-                player["weapon_id"] = weapon_id
-                player["hp"] = robot["hpMax"]
-                
-                await broadcast_lobby_state()
-            
-            elif msg_type == "set_ready":
-                if not player_id:
-                    await websocket.send_json({"type": "error", "message": "Nejste připojeni"})
-                    continue
-                
-                player = next((p for p in game_state.players if p["player_id"] == player_id), None)
-                if not player:
-                    continue
-                
-                if not player["robot_id"] or not player["weapon_id"]:
-                    await websocket.send_json({"type": "error", "message": "Nejprve vyberte robota a zbraň"})
-                    continue
-                
-                player["ready"] = data.get("ready", False)
-                await broadcast_lobby_state()
-                
-                # Check if both players are ready
-                if len(game_state.players) == 2 and all(p["ready"] for p in game_state.players):
-                    start_game()
-                    await broadcast_game_state()
-            
-            elif msg_type == "action_move":
-                if not player_id:
-                    continue
-                
-                if game_state.status != "playing":
-                    await websocket.send_json({"type": "error", "message": "Hra neprobíhá"})
-                    continue
-                
-                if game_state.turn_player_id != player_id:
-                    await websocket.send_json({"type": "error", "message": "Není váš tah"})
-                    continue
-                
-                if game_state.ap_remaining <= 0:
-                    await websocket.send_json({"type": "error", "message": "Nemáte žádné akce"})
-                    continue
-                
-                to_x = data.get("to_x")
-                to_y = data.get("to_y")
-                client_action_id = data.get("client_action_id")
-                
-                player = next((p for p in game_state.players if p["player_id"] == player_id), None)
-                if not player:
-                    continue
-                
-                # Validate move
-                if not is_valid_move(player["pos"], {"x": to_x, "y": to_y}):
-                    await websocket.send_json({
-                        "type": "action_rejected",
-                        "client_action_id": client_action_id,
-                        "reason": "Neplatný pohyb",
-                        "authoritative_pos": player["pos"]
-                    })
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            if conn.closed:
+                # Evicted or disconnected for flooding - frames still in flight are not processed
+                continue
+            conn.last_seen = now = loop.time()
+            started = time.perf_counter()
+            msg = None
+            try:
+                # Flood check before parsing; per-type limits before the handler touches any state
+                if limiter is not None and not limiter.allow_frame(now):
+                    metrics.rate_limited.labels("frame").inc()
+                    raise ClientError("rate_limited")
+                # Text frames are JSON, binary frames MessagePack
+                raw = frame["text"] if frame.get("text") is not None else frame.get("bytes", b"")
+                msg = protocol.decode(raw)
+                if limiter is not None and not limiter.allow(msg["type"], now):
+                    metrics.rate_limited.labels(msg["type"]).inc()
+                    raise ClientError("rate_limited")
+                await HANDLERS[msg["type"]](session, msg)
+            except ClientError as e:
+                metrics.client_errors.labels(e.code).inc()
+                if e.code == "rate_limited" and limiter.strike(now):
+                    metrics.rate_limit_disconnects.inc()
+                    conn.close(code=1008)
                     continue
-                
-                # Execute move
-                player["pos"] = {"x": to_x, "y": to_y}
-                
-                # Check if player moved to spawn zone and heal if no enemy nearby
-                heal_on_spawn(player, game_state.players)
-                
-                game_state.ap_remaining -= 1
-                
-                await broadcast_game_state()
-            
-            elif msg_type == "action_attack":
-                if not player_id:
-                    continue
-                
-                if game_state.status != "playing":
-                    await websocket.send_json({"type": "error", "message": "Hra neprobíhá"})
-                    continue
-                
-                if game_state.turn_player_id != player_id:
-                    await websocket.send_json({"type": "error", "message": "Není váš tah"})
-                    continue
-                
-                if game_state.ap_remaining <= 0:
-                    await websocket.send_json({"type": "error", "message": "Nemáte žádné akce"})
-                    continue
-                
-                target_player_id = data.get("target_player_id")
-                client_action_id = data.get("client_action_id")
-                
-                attacker = next((p for p in game_state.players if p["player_id"] == player_id), None)
-                target = next((p for p in game_state.players if p["player_id"] == target_player_id), None)
-                
-                if not attacker or not target:
-                    await websocket.send_json({"type": "error", "message": "Neplatný cíl"})
-                    continue
-                
-                # Validate attack
-                if not is_valid_attack(attacker, target):
-                    await websocket.send_json({
-                        "type": "action_rejected",
-                        "client_action_id": client_action_id,
-                        "reason": "Útok mimo dosah nebo neplatný směr",
-                        "authoritative_pos": attacker["pos"]
-                    })
-                    continue
-                
-                # Execute attack
-                weapon = next((w for w in SEED_DATA["weapons"] if w["id"] == attacker["weapon_id"]), None)
-                if weapon:
-                    target["hp"] = max(0, target["hp"] - weapon["damage"])
-                
-                game_state.ap_remaining -= 1
-                
-                # Check for game over
-                if target["hp"] <= 0:
-                    game_state.status = "finished"
-                    game_state.winner_id = attacker["player_id"]
-                    await broadcast_game_over()
-                
-                await broadcast_game_state()
-            
-            elif msg_type == "end_turn":
-                if not player_id:
-                    continue
-                
-                if game_state.status != "playing":
-                    continue
-                
-                if game_state.turn_player_id != player_id:
-                    continue
-                
-                # Process traps
-                process_traps()
-                
-                # Check for game over after traps
-                if game_state.status == "finished":
-                    await broadcast_game_over()
-                    await broadcast_game_state()
-                    continue
-                
-                # Next turn
-                next_turn()
-                await broadcast_game_state()
+                conn.send_message(e.to_message())
+            except Redirect as e:
+                metrics.redirects.inc()
+                conn.send_message(cluster.redirect_message(e.worker, websocket.headers.get("host")))
+            if msg is not None:
+                metrics.message_duration.labels(msg["type"]).observe(time.perf_counter() - started)
     
     except WebSocketDisconnect:
-        if player_id:
-            player = next((p for p in game_state.players if p["player_id"] == player_id), None)
-            if player:
+        if session.spectating:
+            session.spectating.feed.unsubscribe(conn)
+        if session.ticket:
+            matchmaker.remove(session.ticket)
+        room, player_id = session.room, session.player_id
+        if player_id and room:
+            player = room.get_player(player_id)
+            # Ignore sockets that were already replaced by a reconnect
+            if player and room.connections.get(player_id) is conn:
                 # If game is not playing, remove player completely
-                if game_state.status != "playing":
-                    game_state.players = [p for p in game_state.players if p["player_id"] != player_id]
-                    # Clean up tokens
-                    if player_id in player_tokens:
-                        token = player_tokens[player_id]
-                        del player_tokens[player_id]
-                        if token in token_players:
-                            del token_players[token]
+                if room.state.status != "playing":
+                    registry.remove_player(room, player_id)
+                    if room.room_id in registry.rooms:
+                        await broadcast_lobby_state(room)
+                else:
+                    # During game, mark as disconnected - the player has RECONNECT_GRACE to come back
+                    player.connected = False
+                    del room.connections[player_id]
+                    start_grace_period(room, player_id)
+                    await broadcast_game_state(room)
+                if room.room_id in registry.rooms:
+                    journal.snapshot(room)
                 else:
-                    # During game, just mark as disconnected (for potential reconnect)
-                    player["connected"] = False
-            if player_id in active_connections:
-                del active_connections[player_id]
-            await broadcast_lobby_state()
-
-def is_valid_move(from_pos: Dict, to_pos: Dict) -> bool:
-    """Validuje pohyb - 8-směr, sousední buňka, neblokovaná"""
-    dx = abs(to_pos["x"] - from_pos["x"])
-    dy = abs(to_pos["y"] - from_pos["y"])
-    
-    # Must be adjacent (8-directional)
-    if dx > 1 or dy > 1 or (dx == 0 and dy == 0):
+                    journal.drop(room.room_id)
+                    replays.drop(room.room_id)
+    finally:
+        conn.close()
+
+def heartbeat(conn: Connection):
+    """Ping klientovi; spojení, ze kterého dlouho nic nepřišlo, se zavře (úklid proběhne v jeho smyčce)"""
+    if conn.closed:
+        return
+    if asyncio.get_running_loop().time() - conn.last_seen > settings.HEARTBEAT_TIMEOUT:
+        fanout_stats.heartbeat_timeouts += 1
+        conn.close(code=1001)
+        return
+    conn.send_message({"type": "ping"})
+    timers.schedule(settings.HEARTBEAT_INTERVAL, heartbeat, conn)
+
+def schedule_turn_deadline(room: Room) -> bool:
+    """Naplánuje limit nového tahu (zruší limit předchozího); vrací True, pokud tah právě začal"""
+    state = room.state
+    timer = room.turn_timer
+    if timer is not None and state.status == "playing" and timer.args[1] == state.turn_number:
         return False
-    
-    # Check bounds
-    if to_pos["x"] < 0 or to_pos["x"] >= GRID_COLS or to_pos["y"] < 0 or to_pos["y"] >= GRID_ROWS:
+    if timer is not None:
+        timer.cancel()
+        room.turn_timer = None
+    if state.status != "playing" or not settings.TURN_TIMEOUT:
         return False
-    
-    # Check if cell is occupied
-    for player in game_state.players:
-        if player["pos"]["x"] == to_pos["x"] and player["pos"]["y"] == to_pos["y"]:
-            return False
-    
+    room.turn_timer = timers.schedule(settings.TURN_TIMEOUT, expire_turn, room, state.turn_number)
     return True
 
-def is_in_spawn_zone(pos: Dict, player_index: int) -> bool:
-    """Zkontroluje, zda je pozice ve startovací zóně hráče"""
-    # spawnA: x=1-2, y=9-10 (bottom left, player 0)
-    # spawnB: x=15-16, y=1-2 (top right, player 1)
-    if player_index == 0:
-        return (pos["x"] >= 1 and pos["x"] <= 2 and pos["y"] >= 9 and pos["y"] <= 10)
-    elif player_index == 1:
-        return (pos["x"] >= 15 and pos["x"] <= 16 and pos["y"] >= 1 and pos["y"] <= 2)
-    return False
-
-def has_enemy_nearby(player: Dict, all_players: list) -> bool:
-    """Zkontroluje, zda je v okolí protihráč v dosahu své zbraně (nebo blíž)"""
-    for other_player in all_players:
-        if other_player["player_id"] == player["player_id"]:
-            continue
-        
-        # Get enemy's weapon range
-        weapon = next((w for w in SEED_DATA["weapons"] if w["id"] == other_player.get("weapon_id")), None)
-        if not weapon:
-            # If no weapon, use default range of 1
-            weapon_range = 1
-        else:
-            weapon_range = weapon.get("range", 1)
-        
-        dx = abs(other_player["pos"]["x"] - player["pos"]["x"])
-        dy = abs(other_player["pos"]["y"] - player["pos"]["y"])
-        
-        # Manhattan distance - check if enemy is within or at weapon range
-        distance = dx + dy
-        if distance <= weapon_range:
-            return True
-    
-    return False
-
-def heal_on_spawn(player: Dict, all_players: list):
-    """Uzdraví hráče o 25% max HP, pokud je na startovací pozici a není tam protihráč"""
-    # Find player index
-    player_index = None
-    for i, p in enumerate(all_players):
-        if p["player_id"] == player["player_id"]:
-            player_index = i
-            break
-    
-    if player_index is None:
+def expire_turn(room: Room, turn_number: int):
+    """Hráč nestihl tah - server ho za něj ukončí"""
+    room.turn_timer = None
+    state = room.state
+    if registry.get(room.room_id) is room and state.status == "playing" and state.turn_number == turn_number:
+        run_from_timer(run_action(room, None, {"type": "end_turn", "player_id": state.turn_player_id}))
+
+def start_grace_period(room: Room, player_id: str):
+    previous = grace_timers.pop(player_id, None)
+    if previous is not None:
+        previous.cancel()
+    grace_timers[player_id] = timers.schedule(settings.RECONNECT_GRACE, expire_grace, room, player_id)
+
+def expire_grace(room: Room, player_id: str):
+    grace_timers.pop(player_id, None)
+    run_from_timer(forfeit_player(room, player_id))
+
+def run_from_timer(coro):
+    """Spustí korutinu z callbacku časovače; task drží timer_tasks, dokud neskončí"""
+    task = asyncio.create_task(coro)
+    timer_tasks.add(task)
+    task.add_done_callback(timer_tasks.discard)
+
+async def forfeit_player(room: Room, player_id: str):
+    """Hráč se v limitu nevrátil - prohrává zápas a opouští místnost"""
+    player = room.get_player(player_id)
+    if registry.get(room.room_id) is not room or not player or player.connected:
         return
-    
-    # Check if in spawn zone
-    if not is_in_spawn_zone(player["pos"], player_index):
+    if room.state.status == "playing":
+        await run_action(room, None, {"type": "forfeit", "player_id": player_id})
+    registry.remove_player(room, player_id)
+    if room.room_id in registry.rooms:
+        await broadcast_lobby_state(room)
+        journal.snapshot(room)
+    else:
+        journal.drop(room.room_id)
+        replays.drop(room.room_id)
+
+def send_handshake(conn: Connection, message: Dict, encoding: str):
+    """join_ok/reconnect_ok jde vždy jako JSON text; všechny další zprávy už ve vyjednaném kódování"""
+    message["encoding"] = encoding
+    if encoding == codec.MSGPACK:
+        message.update(codec.wire_tables())
+    conn.send(codec.encode(message))
+    conn.encoding = encoding
+
+def send_seed(conn: Connection, client_etag: Optional[str] = None):
+    """Pošle předem zakódovaná seed data; klient se stejným ETagem je už má"""
+    CATALOG.reload_if_changed()
+    if client_etag != CATALOG.etag:
+        conn.send(CATALOG.frames[conn.encoding])
+
+async def run_action(room: Room, conn: Optional[Connection], action: Dict, client_action_id=None):
+    """Provede herní akci v enginu a rozešle výsledek hráčům v místnosti"""
+    try:
+        _, events = engine.apply(room.state, action)
+    except engine.ActionError as e:
+        # Ending a turn out of order is silently ignored, server-issued actions have nobody to notify
+        if action["type"] == "end_turn" or conn is None:
+            return
+        metrics.action_rejected.labels(e.code).inc()
+        if e.code in ("invalid_move", "invalid_attack"):
+            player = room.get_player(action["player_id"])
+            conn.send_message({
+                "type": "action_rejected",
+                "client_action_id": client_action_id,
+                "reason": e.reason,
+                "authoritative_pos": room.state.layout.pos(player.cell) if player else None
+            })
+        else:
+            conn.send_message({"type": "error", "code": e.code, "message": e.reason})
         return
     
-    # Check if enemy nearby (within their weapon range)
-    if has_enemy_nearby(player, all_players):
-        return
+    metrics.record_events(events)
+    if room.state.status == "finished":
+        registry.refresh(room)
+        await broadcast_game_over(room)
     
-    # Heal 25% of max HP
-    robot = next((r for r in SEED_DATA["robots"] if r["id"] == player["robot_id"]), None)
-    if robot:
-        max_hp = robot["hpMax"]
-        heal_amount = max_hp * 0.25
-        player["hp"] = min(max_hp, player["hp"] + heal_amount)
-
-def is_valid_attack(attacker: Dict, target: Dict) -> bool:
-    """Validuje útok - pouze 4-směr (N/E/S/W), kontrola range"""
-    # Get weapon
-    weapon = next((w for w in SEED_DATA["weapons"] if w["id"] == attacker["weapon_id"]), None)
-    if not weapon:
+    await broadcast_game_state(room)
+    journal.record_action(room, action)
+    replays.record_action(room, action)
+    if room.state.status == "finished":
+        await replays.finish_match(room)
+
+async def run_turn(room: Room, conn: Optional[Connection], actions: List[Dict], client_turn_id=None) -> bool:
+    """Provede celý tah atomicky; odesílatel dostane jeden výsledek, místnost jeden broadcast s událostmi"""
+    try:
+        _, events = engine.apply_turn(room.state, actions)
+    except engine.ActionError as e:
+        metrics.action_rejected.labels(e.code).inc()
+        if conn is None:
+            return False
+        player = room.get_player(actions[0]["player_id"]) if actions else None
+        conn.send_message({
+            "type": "turn_rejected",
+            "client_turn_id": client_turn_id,
+            "index": e.index,
+            "reason": e.reason,
+            "authoritative_pos": room.state.layout.pos(player.cell) if player else None
+        })
         return False
     
-    range_val = weapon.get("range", 1)
+    if conn is not None:
+        conn.send_message({"type": "turn_ok", "client_turn_id": client_turn_id})
     
-    # Check if target is in same row or column (4-directional)
-    dx = target["pos"]["x"] - attacker["pos"]["x"]
-    dy = target["pos"]["y"] - attacker["pos"]["y"]
-    
-    # Must be cardinal direction (not diagonal)
-    if dx != 0 and dy != 0:
-        return False
-    
-    # Check range
-    distance = abs(dx) + abs(dy)
-    if distance == 0 or distance > range_val:
-        return False
+    metrics.record_events(events)
+    if room.state.status == "finished":
+        registry.refresh(room)
+        await broadcast_game_over(room)
     
+    await broadcast_game_state(room, events)
+    journal.record_turn(room, actions)
+    replays.record_turn(room, actions)
+    if room.state.status == "finished":
+        await replays.finish_match(room)
     return True
 
-def start_game():
-    """Spustí hru - inicializuje pozice, pasti, první tah"""
-    game_state.status = "playing"
-    game_state.turn_number = 1
-    
-    # Initialize player positions based on spawn zones in SVG
-    # spawnA: x=60, y=540 (grid: x=1, y=9) - bottom left
-    # spawnB: x=900, y=60 (grid: x=15, y=1) - top right
-    if len(game_state.players) >= 1:
-        game_state.players[0]["pos"] = {"x": 1, "y": 9}  # spawnA area
-    if len(game_state.players) >= 2:
-        game_state.players[1]["pos"] = {"x": 15, "y": 1}  # spawnB area
-    
-    # Initialize traps from SVG definitions
-    # SVG: 1080x720, grid: 18x12, cell: 60x60
-    # Trap zones converted from pixel coordinates to grid coordinates
-    trap_definitions = [
-        # Fire trap: rect x=600, y=60, width=300, height=60 -> grid: x=10-14, y=1
-        {"id": "trap_fire_1", "type": "fire", "damage": 12, "weight": 1.0, "min_active": 1, "max_active": 3, 
-         "zone": [(10, 1), (11, 1), (12, 1), (13, 1), (14, 1)]},
-        # Saw trap 1: rect x=60, y=240, width=60, height=300 -> grid: x=1, y=4-8
-        {"id": "trap_saw_1", "type": "saw", "damage": 15, "weight": 0.8, "min_active": 2, "max_active": 4,
-         "zone": [(1, 4), (1, 5), (1, 6), (1, 7), (1, 8)]},
-        # Saw trap 2: rect x=300, y=600, width=360, height=60 -> grid: x=5-10, y=10
-        {"id": "trap_saw_2", "type": "saw", "damage": 15, "weight": 0.8, "min_active": 2, "max_active": 4,
-         "zone": [(5, 10), (6, 10), (7, 10), (8, 10), (9, 10), (10, 10)]},
-        # Hammer trap: circle cx=810, cy=360, r=81 -> grid: x=13-14, y=5-6 (approx)
-        {"id": "trap_hammer_1", "type": "hammer", "damage": 20, "weight": 0.6, "min_active": 1, "max_active": 2,
-         "zone": [(13, 5), (13, 6), (14, 5), (14, 6)]},
-        # Crush trap 1: rect x=360, y=180, width=180, height=120 -> grid: x=6-8, y=3-4
-        {"id": "trap_crusher_1", "type": "crusher", "damage": 25, "weight": 0.5, "min_active": 1, "max_active": 2,
-         "zone": [(6, 3), (6, 4), (7, 3), (7, 4), (8, 3), (8, 4)]},
-        # Crush trap 2: polygon points="660,420 780,480 720,600 600,540" -> grid: x=10-12, y=7-9 (approx)
-        {"id": "trap_crusher_2", "type": "crusher", "damage": 25, "weight": 0.5, "min_active": 1, "max_active": 2,
-         "zone": [(10, 7), (10, 8), (10, 9), (11, 7), (11, 8), (11, 9), (12, 7), (12, 8), (12, 9)]},
-    ]
-    
-    # Initialize traps runtime state
-    game_state.traps_runtime = {}
-    for trap_def in trap_definitions:
-        game_state.traps_runtime[trap_def["id"]] = {
-            "state": "idle",
-            "armingTurnsRemaining": 0,
-            "remainingActiveTurns": 0,
-            "damage": trap_def["damage"],
-            "zone": trap_def["zone"],
-            "weight": trap_def["weight"],
-            "min_active": trap_def["min_active"],
-            "max_active": trap_def["max_active"]
-        }
-    
-    # First player's turn
-    game_state.turn_player_id = game_state.players[0]["player_id"]
-    game_state.ap_remaining = 3
-
-def next_turn():
-    """Přepne na další tah"""
-    game_state.turn_number += 1
-    
-    # Switch to next player
-    current_idx = next((i for i, p in enumerate(game_state.players) if p["player_id"] == game_state.turn_player_id), 0)
-    next_idx = (current_idx + 1) % len(game_state.players)
-    game_state.turn_player_id = game_state.players[next_idx]["player_id"]
-    game_state.ap_remaining = 3
-
-def process_traps():
-    """Zpracuje pasti - arming, active, damage"""
-    rng = random.Random(game_state.rng_seed + game_state.turn_number)
-    
-    # Phase 1: Process current states
-    for trap_id, trap in game_state.traps_runtime.items():
-        if trap["state"] == "arming":
-            # Arming -> Active transition
-            trap["state"] = "active"
-            trap["remainingActiveTurns"] = rng.randint(trap["min_active"], trap["max_active"])
-            trap["armingTurnsRemaining"] = 0
-        elif trap["state"] == "active":
-            # Apply damage to players in zone
-            for player in game_state.players:
-                if player["hp"] > 0:
-                    player_pos = (player["pos"]["x"], player["pos"]["y"])
-                    if player_pos in trap["zone"]:
-                        player["hp"] = max(0, player["hp"] - trap["damage"])
-                        # Check for game over
-                        if player["hp"] <= 0 and game_state.status == "playing":
-                            # Find the winner (other player)
-                            winner = next((p for p in game_state.players if p["player_id"] != player["player_id"] and p["hp"] > 0), None)
-                            if winner:
-                                game_state.status = "finished"
-                                game_state.winner_id = winner["player_id"]
-            
-            # Decrement active turns
-            trap["remainingActiveTurns"] -= 1
-            if trap["remainingActiveTurns"] <= 0:
-                trap["state"] = "idle"
-    
-    # Phase 2: Randomly arm new traps (weighted)
-    for trap_id, trap in game_state.traps_runtime.items():
-        if trap["state"] == "idle":
-            # Weighted random chance to start arming
-            if rng.random() < trap["weight"] * 0.3:  # 30% of weight as base chance
-                trap["state"] = "arming"
-                trap["armingTurnsRemaining"] = 1  # Arms for 1 turn, then becomes active
-
-async def broadcast_lobby_state():
-    """Odešle stav lobby všem připojeným hráčům"""
-    message = {
+def schedule_bot_turn(room: Room):
+    """Je-li na tahu bot, spustí hledání jeho tahu (nejvýše jedno na místnost)"""
+    state = room.state
+    if state.status != "playing" or room.room_id in bot_turns:
+        return
+    player = room.get_player(state.turn_player_id)
+    if player and player.bot:
+        bot_turns[room.room_id] = asyncio.create_task(play_bot_turn(room, player))
+
+async def play_bot_turn(room: Room, player: engine.Player):
+    turn_number = room.state.turn_number
+    try:
+        actions = await bots.choose_turn(room.state, player.player_id, player.bot)
+    finally:
+        bot_turns.pop(room.room_id, None)
+    # The room may have been closed while the search was running
+    if registry.get(room.room_id) is not room or room.state.turn_number != turn_number:
+        return
+    if not await run_turn(room, None, actions):
+        await run_action(room, None, {"type": "end_turn", "player_id": player.player_id})
+
+def lobby_message(room: Room) -> Dict:
+    state = room.state
+    return {
         "type": "lobby_state",
-        "status": game_state.status,
+        "status": state.status,
         "players": [
             {
-                "player_id": p["player_id"],
-                "name": p["name"],
-                "connected": p["connected"],
-                "ready": p["ready"],
-                "robot_id": p["robot_id"],
-                "weapon_id": p["weapon_id"]
+                "player_id": p.player_id,
+                "name": p.name,
+                "connected": p.connected,
+                "ready": p.ready,
+                "robot_id": p.robot_id,
+                "weapon_id": p.weapon_id,
+                "bot": p.bot
             }
-            for p in game_state.players
+            for p in state.players
         ],
-        "can_start": len(game_state.players) == 2 and all(p["ready"] for p in game_state.players)
+        "can_start": len(state.players) == 2 and all(p.ready for p in state.players)
     }
-    
-    for player_id, ws in active_connections.items():
-        try:
-            await ws.send_json(message)
-        except:
-            pass
 
-async def broadcast_game_state():
-    """Odešle stav hry všem připojeným hráčům"""
-    message = {
-        "type": "game_state",
-        **game_state.to_dict()
-    }
-    
-    # Add traps state
-    message["traps_state"] = game_state.traps_runtime
+async def broadcast_lobby_state(room: Room):
+    """Odešle stav lobby všem připojeným hráčům v místnosti"""
+    room.broadcast(lobby_message(room))
+
+async def broadcast_game_state(room: Room, events: Optional[List[Dict]] = None):
+    """Odešle změny stavu hry všem připojeným hráčům v místnosti (plný snapshot na začátku zápasu)"""
+    message = room.tracker.delta(room.state)
+    if message is None:
+        return
+    if events:
+        message = {**message, "events": events}
+    if schedule_turn_deadline(room):
+        # New turn - clients can show the countdown
+        message = {**message, "turn_time": settings.TURN_TIMEOUT}
     
-    for player_id, ws in active_connections.items():
-        try:
-            await ws.send_json(message)
-        except:
-            pass
+    room.broadcast(message)
+    room.remember(message)
+    if room.feed is not None and room.feed.wants_keyframe():
+        # Late spectators start from here instead of replaying every delta
+        room.feed.publish_keyframe(room.tracker.full(room.state))
+    schedule_bot_turn(room)
 
-async def broadcast_game_over():
+async def broadcast_game_over(room: Room):
     """Odešle zprávu o konci hry"""
-    # Reset ready status for all players
-    for player in game_state.players:
-        player["ready"] = False
+    state = room.state
+    # Reset ready status for all players (bots stay ready for a rematch)
+    for player in state.players:
+        player.ready = bool(player.bot)
     
-    winner = next((p for p in game_state.players if p["player_id"] == game_state.winner_id), None)
+    winner = next((p for p in state.players if p.player_id == state.winner_id), None)
+    loser = next((p for p in state.players if p.player_id != state.winner_id), None)
+    # Matches against bots are practice - farming an easy bot must not move the matchmaking rating
+    if winner and loser and not winner.bot and not loser.bot:
+        ratings.record_result(winner.name, loser.name)
     message = {
         "type": "game_over",
-        "winner_id": game_state.winner_id,
-        "winner_name": winner["name"] if winner else "Neznámý"
+        "winner_id": state.winner_id,
+        "winner_name": winner.name if winner else "Neznámý",
+        "match_id": replays.match_id(room)  # Replay is available under /replays/<match_id>
     }
     
-    for player_id, ws in active_connections.items():
-        try:
-            await ws.send_json(message)
-        except:
-            pass
+    room.broadcast(message)
     
     # Also send updated lobby state with reset ready status
-    await broadcast_lobby_state()
+    await broadcast_lobby_state(room)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,182 @@
+"""
+Matchmaking - fronta hráčů seřazená podle ratingu. Periodický párovač spojí nejbližší soupeře
+v okně, které se s dobou čekání rozšiřuje; po MATCHMAKING_MAX_WAIT bere kohokoliv.
+Vložení, odebrání i hledání soupeře jsou O(log n); hráč se znovu prověřuje jen když se
+jeho okno rozšíří nebo když se vedle něj ve frontě objeví nový hráč.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+import settings
+from cluster import MemoryBackend
+
+logger = logging.getLogger(__name__)
+
+class Ticket:
+    """Jeden čekající hráč; payload nese volající (spojení hráče)"""
+    __slots__ = ("ticket_id", "name", "rating", "enqueued_at", "payload")
+
+    def __init__(self, ticket_id: int, name: str, rating: int, enqueued_at: float, payload=None):
+        self.ticket_id = ticket_id
+        self.name = name
+        self.rating = rating
+        self.enqueued_at = enqueued_at
+        self.payload = payload
+
+class Ratings:
+    """Elo rating podle jména hráče; uložený v backendu clusteru, aby ho viděly všechny workery"""
+    def __init__(self, default: int = settings.RATING_DEFAULT, k_factor: int = settings.RATING_K, backend=None):
+        self.default = default
+        self.k_factor = k_factor
+        self.backend = backend or MemoryBackend()
+
+    def get(self, name: str) -> int:
+        rating = self.backend.get_rating(name)
+        return self.default if rating is None else rating
+
+    def record_result(self, winner: str, loser: str):
+        winner_rating, loser_rating = self.get(winner), self.get(loser)
+        expected = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
+        change = round(self.k_factor * (1 - expected))
+        self.backend.set_ratings({winner: winner_rating + change, loser: loser_rating - change})
+
+class Matchmaker:
+    """Fronta podle ratingu s rozšiřujícími se okny; párování běží v tasku každých interval sekund"""
+    def __init__(self, interval: float = settings.MATCHMAKING_INTERVAL,
+                 window: int = settings.MATCHMAKING_WINDOW,
+                 widen_by: int = settings.MATCHMAKING_WIDEN_BY,
+                 widen_every: float = settings.MATCHMAKING_WIDEN_EVERY,
+                 max_window: int = settings.MATCHMAKING_MAX_WINDOW,
+                 max_wait: float = settings.MATCHMAKING_MAX_WAIT,
+                 batch: int = settings.MATCHMAKING_BATCH):
+        self.interval = interval
+        self.window = window
+        self.widen_by = widen_by
+        self.widen_every = widen_every
+        self.max_window = max_window
+        self.max_wait = max_wait
+        self.batch = batch
+        self.ids = itertools.count(1)
+        self.tickets: Dict[int, Ticket] = {}
+        self.by_rating = SortedList()  # (rating, ticket_id)
+        self.fresh: Deque[Ticket] = deque()  # Enqueued, not checked yet
+        self.due: List[Tuple[float, int]] = []  # Heap of (next window widening, ticket_id), stale entries skipped
+        # Metrics
+        self.matched = 0
+        self.waits: Deque[float] = deque(maxlen=1000)  # Recent time-to-match in seconds
+        self.task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    def enqueue(self, name: str, rating: int, now: float, payload=None) -> Ticket:
+        ticket = Ticket(next(self.ids), name, rating, now, payload)
+        self.tickets[ticket.ticket_id] = ticket
+        self.by_rating.add((rating, ticket.ticket_id))
+        self.fresh.append(ticket)
+        return ticket
+
+    def remove(self, ticket: Ticket):
+        """Hráč odešel z fronty (nebo byl spárován)"""
+        if self.tickets.pop(ticket.ticket_id, None) is not None:
+            self.by_rating.remove((ticket.rating, ticket.ticket_id))
+
+    def window_of(self, ticket: Ticket, now: float) -> float:
+        """Povolený rozdíl ratingu po dosavadní době čekání"""
+        waited = now - ticket.enqueued_at
+        if waited >= self.max_wait:
+            return math.inf
+        return min(self.window + int(waited / self.widen_every) * self.widen_by, self.max_window)
+
+    def next_check(self, ticket: Ticket, now: float) -> float:
+        """Kdy se okno hráče příště rozšíří"""
+        waited = now - ticket.enqueued_at
+        if waited >= self.max_wait:
+            return now + self.widen_every
+        step_at = ticket.enqueued_at + (int(waited / self.widen_every) + 1) * self.widen_every
+        return min(step_at, ticket.enqueued_at + self.max_wait)
+
+    def find_opponent(self, ticket: Ticket, now: float) -> Optional[Ticket]:
+        """Nejbližší soupeř podle ratingu, který je v okně jednoho z nich"""
+        index = self.by_rating.index((ticket.rating, ticket.ticket_id))
+        window = self.window_of(ticket, now)
+        best, best_gap = None, math.inf
+        # Both neighbours - the closer one may still have a narrow window while the other one already accepts
+        for neighbour in (index - 1, index + 1):
+            if 0 <= neighbour < len(self.by_rating):
+                rating, other_id = self.by_rating[neighbour]
+                gap = abs(rating - ticket.rating)
+                if gap >= best_gap:
+                    continue
+                other = self.tickets[other_id]
+                if gap <= max(window, self.window_of(other, now)):
+                    best, best_gap = other, gap
+        return best
+
+    def tick(self, now: float, limit: int) -> List[Tuple[Ticket, Ticket]]:
+        """Jedno kolo párování - nejvýše limit dvojic (starší hráč první) a batch prověřených hráčů"""
+        # Waiting players whose window widened go first, then newcomers; the rest waits for the next tick
+        candidates = []
+        while self.due and self.due[0][0] <= now and len(candidates) < self.batch:
+            _, ticket_id = heapq.heappop(self.due)
+            ticket = self.tickets.get(ticket_id)
+            if ticket is not None:
+                candidates.append(ticket)
+        while self.fresh and len(candidates) < self.batch:
+            candidates.append(self.fresh.popleft())
+
+        pairs = []
+        for ticket in candidates:
+            if ticket.ticket_id not in self.tickets:
+                continue  # Paired earlier in this tick or left the queue
+            opponent = self.find_opponent(ticket, now) if len(pairs) < limit else None
+            if opponent is None:
+                retry_at = self.next_check(ticket, now) if len(pairs) < limit else now
+                heapq.heappush(self.due, (retry_at, ticket.ticket_id))
+                continue
+            self.remove(ticket)
+            self.remove(opponent)
+            older, newer = sorted((ticket, opponent), key=lambda t: t.enqueued_at)
+            pairs.append((older, newer))
+            self.matched += 1
+            self.waits.append(now - older.enqueued_at)
+            self.waits.append(now - newer.enqueued_at)
+        return pairs
+
+    def start(self, on_match: Callable[[Ticket, Ticket], Awaitable[None]], capacity: Callable[[], int]):
+        """Spustí periodické párování; capacity() říká, kolik místností lze ještě založit"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._match_loop(on_match, capacity))
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _match_loop(self, on_match, capacity):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.fresh and not (self.due and self.due[0][0] <= loop.time()):
+                continue
+            for older, newer in self.tick(loop.time(), capacity()):
+                try:
+                    await on_match(older, newer)
+                except Exception:
+                    logger.exception("Založení zápasu z fronty selhalo")
+
+    def stats(self) -> Dict:
+        waits = sorted(self.waits)
+        return {
+            "queued": len(self.tickets),
+            "matched": self.matched,
+            "wait_p50": round(waits[len(waits) // 2], 3) if waits else None,
+            "wait_p99": round(waits[int(len(waits) * 0.99)], 3) if waits else None
+        }
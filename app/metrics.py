@@ -0,0 +1,155 @@
+"""
+Metriky pro Prometheus - čítače a histogramy v paměti procesu, export v textovém formátu (GET /metrics).
+Hodnoty štítků se zakládají jednou, zápis je pak jen vyhledání ve slovníku a přičtení.
+"""
+import bisect
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# Seconds - from a cheap lobby message to a bot-heavy turn
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: Union[int, float] = 1):
+        self.value += amount
+
+class Histogram:
+    """Počty pozorování v pevných přihrádkách (le = horní mez včetně), součet a počet"""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Family:
+    """Metrika jednoho jména; s label má potomka pro každou hodnotu štítku, bez něj jediného"""
+    def __init__(self, name: str, help: str, kind: str, factory: Callable, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.factory = factory
+        self.label = label
+        self.children: Dict[str, Union[Counter, Histogram]] = {}
+        if label is None:
+            self.children[""] = factory()
+
+    def labels(self, value: str = ""):
+        child = self.children.get(value)
+        if child is None:
+            child = self.children[value] = self.factory()
+        return child
+
+    def inc(self, amount: Union[int, float] = 1):
+        self.children[""].inc(amount)
+
+    def observe(self, value: float):
+        self.children[""].observe(value)
+
+class Gauge:
+    """Hodnota zjišťovaná až při exportu - číslo, nebo {hodnota štítku: číslo}"""
+    def __init__(self, name: str, help: str, collect: Callable, label: Optional[str] = None, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.label = label
+        self.kind = kind
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value: Union[int, float]) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Union[Family, Gauge]] = []
+
+    def counter(self, name: str, help: str, label: Optional[str] = None) -> Family:
+        return self._add(Family(name, help, "counter", Counter, label))
+
+    def histogram(self, name: str, help: str, label: Optional[str] = None,
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Family:
+        return self._add(Family(name, help, "histogram", lambda: Histogram(buckets), label))
+
+    def gauge(self, name: str, help: str, collect: Callable, label: Optional[str] = None, kind: str = "gauge") -> Gauge:
+        """Kind counter pro čítače, které už vede jiný modul (fanout, matchmaking)"""
+        return self._add(Gauge(name, help, collect, label, kind))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Textový formát Prometheus 0.0.4"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Gauge):
+                values = metric.collect()
+                if not isinstance(values, dict):
+                    values = {"": values}
+                for value, number in values.items():
+                    lines.append(f"{metric.name}{self._labels(metric.label, value)} {_number(number)}")
+                continue
+            for value, child in list(metric.children.items()):
+                if metric.kind == "counter":
+                    lines.append(f"{metric.name}{self._labels(metric.label, value)} {_number(child.value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(child.bounds + (float("inf"),), child.counts):
+                    cumulative += count
+                    labels = self._labels(metric.label, value, ("le", _number(bound)))
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                lines.append(f"{metric.name}_sum{self._labels(metric.label, value)} {_number(child.sum)}")
+                lines.append(f"{metric.name}_count{self._labels(metric.label, value)} {child.count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(label: Optional[str], value: str, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = []
+        if label is not None:
+            pairs.append(f'{label}="{_escape(value)}"')
+        if extra is not None:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+registry = Registry()
+
+message_duration = registry.histogram(
+    "arena_message_duration_seconds", "Zpracování zprávy klienta od přijetí po konec handleru", "type")
+client_errors = registry.counter("arena_client_errors_total", "Odmítnuté zprávy klienta (error)", "code")
+action_rejected = registry.counter("arena_action_rejected_total", "Odmítnuté akce a tahy (action_rejected, turn_rejected)", "reason")
+broadcast_duration = registry.histogram(
+    "arena_broadcast_duration_seconds", "Serializace a zařazení jedné zprávy všem v místnosti")
+broadcast_bytes = registry.counter("arena_broadcast_bytes_total", "Bajty zařazené hráčům broadcastem místnosti")
+rate_limited = registry.counter("arena_rate_limited_total", "Zprávy odmítnuté limitem rychlosti (frame = všechny rámce spojení)", "type")
+rate_limit_disconnects = registry.counter("arena_rate_limit_disconnects_total", "Klienti odpojení za opakované překročení limitů")
+redirects = registry.counter("arena_redirects_total", "Klienti přesměrovaní na worker, který vlastní místnost nebo frontu")
+trap_damage_events = registry.counter("arena_trap_damage_events_total", "Zásahy pastí")
+trap_damage = registry.counter("arena_trap_damage_hp_total", "Životy ubrané pastmi")
+
+def frame_size(frame: Union[str, bytes]) -> int:
+    """Velikost rámce v bajtech; ASCII text se nekopíruje"""
+    if type(frame) is bytes or frame.isascii():
+        return len(frame)
+    return len(frame.encode())
+
+def record_events(events: List[Dict]):
+    for event in events:
+        if event["type"] == "trap_damage":
+            trap_damage_events.inc()
+            trap_damage.inc(event["damage"])
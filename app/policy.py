@@ -0,0 +1,32 @@
+"""
+Skriptovaná strategie hráče - pro benchmarky, simulace vyváženosti a rollouty
+"""
+from typing import Dict
+
+import engine
+
+def greedy_action(state: engine.GameState) -> Dict:
+    """Útok, pokud to jde, jinak krok blíž k soupeři; bez zlepšení konec tahu"""
+    me = engine.get_player(state, state.turn_player_id)
+    enemy = next(p for p in state.players if p is not me)
+    if state.ap_remaining <= 0:
+        return {"type": "end_turn", "player_id": me.player_id}
+    layout = state.layout
+    if engine.is_valid_attack(layout, me, enemy):
+        return {"type": "attack", "player_id": me.player_id, "target_player_id": enemy.player_id}
+    # First strictly closest neighbour in (dx, dy) scan order
+    best = None
+    best_dist = layout.distance(me.cell, enemy.cell)
+    x, y = layout.coords[me.cell]
+    enemy_x, enemy_y = layout.coords[enemy.cell]
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            to = (x + dx, y + dy)
+            if not engine.is_valid_move(state, me.cell, *to):
+                continue
+            dist = abs(enemy_x - to[0]) + abs(enemy_y - to[1])
+            if dist < best_dist:
+                best, best_dist = to, dist
+    if best is None:
+        return {"type": "end_turn", "player_id": me.player_id}
+    return {"type": "move", "player_id": me.player_id, "to_x": best[0], "to_y": best[1]}
@@ -0,0 +1,153 @@
+"""
+Zprávy klienta - schémata předkompilovaná v pydantic-core a jednotné chybové odpovědi.
+Zpráva se parsuje a validuje v jednom kroku přímo z textu rámce; neplatný vstup se odmítne
+dřív, než se dostane k hernímu enginu.
+"""
+from typing import Dict, List, Literal, Union
+
+from pydantic import Field, StrictBool, StrictInt, StrictStr, TypeAdapter, ValidationError
+from typing_extensions import Annotated, NotRequired, TypedDict
+
+import engine
+from codec import decode_msgpack
+
+ClientId = Union[StrictStr, StrictInt, None]
+
+# Actions inside submit_turn (engine action format without player_id)
+class MoveAction(TypedDict):
+    type: Literal["move"]
+    to_x: StrictInt
+    to_y: StrictInt
+
+class AttackAction(TypedDict):
+    type: Literal["attack"]
+    target_player_id: StrictStr
+
+class EndTurnAction(TypedDict):
+    type: Literal["end_turn"]
+
+TurnAction = Annotated[Union[MoveAction, AttackAction, EndTurnAction], Field(discriminator="type")]
+
+# Client -> server messages
+Encoding = Literal["json", "msgpack"]
+
+class Join(TypedDict):
+    type: Literal["join"]
+    name: StrictStr
+    room_id: NotRequired[Union[StrictStr, None]]
+    seed_etag: NotRequired[Union[StrictStr, None]]
+    encoding: NotRequired[Encoding]
+    redirected: NotRequired[StrictBool]  # Resent after a redirect - join here instead of redirecting again
+
+class Reconnect(TypedDict):
+    type: Literal["reconnect"]
+    token: StrictStr
+    seed_etag: NotRequired[Union[StrictStr, None]]
+    encoding: NotRequired[Encoding]
+    last_seq: NotRequired[Union[StrictInt, None]]  # Last game_state/game_delta the client applied
+
+class SelectLoadout(TypedDict):
+    type: Literal["select_loadout"]
+    robot_id: StrictStr
+    weapon_id: StrictStr
+
+class SetReady(TypedDict):
+    type: Literal["set_ready"]
+    ready: NotRequired[StrictBool]
+
+class ActionMove(TypedDict):
+    type: Literal["action_move"]
+    to_x: StrictInt
+    to_y: StrictInt
+    client_action_id: NotRequired[ClientId]
+
+class ActionAttack(TypedDict):
+    type: Literal["action_attack"]
+    target_player_id: StrictStr
+    client_action_id: NotRequired[ClientId]
+
+class SubmitTurn(TypedDict):
+    type: Literal["submit_turn"]
+    actions: Annotated[List[TurnAction], Field(min_length=1, max_length=engine.AP_PER_TURN + 1)]
+    client_turn_id: NotRequired[ClientId]
+
+class EndTurn(TypedDict):
+    type: Literal["end_turn"]
+
+class Resync(TypedDict):
+    type: Literal["resync"]
+
+class Spectate(TypedDict):
+    type: Literal["spectate"]
+    room_id: StrictStr
+    encoding: NotRequired[Encoding]
+
+class AddBot(TypedDict):
+    type: Literal["add_bot"]
+    level: NotRequired[Literal["easy", "normal", "hard"]]
+
+class Pong(TypedDict):
+    type: Literal["pong"]
+
+class Queue(TypedDict):
+    type: Literal["queue"]
+    name: StrictStr
+    seed_etag: NotRequired[Union[StrictStr, None]]
+    encoding: NotRequired[Encoding]
+
+class LeaveQueue(TypedDict):
+    type: Literal["leave_queue"]
+
+ClientMessage = Annotated[
+    Union[Join, Reconnect, SelectLoadout, SetReady, ActionMove, ActionAttack, SubmitTurn, EndTurn, Resync, Spectate,
+          Queue, LeaveQueue, AddBot, Pong],
+    Field(discriminator="type")
+]
+
+# Compiled once at import; validate_json parses and validates in a single pass
+_client_message = TypeAdapter(ClientMessage)
+
+class ClientError(Exception):
+    """Požadavek klienta byl odmítnut - odpovídá se jednotnou zprávou {"type": "error", "code", "message"}"""
+    REASONS = {
+        "bad_message": "Neplatná zpráva",
+        "unknown_message": "Neznámý typ zprávy",
+        "not_joined": "Nejste připojeni",
+        "invalid_name": "Neplatné jméno",
+        "room_not_found": "Místnost neexistuje",
+        "server_full": "Server je plný",
+        "lobby_full": "Lobby je plné (max 2 hráči)",
+        "name_taken": "Jméno je již obsazené",
+        "invalid_token": "Neplatný token",
+        "player_not_found": "Hráč nenalezen",
+        "invalid_loadout": "Neplatný robot nebo zbraň",
+        "loadout_required": "Nejprve vyberte robota a zbraň",
+        "already_joined": "Už jste ve hře",
+        "spectators_full": "Místnost má maximální počet diváků",
+        "already_queued": "Už čekáte ve frontě na soupeře",
+        "rate_limited": "Příliš mnoho zpráv, zpomalte",
+        "bots_disabled": "AI soupeři jsou na serveru vypnutí"
+    }
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+        self.reason = self.REASONS.get(code, code)
+
+    def to_message(self) -> Dict:
+        return {"type": "error", "code": self.code, "message": self.reason}
+
+def decode(raw: Union[str, bytes]) -> Dict:
+    """Naparsuje a zvaliduje zprávu klienta (text = JSON, binární rámec = MessagePack); chyba -> ClientError"""
+    try:
+        if type(raw) is str:
+            return _client_message.validate_json(raw)
+        return _client_message.validate_python(decode_msgpack(raw))
+    except ValidationError as e:
+        errors = e.errors()
+        if errors and errors[0]["type"] in ("union_tag_invalid", "union_tag_not_found"):
+            raise ClientError("unknown_message") from None
+        raise ClientError("bad_message") from None
+    except (ValueError, TypeError):
+        # Malformed MessagePack frame
+        raise ClientError("bad_message") from None
@@ -0,0 +1,80 @@
+"""
+Omezení rychlosti zpráv klienta - token bucket pro každé spojení: jeden na všechny rámce (kontroluje se
+ještě před parsováním) a jeden pro každý typ zprávy (před handlerem, tedy před jakýmkoli hledáním stavu).
+Odmítnuté zprávy se počítají jako prohřešky; spojení, kterému dojde tolerance, se odpojí.
+"""
+from typing import Dict, Optional, Tuple
+
+import settings
+
+# All frames of one connection together - messages per second, burst
+OVERALL: Tuple[float, int] = (20, 40)
+# Message type -> (messages per second, burst); other types count only against OVERALL
+LIMITS: Dict[str, Tuple[float, int]] = {
+    "join": (1, 5),
+    "reconnect": (1, 5),
+    "spectate": (1, 5),
+    "queue": (1, 5),
+    "leave_queue": (1, 5),
+    "add_bot": (1, 3),
+    # Each change is broadcast to the whole lobby
+    "select_loadout": (2, 6),
+    "set_ready": (2, 6),
+    # A turn has AP_PER_TURN actions - a human clicks nowhere near this fast
+    "action_move": (10, 10),
+    "action_attack": (10, 10),
+    "submit_turn": (2, 4),
+    "end_turn": (5, 5),
+    # Answered with a full snapshot
+    "resync": (1, 3),
+}
+
+class TokenBucket:
+    """Plní se rychlostí rate až do burst; každá zpráva bere jeden žeton"""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if tokens < 1:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - 1
+        return True
+
+class RateLimiter:
+    """Limity jednoho spojení; kyblíky pro typy zpráv vznikají až s první zprávou daného typu"""
+    __slots__ = ("scale", "overall", "buckets", "strikes")
+
+    def __init__(self, now: float, scale: float = settings.RATE_LIMIT_SCALE, strikes: int = settings.RATE_LIMIT_STRIKES):
+        self.scale = scale
+        self.overall = TokenBucket(OVERALL[0] * scale, OVERALL[1] * scale, now)
+        self.buckets: Dict[str, TokenBucket] = {}
+        # Rejected messages tolerated before disconnecting, forgiven at one per second
+        self.strikes = TokenBucket(1, strikes, now)
+
+    def allow_frame(self, now: float) -> bool:
+        return self.overall.take(now)
+
+    def allow(self, msg_type: str, now: float) -> bool:
+        bucket = self.buckets.get(msg_type)
+        if bucket is None:
+            limit = LIMITS.get(msg_type)
+            if limit is None:
+                return True
+            bucket = self.buckets[msg_type] = TokenBucket(limit[0] * self.scale, limit[1] * self.scale, now)
+        return bucket.take(now)
+
+    def strike(self, now: float) -> bool:
+        """Zaznamená odmítnutou zprávu; True = tolerance vyčerpána, spojení se má odpojit"""
+        return not self.strikes.take(now)
+
+def new_limiter(now: float) -> Optional[RateLimiter]:
+    """Limiter pro nové spojení; RATE_LIMIT_SCALE=0 limity vypíná"""
+    return RateLimiter(now) if settings.RATE_LIMIT_SCALE > 0 else None
@@ -0,0 +1,277 @@
+"""
+Záznamy zápasů - počáteční stav a proud přijatých akcí v kompaktním formátu (gzip JSON).
+Přehrání i skok na libovolný tah se počítá znovu enginem od nejbližšího checkpointu.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import engine
+import settings
+from arena import load_layout
+from delta import StateTracker
+from engine import CATALOG
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Compact action records - the acting player is always the one on turn, so it is not stored
+MOVE = "m"  # ["m", to_x, to_y]
+ATTACK = "a"  # ["a", target player index]
+END_TURN = "e"  # ["e"]
+FORFEIT = "f"  # ["f", player index] - the only record not made by the player on turn
+
+class Recording:
+    """Zápas, který právě probíhá v místnosti"""
+    __slots__ = ("match_id", "started_at", "initial", "player_index", "actions")
+
+    def __init__(self, state: engine.GameState):
+        self.match_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        # Detached copy - the live state keeps changing
+        self.initial = json.loads(json.dumps(state.to_dict()))
+        self.player_index = {p.player_id: i for i, p in enumerate(state.players)}
+        self.actions: List[List] = []
+
+    def add(self, action: Dict):
+        action_type = action["type"]
+        if action_type == "move":
+            self.actions.append([MOVE, action["to_x"], action["to_y"]])
+        elif action_type == "attack":
+            self.actions.append([ATTACK, self.player_index[action["target_player_id"]]])
+        elif action_type == "end_turn":
+            self.actions.append([END_TURN])
+        elif action_type == "forfeit":
+            self.actions.append([FORFEIT, self.player_index[action["player_id"]]])
+
+def encode_replay(recording: Recording, state: engine.GameState) -> bytes:
+    """Hotový zápas -> obsah souboru se záznamem"""
+    replay = {
+        "v": FORMAT_VERSION,
+        "match_id": recording.match_id,
+        "arena": state.layout.name,
+        "seed_etag": CATALOG.etag,
+        "started_at": int(recording.started_at),
+        "finished_at": int(time.time()),
+        "winner_id": state.winner_id,
+        "turns": state.turn_number,
+        "initial": recording.initial,
+        "actions": recording.actions
+    }
+    return gzip.compress(json.dumps(replay, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+def expand_action(state: engine.GameState, record: List) -> Dict:
+    """Kompaktní záznam -> akce enginu za hráče na tahu"""
+    action = {"player_id": state.turn_player_id}
+    kind = record[0]
+    if kind == MOVE:
+        action.update(type="move", to_x=record[1], to_y=record[2])
+    elif kind == ATTACK:
+        action.update(type="attack", target_player_id=state.players[record[1]].player_id)
+    elif kind == FORFEIT:
+        action.update(type="forfeit", player_id=state.players[record[1]].player_id)
+    else:
+        action["type"] = "end_turn"
+    return action
+
+class Replay:
+    """Načtený záznam s checkpointy po checkpoint_every tazích pro rychlé skoky"""
+    def __init__(self, data: Dict, checkpoint_every: int = settings.REPLAY_CHECKPOINT_EVERY):
+        self.data = data
+        self.match_id = data["match_id"]
+        self.layout = load_layout(data["arena"])
+        self.actions: List[List] = data["actions"]
+        self.checkpoint_every = checkpoint_every
+        # turn number -> index of its first action
+        self.turn_starts: Dict[int, int] = {}
+        # (turn number, action index, state) in turn order
+        self.checkpoints: List[Tuple[int, int, engine.GameState]] = []
+        self.truncated = False
+        self._simulate()
+
+    def initial_state(self) -> engine.GameState:
+        return engine.GameState.from_dict(json.loads(json.dumps(self.data["initial"])), self.layout)
+
+    @property
+    def first_turn(self) -> int:
+        return self.data["initial"]["turn_number"]
+
+    @property
+    def last_turn(self) -> int:
+        return max(self.turn_starts)
+
+    def _simulate(self):
+        """Jeden průchod celým zápasem - zaznamená začátky tahů a checkpointy"""
+        state = self.initial_state()
+        self.turn_starts[state.turn_number] = 0
+        self.checkpoints.append((state.turn_number, 0, engine.clone_state(state)))
+        for index, record in enumerate(self.actions):
+            try:
+                engine.apply(state, expand_action(state, record))
+            except engine.ActionError as e:
+                # Rules or seed data changed since the match was recorded
+                logger.warning("Záznam %s nelze přehrát od akce %d: %s", self.match_id, index, e.code)
+                self.actions = self.actions[:index]
+                self.truncated = True
+                break
+            if state.status != "playing":
+                # Actions of a submitted turn after the winning attack were ignored by the engine
+                self.actions = self.actions[:index + 1]
+                break
+            if record[0] == END_TURN:
+                self.turn_starts[state.turn_number] = index + 1
+                if (state.turn_number - self.first_turn) % self.checkpoint_every == 0:
+                    self.checkpoints.append((state.turn_number, index + 1, engine.clone_state(state)))
+
+    def state_at(self, turn: int) -> Tuple[engine.GameState, int]:
+        """Stav na začátku tahu turn a index další akce; od nejbližšího checkpointu se dopočítá"""
+        turn = min(max(turn, self.first_turn), self.last_turn)
+        target = self.turn_starts[turn]
+        _, index, checkpoint = self.checkpoints[0]
+        for checkpoint_turn, checkpoint_index, checkpoint_state in self.checkpoints:
+            if checkpoint_turn > turn:
+                break
+            index, checkpoint = checkpoint_index, checkpoint_state
+        state = engine.clone_state(checkpoint)
+        while index < target:
+            engine.apply(state, expand_action(state, self.actions[index]))
+            index += 1
+        return state, index
+
+    def frames(self, turn: int) -> Iterator[Dict]:
+        """Zprávy pro klienta od začátku tahu turn do konce - stejné jako při živém zápasu"""
+        state, index = self.state_at(turn)
+        tracker = StateTracker()
+        yield tracker.full(state)
+        for record in self.actions[index:]:
+            _, events = engine.apply(state, expand_action(state, record))
+            message = tracker.delta(state)
+            if message is not None:
+                yield {**message, "events": events} if events else message
+        if state.status == "finished":
+            winner = engine.get_player(state, state.winner_id)
+            yield {
+                "type": "game_over",
+                "winner_id": state.winner_id,
+                "winner_name": winner.name if winner else "Neznámý"
+            }
+
+    def summary(self) -> Dict:
+        initial = self.data["initial"]
+        return {
+            "match_id": self.match_id,
+            "arena": self.data["arena"],
+            "players": [
+                {"player_id": p["player_id"], "name": p["name"], "robot_id": p["robot_id"], "weapon_id": p["weapon_id"]}
+                for p in initial["players"]
+            ],
+            "winner_id": self.data["winner_id"],
+            "first_turn": self.first_turn,
+            "turns": self.last_turn,
+            "actions": len(self.actions),
+            "started_at": self.data["started_at"],
+            "finished_at": self.data["finished_at"],
+            "truncated": self.truncated
+        }
+
+class ReplayStore:
+    """Nahrává zápasy v místnostech a ukládá hotové záznamy; bez adresáře (REPLAY_DIR="") nic neukládá"""
+    def __init__(self, directory: str = settings.REPLAY_DIR, cache_size: int = settings.REPLAY_CACHE_SIZE):
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.cache_size = cache_size
+        self.recordings: Dict[str, Recording] = {}  # room_id -> match in progress
+        self.cache: "OrderedDict[str, Replay]" = OrderedDict()  # match_id -> loaded replay (LRU)
+        self.cache_lock = threading.Lock()  # load() runs in the HTTP threadpool
+
+    def path(self, match_id: str) -> str:
+        return os.path.join(self.directory, match_id + ".json.gz")
+
+    # Recording (event loop)
+
+    def start_match(self, room):
+        """Začátek zápasu (nebo místnost obnovená uprostřed zápasu)"""
+        if self.enabled:
+            self.recordings[room.room_id] = Recording(room.state)
+
+    def match_id(self, room) -> Optional[str]:
+        recording = self.recordings.get(room.room_id)
+        return recording.match_id if recording is not None else None
+
+    def record_action(self, room, action: Dict):
+        recording = self.recordings.get(room.room_id)
+        if recording is not None:
+            recording.add(action)
+
+    def record_turn(self, room, actions: List[Dict]):
+        recording = self.recordings.get(room.room_id)
+        if recording is not None:
+            for action in actions:
+                recording.add(action)
+
+    async def finish_match(self, room) -> Optional[str]:
+        """Zápas skončil - uloží záznam mimo event loop a vrátí jeho id"""
+        recording = self.recordings.pop(room.room_id, None)
+        if recording is None:
+            return None
+        data = encode_replay(recording, room.state)
+        await asyncio.to_thread(self._write, recording.match_id, data)
+        return recording.match_id
+
+    def drop(self, room_id: str):
+        """Místnost zanikla před koncem zápasu - nedohraný záznam se zahodí"""
+        self.recordings.pop(room_id, None)
+
+    def _write(self, match_id: str, data: bytes):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self.path(match_id) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path(match_id))
+        except OSError as e:
+            logger.error("Záznam zápasu %s nelze uložit: %s", match_id, e)
+
+    # Playback
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        """Nejnovější uložené záznamy (bez načítání obsahu)"""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return []
+        entries = [(entry.stat().st_mtime, entry.name) for entry in os.scandir(self.directory) if entry.name.endswith(".json.gz")]
+        entries.sort(reverse=True)
+        return [{"match_id": name[:-len(".json.gz")], "finished_at": int(mtime)} for mtime, name in entries[:limit]]
+
+    def load(self, match_id: str) -> Optional[Replay]:
+        """Načte záznam (s cache posledních cache_size, volá se z vláken); neexistující nebo poškozený -> None"""
+        with self.cache_lock:
+            replay = self.cache.get(match_id)
+            if replay is not None:
+                self.cache.move_to_end(match_id)
+                return replay
+        if not self.enabled or not match_id.isalnum():
+            return None
+        try:
+            with gzip.open(self.path(match_id), "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("v") != FORMAT_VERSION:
+                raise ValueError(f"neznámá verze {data.get('v')}")
+            replay = Replay(data)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            logger.error("Záznam zápasu %s nelze načíst: %s", match_id, e)
+            return None
+        with self.cache_lock:
+            self.cache[match_id] = replay
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return replay
@@ -0,0 +1,199 @@
+"""
+Registr místností - každá místnost hostí vlastní zápas 1v1
+"""
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import metrics
+import settings
+from arena import ArenaLayout, load_layout
+from engine import GameState, Player
+from delta import StateTracker
+from cluster import Cluster
+from codec import JSON, encode
+from fanout import Connection
+from spectators import SpectatorFeed
+from timers import Timer
+
+def new_token(room_id: str) -> str:
+    """Token hráče nese id místnosti, takže reconnect na libovolný worker lze nasměrovat k vlastníkovi"""
+    return f"{room_id}.{uuid.uuid4()}"
+
+class Room:
+    """Jedna místnost - stav hry, připojení a tokeny hráčů"""
+    __slots__ = ("room_id", "state", "connections", "player_tokens", "tracker", "feed", "turn_timer",
+                 "history", "history_base")
+
+    def __init__(self, room_id: str, layout: ArenaLayout):
+        self.room_id = room_id
+        self.state = GameState(layout)
+        self.connections: Dict[str, Connection] = {}  # player_id -> connection
+        self.player_tokens: Dict[str, str] = {}  # player_id -> token
+        self.tracker = StateTracker()  # state version and last broadcast snapshot
+        self.feed: Optional[SpectatorFeed] = None  # delayed read-only stream, created for the first spectator
+        self.turn_timer: Optional[Timer] = None  # deadline of the current turn
+        # Deltas broadcast since the last full snapshot (seq history_base), for reconnecting clients
+        self.history: Deque[Dict] = deque(maxlen=settings.RESUME_BUFFER)
+        self.history_base: Optional[int] = None
+
+    def get_player(self, player_id: str) -> Optional[Player]:
+        return next((p for p in self.state.players if p.player_id == player_id), None)
+
+    def is_open(self) -> bool:
+        """Místnost přijímá nové hráče"""
+        return self.state.status != "playing" and len(self.state.players) < settings.MAX_PLAYERS
+
+    def is_empty(self) -> bool:
+        """Žádný lidský hráč - bot sám místnost nedrží"""
+        return all(p.bot for p in self.state.players)
+
+    def spectator_feed(self) -> SpectatorFeed:
+        if self.feed is None:
+            self.feed = SpectatorFeed()
+        return self.feed
+
+    def remember(self, message: Dict):
+        """Uloží rozeslanou game_state/game_delta zprávu do kruhového bufferu místnosti"""
+        if message["type"] == "game_state":
+            self.history.clear()
+            self.history_base = message["seq"]
+        else:
+            # Options are only valid for their own version - the current ones are attached on replay
+            self.history.append({key: value for key, value in message.items() if key != "turn_options"})
+
+    def missed_since(self, seq: int) -> Optional[List[Dict]]:
+        """Delty po verzi seq, kterou klient viděl; None, pokud už z bufferu vypadly (nutný plný snapshot)"""
+        current = self.tracker.seq
+        if self.history_base is None or self.tracker.snapshot is None or not self.history_base <= seq <= current:
+            return None
+        if seq == current:
+            return []
+        if not self.history or self.history[0]["seq"] > seq + 1:
+            return None
+        missed = [message for message in self.history if message["seq"] > seq]
+        missed[-1] = {**missed[-1], "turn_options": self.tracker.turn_options(self.state)}
+        return missed
+
+    def broadcast(self, message: Dict):
+        """Zařadí zprávu všem připojeným hráčům v místnosti (serializuje se jednou pro každé kódování)"""
+        started = time.perf_counter()
+        frames = {}
+        sent = 0
+        for conn in list(self.connections.values()):
+            frame = frames.get(conn.encoding)
+            if frame is None:
+                frame = frames[conn.encoding] = encode(message, conn.encoding)
+            if conn.send(frame):
+                sent += metrics.frame_size(frame)
+        if self.feed is not None and self.feed.viewers:
+            # One shared frame for all spectators, sent later by the feed task
+            self.feed.publish(frames.get(JSON) or encode(message), message["type"])
+        metrics.broadcast_bytes.inc(sent)
+        metrics.broadcast_duration.observe(time.perf_counter() - started)
+
+class RoomRegistry:
+    """Registr místností s O(1) vyhledáním podle id a tokenu"""
+    def __init__(self, max_rooms: int = settings.MAX_ROOMS, arena_map: str = settings.ARENA_MAP,
+                 cluster: Optional[Cluster] = None):
+        self.max_rooms = max_rooms
+        # With several workers: new room ids hash to this worker, open rooms are published to the others
+        self.cluster = cluster if cluster is not None and cluster.enabled else None
+        # Compiled once, shared by every room
+        self.layout = load_layout(arena_map)
+        self.rooms: Dict[str, Room] = {}
+        # Rooms with a free slot, in creation order (dict keeps insertion order)
+        self.open_rooms: Dict[str, Room] = {}
+        self.token_players: Dict[str, Tuple[str, str]] = {}  # token -> (room_id, player_id)
+
+    def get(self, room_id: str) -> Optional[Room]:
+        return self.rooms.get(room_id)
+
+    def new_room_id(self) -> str:
+        """Volné id místnosti, které na hash ringu patří tomuto workeru"""
+        while True:
+            room_id = uuid.uuid4().hex[:8]
+            if room_id not in self.rooms and (self.cluster is None or self.cluster.owns(room_id)):
+                return room_id
+
+    def create_room(self, room_id: Optional[str] = None) -> Optional[Room]:
+        if len(self.rooms) >= self.max_rooms:
+            return None
+        room = Room(room_id or self.new_room_id(), self.layout)
+        self.rooms[room.room_id] = room
+        self.refresh(room)
+        return room
+
+    def restore_room(self, room_id: str, state: GameState, tokens: Dict[str, str]) -> Room:
+        """Vloží místnost obnovenou ze žurnálu včetně tokenů hráčů"""
+        room = Room(room_id, self.layout)
+        room.state = state
+        room.player_tokens = dict(tokens)
+        for player_id, token in room.player_tokens.items():
+            self.token_players[token] = (room_id, player_id)
+        self.rooms[room_id] = room
+        self.refresh(room)
+        return room
+
+    def find_open_room(self, create: bool = True) -> Optional[Room]:
+        """Vrátí první místnost s volným místem, případně založí novou"""
+        room = next(iter(self.open_rooms.values()), None)
+        return room or (self.create_room() if create else None)
+
+    def refresh(self, room: Room):
+        """Aktualizuje zařazení místnosti mezi otevřené po změně hráčů nebo stavu"""
+        if room.room_id not in self.rooms:
+            return
+        if room.is_open():
+            if room.room_id not in self.open_rooms and self.cluster is not None:
+                self.cluster.backend.room_opened(room.room_id, self.cluster.worker_id)
+            self.open_rooms[room.room_id] = room
+        elif self.open_rooms.pop(room.room_id, None) is not None and self.cluster is not None:
+            self.cluster.backend.room_closed(room.room_id)
+
+    def add_player(self, room: Room, player: Player, conn: Connection) -> str:
+        """Přidá hráče do místnosti a vrátí jeho token"""
+        player_id = player.player_id
+        token = new_token(room.room_id)
+        room.state.players.append(player)
+        room.connections[player_id] = conn
+        room.player_tokens[player_id] = token
+        self.token_players[token] = (room.room_id, player_id)
+        self.refresh(room)
+        return token
+
+    def add_bot(self, room: Room, player: Player):
+        """Přidá bota - nemá spojení ani token, tahy za něj hraje server"""
+        room.state.players.append(player)
+        self.refresh(room)
+
+    def resolve_token(self, token: str) -> Tuple[Optional[Room], Optional[str]]:
+        entry = self.token_players.get(token)
+        if not entry:
+            return None, None
+        room_id, player_id = entry
+        return self.rooms.get(room_id), player_id
+
+    def remove_player(self, room: Room, player_id: str):
+        """Odebere hráče z místnosti, prázdnou místnost zruší"""
+        room.state.players = [p for p in room.state.players if p.player_id != player_id]
+        room.connections.pop(player_id, None)
+        token = room.player_tokens.pop(player_id, None)
+        if token:
+            self.token_players.pop(token, None)
+        if room.is_empty():
+            self.remove_room(room)
+        else:
+            self.refresh(room)
+
+    def remove_room(self, room: Room):
+        for token in room.player_tokens.values():
+            self.token_players.pop(token, None)
+        self.rooms.pop(room.room_id, None)
+        if self.open_rooms.pop(room.room_id, None) is not None and self.cluster is not None:
+            self.cluster.backend.room_closed(room.room_id)
+        if room.turn_timer is not None:
+            room.turn_timer.cancel()
+        if room.feed is not None:
+            room.feed.close({"type": "room_closed", "room_id": room.room_id})
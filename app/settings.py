@@ -7,11 +7,82 @@ import os
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
 
-# Grid settings
-GRID_COLS = int(os.getenv("GRID_COLS", "18"))
-GRID_ROWS = int(os.getenv("GRID_ROWS", "12"))
+# Arena map from data/arenas/<name>.json (grid size, traps, spawns, background)
+ARENA_MAP = os.getenv("ARENA_MAP", "default")
+
+# Network settings
+# Outbound queue per connection - a client falling this many messages behind is disconnected
+SEND_QUEUE_MAX = int(os.getenv("SEND_QUEUE_MAX", "64"))
+
+# Spectators - per-room viewer cap, stream delay in seconds, full snapshot every N deltas for late viewers
+MAX_SPECTATORS = int(os.getenv("MAX_SPECTATORS", "500"))
+SPECTATOR_DELAY = float(os.getenv("SPECTATOR_DELAY", "0"))
+SPECTATOR_KEYFRAME_EVERY = int(os.getenv("SPECTATOR_KEYFRAME_EVERY", "30"))
+
+# Journal (crash recovery) - empty JOURNAL_DIR disables it
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "/app/journal")
+# Records after which a room log is compacted into a snapshot
+JOURNAL_SNAPSHOT_EVERY = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "50"))
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "0.05"))
+
+# Match replays - empty REPLAY_DIR disables recording
+REPLAY_DIR = os.getenv("REPLAY_DIR", "/app/replays")
+# Seeking re-simulates from the nearest checkpoint, taken every N turns when a replay is loaded
+REPLAY_CHECKPOINT_EVERY = int(os.getenv("REPLAY_CHECKPOINT_EVERY", "10"))
+REPLAY_CACHE_SIZE = int(os.getenv("REPLAY_CACHE_SIZE", "32"))
+
+# Matchmaking queue - matcher period, rating window that widens by WIDEN_BY every WIDEN_EVERY seconds
+# up to MAX_WINDOW; after MAX_WAIT seconds any opponent will do
+MATCHMAKING_INTERVAL = float(os.getenv("MATCHMAKING_INTERVAL", "0.5"))
+MATCHMAKING_WINDOW = int(os.getenv("MATCHMAKING_WINDOW", "50"))
+MATCHMAKING_WIDEN_BY = int(os.getenv("MATCHMAKING_WIDEN_BY", "50"))
+MATCHMAKING_WIDEN_EVERY = float(os.getenv("MATCHMAKING_WIDEN_EVERY", "5"))
+MATCHMAKING_MAX_WINDOW = int(os.getenv("MATCHMAKING_MAX_WINDOW", "400"))
+MATCHMAKING_MAX_WAIT = float(os.getenv("MATCHMAKING_MAX_WAIT", "60"))
+# Players checked per matcher tick - bounds the time one tick blocks the event loop
+MATCHMAKING_BATCH = int(os.getenv("MATCHMAKING_BATCH", "2000"))
+# Elo ratings by player name
+RATING_DEFAULT = int(os.getenv("RATING_DEFAULT", "1000"))
+RATING_K = int(os.getenv("RATING_K", "32"))
+
+# AI opponents - worker processes for the move search (0 disables bots)
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "2"))
+
+# Timers - one hashed timer wheel (tick in seconds x slots) drives every deadline below
+TIMER_TICK = float(os.getenv("TIMER_TICK", "0.1"))
+TIMER_SLOTS = int(os.getenv("TIMER_SLOTS", "1024"))
+# Seconds per turn before the server ends it (0 = no limit)
+TURN_TIMEOUT = float(os.getenv("TURN_TIMEOUT", "60"))
+# Seconds a player disconnected mid-game has to reconnect before forfeiting
+RECONNECT_GRACE = float(os.getenv("RECONNECT_GRACE", "60"))
+# game_delta messages kept per room - a reconnecting client gets only the ones it missed
+RESUME_BUFFER = int(os.getenv("RESUME_BUFFER", "64"))
+# Application-level ping every HEARTBEAT_INTERVAL; a socket silent for HEARTBEAT_TIMEOUT is closed
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", "20"))
+HEARTBEAT_TIMEOUT = float(os.getenv("HEARTBEAT_TIMEOUT", "60"))
+# Per-connection rate limits (token buckets in ratelimit.py) multiplied by RATE_LIMIT_SCALE (0 disables them);
+# a client whose messages are rejected RATE_LIMIT_STRIKES times in a row (one forgiven per second) is disconnected
+RATE_LIMIT_SCALE = float(os.getenv("RATE_LIMIT_SCALE", "1"))
+RATE_LIMIT_STRIKES = int(os.getenv("RATE_LIMIT_STRIKES", "20"))
+
+# Multi-worker mode (python cluster.py) - WORKERS processes on ports PORT..PORT+WORKERS-1, each owns the rooms
+# whose id hashes to it; clients connected elsewhere are redirected
+WORKERS = int(os.getenv("WORKERS", "1"))
+WORKER_ID = int(os.getenv("WORKER_ID", "0"))
+# Public WebSocket URLs of the workers, comma separated (behind a proxy); empty = request host, port PORT + worker
+WORKER_URLS = [url for url in os.getenv("WORKER_URLS", "").split(",") if url]
+# Shared lobby state - "memory" (one process) or "sqlite:///path/cluster.db" (workers on one machine)
+CLUSTER_BACKEND = os.getenv("CLUSTER_BACKEND", "memory")
+# Virtual nodes per worker on the hash ring
+CLUSTER_VNODES = int(os.getenv("CLUSTER_VNODES", "64"))
+
+# Static files built on startup (or in the image: python assets.py) - fingerprinted copies, gzip/brotli variants
+ASSET_BUILD_DIR = os.getenv("ASSET_BUILD_DIR", "/app/build")
+# Cell size of the robot sprite atlas in px (icons are drawn at about 48 px, this covers 2.5x high-DPI screens)
+SPRITE_SIZE = int(os.getenv("SPRITE_SIZE", "120"))
 
 # Game settings
 MAX_PLAYERS = int(os.getenv("MAX_PLAYERS", "2"))
+MAX_ROOMS = int(os.getenv("MAX_ROOMS", "10000"))
 AP_PER_TURN = int(os.getenv("AP_PER_TURN", "3"))
 
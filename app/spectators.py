@@ -0,0 +1,142 @@
+"""
+Diváci místnosti - stejný proud lobby_state/game_state/game_delta/game_over jako hráči,
+se zpožděním a limitem diváků. Každá zpráva se zakóduje jednou a rámec sdílí všichni diváci;
+rozesílání divákům běží ve vlastním tasku, mimo zpracování akcí hráčů.
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+import settings
+from codec import JSON, encode
+from fanout import Connection
+
+class FeedFrame:
+    """Jedna zpráva v proudu pro diváky; JSON rámec je kanonický, ostatní kódování se dopočítají při prvním použití"""
+    __slots__ = ("release_at", "msg_type", "keyframe", "frames")
+
+    def __init__(self, release_at: float, msg_type: str, json_frame: str, keyframe: bool = False):
+        self.release_at = release_at
+        self.msg_type = msg_type
+        self.keyframe = keyframe  # Only used to catch up new viewers, not sent to current ones
+        self.frames = {JSON: json_frame}
+
+    def frame(self, encoding: str):
+        frame = self.frames.get(encoding)
+        if frame is None:
+            frame = self.frames[encoding] = encode(json.loads(self.frames[JSON]), encoding)
+        return frame
+
+class SpectatorFeed:
+    """Zpožděný proud zpráv jedné místnosti; aktivní jen dokud se někdo dívá"""
+    def __init__(self, delay: float = settings.SPECTATOR_DELAY, max_viewers: int = settings.MAX_SPECTATORS,
+                 keyframe_every: int = settings.SPECTATOR_KEYFRAME_EVERY):
+        self.delay = delay
+        self.max_viewers = max_viewers
+        self.keyframe_every = keyframe_every
+        self.viewers: Set[Connection] = set()
+        self.pending: Deque[FeedFrame] = deque()  # Published, waiting for the delay
+        # Released frames a new viewer needs to catch up: last lobby_state + game_state and deltas since
+        self.lobby: Optional[FeedFrame] = None
+        self.catchup: List[FeedFrame] = []
+        self.since_keyframe = 0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.viewers)
+
+    def is_full(self) -> bool:
+        return len(self.viewers) >= self.max_viewers
+
+    def subscribe(self, conn: Connection, lobby_message: Dict, state_message: Optional[Dict]):
+        """Přidá diváka; první divák proud nastartuje ze zadaného aktuálního stavu"""
+        if not self.viewers:
+            self._clear()
+            self.viewers.add(conn)
+            self.publish(encode(lobby_message), lobby_message["type"])
+            if state_message is not None:
+                self.publish(encode(state_message), state_message["type"])
+            return
+        self.viewers.add(conn)
+        # Catch up to the delayed position of the stream
+        if self.lobby is not None:
+            conn.send(self.lobby.frame(conn.encoding))
+        for item in self.catchup:
+            conn.send(item.frame(conn.encoding))
+
+    def unsubscribe(self, conn: Connection):
+        self.viewers.discard(conn)
+        if not self.viewers:
+            self._clear()
+
+    def publish(self, json_frame: str, msg_type: str, keyframe: bool = False):
+        """Zařadí již zakódovanou zprávu do proudu (volá se jednou na zprávu, bez ohledu na počet diváků)"""
+        if not self.viewers:
+            return
+        if msg_type == "game_delta":
+            self.since_keyframe += 1
+        elif msg_type == "game_state":
+            self.since_keyframe = 0
+        loop = asyncio.get_running_loop()
+        self.pending.append(FeedFrame(loop.time() + self.delay, msg_type, json_frame, keyframe))
+        if self.task is None:
+            self.task = asyncio.create_task(self._release_loop())
+
+    def wants_keyframe(self) -> bool:
+        """Proud potřebuje plný snapshot, aby noví diváci nepřehrávali dlouhou řadu delt"""
+        return self.active and self.since_keyframe >= self.keyframe_every
+
+    def publish_keyframe(self, state_message: Dict):
+        """Plný snapshot jen pro dohánění nových diváků - stávajícím divákům se neposílá"""
+        self.publish(encode(state_message), state_message["type"], keyframe=True)
+
+    async def _release_loop(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.pending:
+                item = self.pending[0]
+                wait = item.release_at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                self.pending.popleft()
+                self._release(item)
+        finally:
+            self.task = None
+
+    def _release(self, item: FeedFrame):
+        if item.keyframe:
+            self.catchup = [item]
+            return
+        if item.msg_type == "lobby_state":
+            self.lobby = item
+        elif item.msg_type == "game_state":
+            self.catchup = [item]
+        else:
+            self.catchup.append(item)
+        self._send(item)
+
+    def _send(self, item: FeedFrame):
+        for conn in list(self.viewers):
+            conn.send(item.frame(conn.encoding))
+
+    def _clear(self):
+        self.pending.clear()
+        self.lobby = None
+        self.catchup = []
+        self.since_keyframe = 0
+
+    def close(self, message: Dict):
+        """Místnost zanikla - divákům pošle závěrečnou zprávu a proud zastaví"""
+        frames: Dict[str, object] = {}
+        for conn in list(self.viewers):
+            frame = frames.get(conn.encoding)
+            if frame is None:
+                frame = frames[conn.encoding] = encode(message, conn.encoding)
+            conn.send(frame)
+        self.viewers.clear()
+        self._clear()
+        if self.task is not None:
+            self.task.cancel()
@@ -3,12 +3,67 @@ let ws = null;
 let playerId = null;
 let token = null;
 let currentGameState = null;
+let lastSeq = 0; // Sequence number of the last applied game_state/game_delta
 let seedData = null;
+let workerUrl = null; // Worker that owns our room in multi-worker mode (null = same host as the page)
+let robotSprites = {}; // robot_id -> Promise of the icon URL cut from the sprite atlas
+
+// Fingerprinted URL of a static file (window.ASSETS from the server), the plain path if it was not built
+function assetUrl(path) {
+    return (window.ASSETS && window.ASSETS.files[path]) || path;
+}
+
+// Robot icons come from one sprite atlas - one request for all robots instead of one each
+function loadSpriteAtlas() {
+    if (!loadSpriteAtlas.promise) {
+        loadSpriteAtlas.promise = new Promise(resolve => {
+            const sprites = window.ASSETS && window.ASSETS.sprites;
+            if (!sprites) {
+                resolve(null);
+                return;
+            }
+            const img = new Image();
+            img.onload = () => resolve(img);
+            img.onerror = () => resolve(null);
+            img.src = sprites.url;
+        });
+    }
+    return loadSpriteAtlas.promise;
+}
+
+// Icon URL for a robot - a data URL cut from the atlas, or the separate image as a fallback
+function robotIconUrl(robotId) {
+    if (!robotSprites[robotId]) {
+        robotSprites[robotId] = loadSpriteAtlas().then(atlas => {
+            const sprites = window.ASSETS && window.ASSETS.sprites;
+            const cell = sprites && sprites.cells[robotId];
+            if (!atlas || !cell) {
+                return assetUrl(`/static/images/robots/${robotId}.png`);
+            }
+            const canvas = document.createElement('canvas');
+            canvas.width = sprites.size;
+            canvas.height = sprites.size;
+            canvas.getContext('2d').drawImage(atlas, cell[0], cell[1], sprites.size, sprites.size, 0, 0, sprites.size, sprites.size);
+            return canvas.toDataURL();
+        });
+    }
+    return robotSprites[robotId];
+}
+
+function setRobotIcon(img, robotId) {
+    img.dataset.robotId = robotId;
+    robotIconUrl(robotId).then(url => {
+        // The robot may have changed while the atlas was loading
+        if (img.dataset.robotId === robotId) {
+            img.src = url;
+        }
+    });
+}
 
 // Initialize on page load
 window.addEventListener('DOMContentLoaded', () => {
     // Load version info
-    fetch('/static/version.json')
+    fetch(assetUrl('/static/version.json'))
         .then(response => response.json())
         .then(data => {
             const versionInfo = document.getElementById('version-info');
@@ -31,6 +86,7 @@ window.addEventListener('DOMContentLoaded', () => {
     // Load session data
     token = sessionStorage.getItem('token');
     playerId = sessionStorage.getItem('player_id');
+    workerUrl = sessionStorage.getItem('worker_url');
     
     const savedPlayerName = sessionStorage.getItem('player_name');
     const nameInput = document.getElementById('player-name');
@@ -38,6 +94,19 @@ window.addEventListener('DOMContentLoaded', () => {
         nameInput.value = savedPlayerName;
     }
     
+    // Spectator link (?spectate=abcd1234) - watch a room read-only
+    const spectateRoomId = new URLSearchParams(window.location.search).get('spectate');
+    if (spectateRoomId) {
+        window.spectateRoomId = spectateRoomId;
+        connectWebSocket();
+    }
+    
+    // Replay link (?replay=<match_id>&turn=N) - play back a finished match
+    const params = new URLSearchParams(window.location.search);
+    if (params.get('replay')) {
+        playReplay(params.get('replay'), parseInt(params.get('turn') || '1', 10));
+    }
+    
     // Load saved robot and weapon selection
     const savedRobotId = sessionStorage.getItem('selected_robot_id');
     const savedWeaponId = sessionStorage.getItem('selected_weapon_id');
@@ -48,6 +117,15 @@ window.addEventListener('DOMContentLoaded', () => {
         joinBtn.addEventListener('click', handleJoin);
     }
     
+    // Matchmaking button - server pairs us with an opponent of similar rating
+    const queueBtn = document.getElementById('queue-btn');
+    if (queueBtn) {
+        queueBtn.addEventListener('click', () => {
+            window.matchmaking = true;
+            handleJoin();
+        });
+    }
+    
     // Enter key in name input
     if (nameInput) {
         nameInput.addEventListener('keypress', (e) => {
@@ -69,6 +147,12 @@ window.addEventListener('DOMContentLoaded', () => {
         leaveBtn.addEventListener('click', handleLeave);
     }
     
+    // Add an AI opponent to the free slot
+    const addBotBtn = document.getElementById('add-bot-btn');
+    if (addBotBtn) {
+        addBotBtn.addEventListener('click', handleAddBot);
+    }
+    
     // Robot and weapon selects
     const robotSelect = document.getElementById('robot-select');
     const weaponSelect = document.getElementById('weapon-select');
@@ -106,8 +190,11 @@ function handleJoin() {
     // Clear old token if joining with new name
     sessionStorage.removeItem('token');
     sessionStorage.removeItem('player_id');
+    sessionStorage.removeItem('worker_url');
     token = null;
     playerId = null;
+    workerUrl = null;
+    window.redirected = false;
     
     sessionStorage.setItem('player_name', name);
     window.pendingJoinName = name;
@@ -141,7 +228,7 @@ function handleJoin() {
 
 function sendJoinMessage(name) {
     if (ws && ws.readyState === WebSocket.OPEN) {
-        const joinMessage = { type: 'join', name: name };
+        const joinMessage = buildJoinMessage(name);
         try {
             ws.send(JSON.stringify(joinMessage));
             return true;
@@ -153,18 +240,40 @@ function sendJoinMessage(name) {
     return false;
 }
 
+function buildJoinMessage(name) {
+    const joinMessage = { type: window.matchmaking ? 'queue' : 'join', name: name };
+    // Seed data already loaded in this page - server skips resending it if unchanged
+    if (seedData && seedData.etag) {
+        joinMessage.seed_etag = seedData.etag;
+    }
+    // Optional room id from URL (?room=abcd1234) to join a friend's room
+    const roomId = new URLSearchParams(window.location.search).get('room');
+    if (roomId && !window.matchmaking) {
+        joinMessage.room_id = roomId;
+    }
+    // Already sent here by another worker - join on this one
+    if (window.redirected && !window.matchmaking) {
+        joinMessage.redirected = true;
+    }
+    return joinMessage;
+}
+
 function connectWebSocket() {
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${protocol}//${window.location.host}/ws`;
+    const wsUrl = workerUrl || `${protocol}//${window.location.host}/ws`;
     
     ws = new WebSocket(wsUrl);
     
     ws.onopen = () => {
-        if (token) {
-            ws.send(JSON.stringify({ type: 'reconnect', token: token }));
+        if (window.spectateRoomId) {
+            ws.send(JSON.stringify({ type: 'spectate', room_id: window.spectateRoomId }));
+        } else if (token) {
+            // With a state in hand the server sends only the deltas missed while offline
+            const lastSeen = currentGameState && currentGameState.status === 'playing' ? lastSeq : null;
+            ws.send(JSON.stringify({ type: 'reconnect', token: token, seed_etag: seedData ? seedData.etag : null, last_seq: lastSeen }));
         } else if (window.pendingJoinName) {
             const name = window.pendingJoinName;
-            const joinMessage = { type: 'join', name: name };
+            const joinMessage = buildJoinMessage(name);
             ws.send(JSON.stringify(joinMessage));
             delete window.pendingJoinName;
         }
@@ -203,6 +312,50 @@ function connectWebSocket() {
     };
 }
 
+function switchWorker(url) {
+    // Reconnect to the worker that owns the room (or the matchmaking queue); onopen repeats the request there
+    workerUrl = url;
+    sessionStorage.setItem('worker_url', url);
+    if (ws) {
+        ws.onclose = null;
+        ws.close();
+    }
+    if (!token && !window.spectateRoomId) {
+        window.pendingJoinName = sessionStorage.getItem('player_name');
+        window.redirected = true;
+    }
+    connectWebSocket();
+}
+
+const REPLAY_FRAME_MS = 400;
+
+async function playReplay(matchId, turn) {
+    // Server streams the same messages a live client gets (seed, game_state, game_delta..., game_over)
+    const response = await fetch(`/replays/${encodeURIComponent(matchId)}/frames?turn=${turn}`);
+    if (!response.ok) {
+        showError('Záznam zápasu nenalezen');
+        return;
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        for (const line of lines) {
+            if (!line) continue;
+            const message = JSON.parse(line);
+            handleMessage(message);
+            if (message.type === 'game_delta') {
+                await new Promise(resolve => setTimeout(resolve, REPLAY_FRAME_MS));
+            }
+        }
+    }
+}
+
 function handleMessage(message) {
     switch (message.type) {
         case 'join_ok':
@@ -213,11 +366,46 @@ function handleMessage(message) {
             showScreen('lobby-screen');
             break;
         
-        case 'reconnect_ok':
+        case 'queued':
+            showScreen('lobby-screen');
+            document.getElementById('lobby-status').textContent = `Hledám soupeře (rating ${message.rating})…`;
+            break;
+        
+        case 'match_found':
             playerId = message.player_id;
+            token = message.token;
+            sessionStorage.setItem('player_id', playerId);
+            sessionStorage.setItem('token', token);
+            window.matchmaking = false;
+            showScreen('lobby-screen');
+            if (message.url) {
+                // The room was created on another worker - continue there with the token
+                switchWorker(message.url);
+            }
+            break;
+        
+        case 'redirect':
+            switchWorker(message.url);
+            break;
+        
+        case 'spectate_ok':
             showScreen('lobby-screen');
             break;
         
+        case 'room_closed':
+            showError('Místnost byla zrušena');
+            break;
+        
+        case 'reconnect_ok':
+            playerId = message.player_id;
+            if (message.resumed && currentGameState) {
+                // Missed deltas (if any) follow
+                applyGameState(currentGameState);
+            } else {
+                showScreen('lobby-screen');
+            }
+            break;
+        
         case 'seed':
             seedData = message;
             window.seedData = message; // Make available to arena.js
@@ -232,9 +420,14 @@ function handleMessage(message) {
                     players: message.players || []
                 };
             } else {
-                // Merge lobby state into current game state
+                // Merge lobby state into current game state (keep pos/hp of players)
                 if (message.players) {
-                    currentGameState.players = message.players;
+                    message.players.forEach(lobbyPlayer => {
+                        const player = currentGameState.players.find(p => p.player_id === lobbyPlayer.player_id);
+                        if (player) {
+                            Object.assign(player, lobbyPlayer);
+                        }
+                    });
                 }
                 if (message.status) {
                     currentGameState.status = message.status;
@@ -249,25 +442,34 @@ function handleMessage(message) {
             break;
         
         case 'game_state':
+            // Full snapshot (match start, reconnect, resync)
             currentGameState = message;
-            showScreen('game-screen');
-            // Initialize audio when game starts
-            if (window.audioManager && message.status === 'playing') {
-                window.audioManager.initializeAudio();
-            }
-            // Reset previousHp when game state updates
-            if (message.players) {
-                message.players.forEach(player => {
-                    previousHp[player.player_id] = player.hp || 0;
-                });
+            lastSeq = message.seq;
+            applyGameState(currentGameState);
+            break;
+        
+        case 'game_delta':
+            if (!currentGameState || message.seq !== lastSeq + 1) {
+                // Missed an update - ask for a full snapshot
+                if (ws && ws.readyState === WebSocket.OPEN) {
+                    ws.send(JSON.stringify({ type: 'resync' }));
+                }
+                break;
             }
-            updateGame(message);
+            lastSeq = message.seq;
+            applyGameDelta(message);
+            applyGameState(currentGameState);
             break;
         
         case 'action_rejected':
+        case 'turn_rejected':
             handleActionRejected(message);
             break;
         
+        case 'turn_ok':
+            // Batched turn applied - state arrives with the following game_delta
+            break;
+        
         case 'traps_state':
             updateTraps(message.traps_state || {});
             break;
@@ -276,12 +478,59 @@ function handleMessage(message) {
             handleGameOver(message);
             break;
         
+        case 'ping':
+            // Server heartbeat - a silent socket would be closed
+            if (ws && ws.readyState === WebSocket.OPEN) {
+                ws.send(JSON.stringify({ type: 'pong' }));
+            }
+            break;
+        
         case 'error':
             showError(message.message || 'Nastala chyba');
             break;
     }
 }
 
+function applyGameState(state) {
+    showScreen('game-screen');
+    // Initialize audio when game starts
+    if (window.audioManager && state.status === 'playing') {
+        window.audioManager.initializeAudio();
+    }
+    // Reset previousHp when game state updates
+    if (state.players) {
+        state.players.forEach(player => {
+            previousHp[player.player_id] = player.hp || 0;
+        });
+    }
+    updateGame(state);
+}
+
+function applyGameDelta(delta) {
+    // Only changed fields are sent - merge them into the current state
+    if (delta.state) {
+        Object.assign(currentGameState, delta.state);
+    }
+    if ('turn_options' in delta) {
+        currentGameState.turn_options = delta.turn_options;
+    }
+    if (delta.players) {
+        Object.entries(delta.players).forEach(([id, changes]) => {
+            const player = currentGameState.players.find(p => p.player_id === id);
+            if (player) {
+                Object.assign(player, changes);
+            }
+        });
+    }
+    if (delta.traps) {
+        currentGameState.traps_runtime = currentGameState.traps_runtime || {};
+        Object.entries(delta.traps).forEach(([id, changes]) => {
+            currentGameState.traps_runtime[id] = Object.assign(currentGameState.traps_runtime[id] || {}, changes);
+        });
+        updateTraps(currentGameState.traps_runtime);
+    }
+}
+
 function populateLoadoutSelects() {
     if (!seedData) return;
     
@@ -322,7 +571,7 @@ function populateLoadoutSelects() {
     if (savedRobotId) {
         const robotIcon = document.getElementById('robot-icon');
         if (robotIcon) {
-            robotIcon.src = `/static/images/robots/${savedRobotId}.png`;
+            setRobotIcon(robotIcon, savedRobotId);
             robotIcon.alt = seedData?.robots?.find(r => r.id === savedRobotId)?.name || '';
             robotIcon.style.display = 'block';
             updateRobotTooltip(savedRobotId);
@@ -377,7 +626,7 @@ function handleLoadoutChange() {
     // Update robot icon
     if (robotIcon) {
         if (robotId) {
-            robotIcon.src = `/static/images/robots/${robotId}.png`;
+            setRobotIcon(robotIcon, robotId);
             robotIcon.alt = seedData?.robots?.find(r => r.id === robotId)?.name || '';
             robotIcon.style.display = 'block';
             updateRobotTooltip(robotId);
@@ -453,12 +702,26 @@ function handleReady() {
     }));
 }
 
+function handleAddBot() {
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+        showError('Není připojení k serveru');
+        return;
+    }
+    const levelSelect = document.getElementById('bot-level');
+    ws.send(JSON.stringify({
+        type: 'add_bot',
+        level: levelSelect ? levelSelect.value : 'normal'
+    }));
+}
+
 function handleLeave() {
     // Clear session data (but keep player_name, selected_robot_id, selected_weapon_id)
     sessionStorage.removeItem('token');
     sessionStorage.removeItem('player_id');
+    sessionStorage.removeItem('worker_url');
     token = null;
     playerId = null;
+    workerUrl = null;
     currentGameState = null;
     
     // Close WebSocket
@@ -515,7 +778,7 @@ function updateLobby(state) {
     const robotSelect = document.getElementById('robot-select');
     const robotIcon = document.getElementById('robot-icon');
     if (robotSelect && robotIcon && robotSelect.value) {
-        robotIcon.src = `/static/images/robots/${robotSelect.value}.png`;
+        setRobotIcon(robotIcon, robotSelect.value);
         robotIcon.alt = seedData?.robots?.find(r => r.id === robotSelect.value)?.name || '';
         robotIcon.style.display = 'block';
     }
@@ -580,6 +843,20 @@ function handleEndTurn() {
     }));
 }
 
+// Send a whole turn at once, e.g. [{type: 'move', to_x, to_y}, {type: 'attack', target_player_id}, {type: 'end_turn'}]
+function submitTurn(actions, clientTurnId) {
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+        showError('Není připojení k serveru');
+        return;
+    }
+    
+    ws.send(JSON.stringify({
+        type: 'submit_turn',
+        client_turn_id: clientTurnId,
+        actions: actions
+    }));
+}
+
 // Store previous HP to detect damage
 let previousHp = {};
 
@@ -639,7 +916,7 @@ function updatePlayerInfo(state) {
         
         // Update robot icon
         if (playerAIcon && playerA.robot_id) {
-            playerAIcon.src = `/static/images/robots/${playerA.robot_id}.png`;
+            setRobotIcon(playerAIcon, playerA.robot_id);
             playerAIcon.alt = seedData?.robots?.find(r => r.id === playerA.robot_id)?.name || '';
             playerAIcon.style.display = 'block';
         } else if (playerAIcon) {
@@ -765,7 +1042,7 @@ function updatePlayerInfo(state) {
         
         // Update robot icon
         if (playerBIcon && playerB.robot_id) {
-            playerBIcon.src = `/static/images/robots/${playerB.robot_id}.png`;
+            setRobotIcon(playerBIcon, playerB.robot_id);
             playerBIcon.alt = seedData?.robots?.find(r => r.id === playerB.robot_id)?.name || '';
             playerBIcon.style.display = 'block';
         } else if (playerBIcon) {
@@ -949,8 +1226,18 @@ function escapeHtml(text) {
 window.ws = () => ws;
 window.playerId = () => playerId;
 window.sendAction = (action) => {
-    if (ws && ws.readyState === WebSocket.OPEN) {
-        ws.send(JSON.stringify(action));
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+        return;
+    }
+    // The last AP goes out together with end_turn as one submit_turn - a single round trip instead of
+    // the action, its delta and the auto end_turn; a rejection rolls back like action_rejected
+    const state = currentGameState;
+    const lastAp = state && state.status === 'playing' && state.turn_player_id === playerId && state.ap_remaining === 1;
+    if (lastAp && (action.type === 'action_move' || action.type === 'action_attack')) {
+        const { type, client_action_id, ...fields } = action;
+        submitTurn([{ type: type.replace('action_', ''), ...fields }, { type: 'end_turn' }], client_action_id);
+        return;
     }
+    ws.send(JSON.stringify(action));
 };
 
@@ -1,6 +1,6 @@
-// Arena and grid management
-const GRID_COLS = 18;
-const GRID_ROWS = 12;
+// Arena and grid management - grid size comes from the server (state.arena)
+let GRID_COLS = 18;
+let GRID_ROWS = 12;
 const CELL_WIDTH = 60; // Based on SVG size (1080/18 = 60)
 const CELL_HEIGHT = 60; // Based on SVG size (720/12 = 60)
 
@@ -49,7 +49,7 @@ function loadRobotIcon(robotId, callback) {
         robotIcons[robotId] = null;
         callback(null);
     };
-    img.src = `/static/images/robots/${robotId}.png`;
+    robotIconUrl(robotId).then(url => { img.src = url; });
 }
 
 function setupGridOverlay() {
@@ -437,6 +437,7 @@ function handleGridClick(event) {
     
     if (targetPlayer) {
         // Attack
+        if (!isAttackAllowed(targetPlayer.player_id)) return;
         const clientActionId = 'action_' + Date.now();
         window.sendAction({
             type: 'action_attack',
@@ -448,8 +449,8 @@ function handleGridClick(event) {
         const dx = Math.abs(gridX - currentPos.x);
         const dy = Math.abs(gridY - currentPos.y);
         
-        // Check if adjacent (8-directional)
-        if (dx <= 1 && dy <= 1 && (dx > 0 || dy > 0)) {
+        // Check if adjacent (8-directional) and reachable per the server
+        if (dx <= 1 && dy <= 1 && (dx > 0 || dy > 0) && isMoveAllowed(gridX, gridY)) {
             // Optimistic movement
             optimisticPos = { x: gridX, y: gridY };
             drawGrid();
@@ -465,6 +466,22 @@ function handleGridClick(event) {
     }
 }
 
+// Valid actions computed by the server for the current state version (turn_options)
+function isMoveAllowed(x, y) {
+    if (!currentGameState || currentGameState.turn_player_id !== window.playerId()) return false;
+    const options = currentGameState.turn_options;
+    if (!options || options.player_id !== window.playerId()) return true; // Unknown - let the server decide
+    return options.moves.some(move => move[0] === x && move[1] === y);
+}
+
+function isAttackAllowed(targetPlayerId) {
+    if (!currentGameState || currentGameState.turn_player_id !== window.playerId()) return false;
+    const options = currentGameState.turn_options;
+    // Targets are computed from the confirmed position, not the optimistic one
+    if (!options || options.player_id !== window.playerId() || optimisticPos) return true;
+    return options.attack_targets.includes(targetPlayerId);
+}
+
 function setupKeyboardControls() {
     // Handle arrow key presses
     document.addEventListener('keydown', (event) => {
@@ -526,6 +543,7 @@ function setupKeyboardControls() {
         
         if (occupiedBy) {
             // Attack instead of move
+            if (!isAttackAllowed(occupiedBy.player_id)) return;
             const clientActionId = 'action_' + Date.now();
             window.sendAction({
                 type: 'action_attack',
@@ -534,6 +552,7 @@ function setupKeyboardControls() {
             });
         } else {
             // Move to new position
+            if (!isMoveAllowed(newX, newY)) return;
             // Optimistic movement
             optimisticPos = { x: newX, y: newY };
             drawGrid();
@@ -551,8 +570,23 @@ function setupKeyboardControls() {
 
 let blinkAnimationId = null;
 
+function applyArenaLayout(arena) {
+    if (!arena) return;
+    if (arena.cols !== GRID_COLS || arena.rows !== GRID_ROWS) {
+        GRID_COLS = arena.cols;
+        GRID_ROWS = arena.rows;
+        gridBackgroundCanvas = null; // Force grid lines redraw
+    }
+    const svg = document.getElementById('arena-svg');
+    const background = arena.background && assetUrl(arena.background);
+    if (svg && background && svg.getAttribute('data') !== background) {
+        svg.setAttribute('data', background);
+    }
+}
+
 function updateArena(state) {
     currentGameState = state;
+    applyArenaLayout(state.arena);
     
     // Reset optimistic position
     optimisticPos = null;
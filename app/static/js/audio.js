@@ -14,9 +14,9 @@ function playSound(soundPath, volume = 0.5) {
 
 // Sound paths
 const SOUNDS = {
-    weapon_hit: '/static/sfx/weapons/hit_01.mp3',
-    trap_hit: '/static/sfx/traps/trap_hit_01.mp3',
-    robot_explode: '/static/sfx/explosion/robot_explode_01.mp3'
+    weapon_hit: assetUrl('/static/sfx/weapons/hit_01.mp3'),
+    trap_hit: assetUrl('/static/sfx/traps/trap_hit_01.mp3'),
+    robot_explode: assetUrl('/static/sfx/explosion/robot_explode_01.mp3')
 };
 
 // Simple audio manager interface
@@ -0,0 +1,92 @@
+"""
+Hashovaný časovací kruh - všechny časovače serveru (limity tahů, návrat po odpojení, heartbeaty)
+obsluhuje jediný task. Naplánování i zrušení je O(1), jeden krok kruhu projde jen jednu přihrádku.
+"""
+import asyncio
+import logging
+import math
+from typing import Callable, Dict, List, Optional
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+class Timer:
+    """Naplánované volání; zrušený časovač se z přihrádky odstraní, až na ni kruh dojde"""
+    __slots__ = ("rounds", "callback", "args", "cancelled")
+
+    def __init__(self, rounds: int, callback: Callable, args: tuple):
+        self.rounds = rounds  # Full turns of the wheel left before it fires
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TimerWheel:
+    """Kruh slots přihrádek po tick sekundách; delší limity čekají víc otáček (rounds)"""
+    def __init__(self, tick: float = settings.TIMER_TICK, slots: int = settings.TIMER_SLOTS):
+        self.tick = tick
+        self.slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self.position = 0
+        self.size = 0  # Entries in the wheel, including cancelled ones not swept yet
+        self.fired = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """Zavolá callback(*args) za delay sekund (zaokrouhleno nahoru na tick)"""
+        ticks = max(1, math.ceil(delay / self.tick))
+        timer = Timer((ticks - 1) // len(self.slots), callback, args)
+        self.slots[(self.position + ticks) % len(self.slots)].append(timer)
+        self.size += 1
+        return timer
+
+    def advance(self):
+        """Jeden krok kruhu - spustí časovače v další přihrádce, kterým došly otáčky"""
+        self.position = (self.position + 1) % len(self.slots)
+        slot = self.slots[self.position]
+        if not slot:
+            return
+        due, waiting = [], []
+        for timer in slot:
+            if timer.cancelled:
+                continue
+            if timer.rounds:
+                timer.rounds -= 1
+                waiting.append(timer)
+            else:
+                due.append(timer)
+        self.slots[self.position] = waiting
+        self.size -= len(slot) - len(waiting)
+        for timer in due:
+            # Callbacks may schedule new timers, including into this slot
+            if timer.cancelled:
+                continue
+            self.fired += 1
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                logger.exception("Časovač %s selhal", getattr(timer.callback, "__name__", timer.callback))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            # Catch up if the loop was busy for longer than a tick
+            while next_tick <= loop.time():
+                self.advance()
+                next_tick += self.tick
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def stats(self) -> Dict:
+        return {"pending": self.size, "fired": self.fired}
@@ -0,0 +1,84 @@
+"""
+Statické soubory při prvním a opakovaném načtení stránky - počet požadavků a přenesené bajty
+přes prostý StaticFiles (původní stav) a přes sestavené soubory (otisky, gzip/brotli, atlas robotů)
+
+Scénář: stránka se styly a skripty, pozadí, aréna, version.json, ikony --robots robotů a zvuky.
+Opakované načtení: bez cache hlaviček prohlížeč každý soubor revaliduje, soubory s otiskem vůbec nežádá.
+
+Spuštění: python benchmarks/bench_assets.py [--robots N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+from starlette.testclient import TestClient
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from assets import AssetFiles, AssetPipeline  # noqa: E402
+
+PAGE = [
+    "favicon.ico", "css/style.css", "js/app.js", "js/audio.js", "js/arena.js",
+    "images/pozadi.png", "arena/arena.svg", "version.json",
+    "sfx/weapons/hit_01.mp3", "sfx/traps/trap_hit_01.mp3", "sfx/explosion/robot_explode_01.mp3",
+]
+ACCEPT = {"accept-encoding": "gzip, deflate, br"}
+
+def load(client: TestClient, urls, cached=None):
+    """Stáhne URL; s cached (url -> odpověď) jako opakovaná návštěva - neměnné soubory přeskočí, ostatní revaliduje"""
+    requests = wire = 0
+    responses = {}
+    for url in urls:
+        headers = dict(ACCEPT)
+        previous = cached.get(url) if cached else None
+        if previous is not None:
+            if "immutable" in previous.headers.get("cache-control", ""):
+                continue
+            headers["if-none-match"] = previous.headers["etag"]
+        response = client.get(url, headers=headers)
+        assert response.status_code in (200, 304), (url, response.status_code)
+        requests += 1
+        # Body size on the wire (compressed if the server sent an encoding)
+        wire += int(response.headers.get("content-length", 0))
+        responses[url] = response
+    return requests, wire, responses
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--robots", type=int, default=8, help="different robots shown (picker, opponents)")
+    args = parser.parse_args()
+    source = os.path.join(APP_DIR, "static")
+
+    with tempfile.TemporaryDirectory() as target:
+        pipeline = AssetPipeline(source=source, target=target)
+        start = time.perf_counter()
+        pipeline.build()
+        cold_build = time.perf_counter() - start
+        start = time.perf_counter()
+        pipeline.build()
+        warm_build = time.perf_counter() - start
+
+        robots = sorted(pipeline.sprites["cells"])[:args.robots] if pipeline.sprites else []
+        plain_urls = ["/static/" + path for path in PAGE] + [f"/static/images/robots/{robot}.png" for robot in robots]
+        built_urls = [pipeline.url(path) for path in PAGE]
+        if pipeline.sprites:
+            built_urls.append("/static/" + pipeline.sprites["url"])
+
+        plain = TestClient(Starlette(routes=[Mount("/static", StaticFiles(directory=source))]))
+        built = TestClient(Starlette(routes=[Mount("/static", AssetFiles(pipeline))]))
+
+        print(f"build: first {cold_build:.2f} s, unchanged sources {warm_build * 1000:.0f} ms")
+        print(f"{'':>10} {'cold req':>9} {'cold KB':>9} {'reload req':>11} {'reload KB':>10}")
+        for name, client, urls in (("plain", plain, plain_urls), ("built", built, built_urls)):
+            cold_requests, cold_wire, responses = load(client, urls)
+            warm_requests, warm_wire, _ = load(client, urls, responses)
+            print(f"{name:>10} {cold_requests:>9} {cold_wire / 1024:>9.0f} {warm_requests:>11} {warm_wire / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
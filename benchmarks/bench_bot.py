@@ -0,0 +1,100 @@
+"""
+AI soupeř - latence rozhodnutí (celý tah) pro každou obtížnost, samotné hledání i cesta přes
+ProcessPoolExecutor, a volitelně úspěšnost proti skriptované strategii
+
+Spuštění: python benchmarks/bench_bot.py [--positions N] [--matches N]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import bot  # noqa: E402
+import engine  # noqa: E402
+from bench_engine import MAX_TURNS, new_match  # noqa: E402
+from policy import greedy_action  # noqa: E402
+
+def sample_positions(count: int):
+    """Stavy na začátku tahu z rozehraných skriptovaných zápasů"""
+    positions = []
+    rng = random.Random(3)
+    seed = 0
+    while len(positions) < count:
+        state = new_match(seed, "r1", "w1", "r1", "w1")
+        seed += 1
+        stop_at = rng.randint(1, 12)
+        while state.status == "playing" and state.turn_number < stop_at:
+            engine.apply(state, greedy_action(state))
+        if state.status == "playing":
+            positions.append(engine.clone_state(state))
+    return positions
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def bench_search(positions, level: str):
+    """Hledání v tomto procesu - čas a počet rolloutů na rozhodnutí"""
+    budget = bot.LEVELS[level]
+    timings, rollouts = [], []
+    for i, state in enumerate(positions):
+        start = time.perf_counter()
+        _, iterations = bot.search(state, state.turn_player_id, budget, random.Random(i))
+        timings.append(time.perf_counter() - start)
+        rollouts.append(iterations)
+    return timings, sum(rollouts) / len(rollouts)
+
+async def bench_pool(positions, level: str, workers: int):
+    """Rozhodnutí přes BotPool včetně serializace a předání mezi procesy"""
+    pool = bot.BotPool(workers)
+    pool.start()
+    await pool.choose_turn(positions[0], positions[0].turn_player_id, "easy")  # Workers started and warm
+    timings = []
+    for state in positions:
+        start = time.perf_counter()
+        await pool.choose_turn(state, state.turn_player_id, level)
+        timings.append(time.perf_counter() - start)
+    pool.stop()
+    return timings
+
+def play_vs_greedy(level: str, matches: int) -> int:
+    """Výhry bota proti skriptované strategii (stejný robot i zbraň, střídá se první tah)"""
+    wins = 0
+    for seed in range(matches):
+        state = new_match(seed, "r1", "w1", "r1", "w1")
+        bot_id = state.players[seed % 2].player_id
+        rng = random.Random(seed)
+        while state.status == "playing" and state.turn_number < MAX_TURNS:
+            if state.turn_player_id == bot_id:
+                plan, _ = bot.search(state, bot_id, bot.LEVELS[level], rng)
+                engine.apply_turn(state, plan)
+            else:
+                engine.apply(state, greedy_action(state))
+        wins += state.winner_id == bot_id
+    return wins
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--matches", type=int, default=0, help="matches per level against the scripted policy")
+    args = parser.parse_args()
+
+    positions = sample_positions(args.positions)
+    print(f"{'level':<8} {'rollouts':>9} {'search p50 ms':>14} {'p99 ms':>8} {'pool p50 ms':>12} {'p99 ms':>8}"
+          + (f" {'wins':>6}" if args.matches else ""))
+    for level in bot.LEVELS:
+        timings, rollouts = bench_search(positions, level)
+        pool_timings = asyncio.run(bench_pool(positions, level, args.workers))
+        line = (f"{level:<8} {rollouts:>9.0f} {percentile(timings, 0.5) * 1e3:>14.1f} {percentile(timings, 0.99) * 1e3:>8.1f}"
+                f" {percentile(pool_timings, 0.5) * 1e3:>12.1f} {percentile(pool_timings, 0.99) * 1e3:>8.1f}")
+        if args.matches:
+            line += f" {play_vs_greedy(level, args.matches):>3}/{args.matches}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
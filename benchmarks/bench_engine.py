@@ -0,0 +1,74 @@
+"""
+Mikrobenchmarky herního enginu - akce za sekundu, simulace celých zápasů a cena zpracování pastí
+
+Spuštění: python benchmarks/bench_engine.py [--matches N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import engine  # noqa: E402
+from policy import greedy_action  # noqa: E402
+
+MAX_TURNS = 400
+
+def new_match(seed: int, robot_a: str = "r1", weapon_a: str = "w1", robot_b: str = "r2", weapon_b: str = "w2") -> engine.GameState:
+    state = engine.GameState()
+    state.rng_seed = seed
+    state.players.append(engine.new_player("a", "a", robot_a, weapon_a))
+    state.players.append(engine.new_player("b", "b", robot_b, weapon_b))
+    engine.start_game(state)
+    return state
+
+def bench_actions(count: int) -> float:
+    """Tahy tam a zpět v jedné hře (validace + pohyb), AP se průběžně doplňují"""
+    state = new_match(1)
+    player = state.players[0]
+    moves = [{"type": "move", "player_id": player.player_id, "to_x": x, "to_y": 8} for x in (2, 1)]
+    start = time.perf_counter()
+    for i in range(count):
+        state.ap_remaining = engine.AP_PER_TURN
+        engine.apply(state, moves[i & 1])
+    return count / (time.perf_counter() - start)
+
+def bench_matches(count: int):
+    """Celé zápasy se skriptovanou strategií"""
+    actions = 0
+    start = time.perf_counter()
+    for seed in range(count):
+        state = new_match(seed)
+        while state.status == "playing" and state.turn_number < MAX_TURNS:
+            engine.apply(state, greedy_action(state))
+            actions += 1
+    elapsed = time.perf_counter() - start
+    return count / elapsed, actions / elapsed
+
+def bench_traps(count: int) -> float:
+    """Samotné zpracování pastí (fáze aktivace, poškození a náhodného natahování)"""
+    state = new_match(1)
+    for player in state.players:
+        player.hp = 10 ** 9
+    start = time.perf_counter()
+    for _ in range(count):
+        state.turn_number += 1
+        engine.process_traps(state)
+    return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actions", type=int, default=200000)
+    parser.add_argument("--matches", type=int, default=2000)
+    parser.add_argument("--traps", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"actions/s           {bench_actions(args.actions):>12,.0f}")
+    matches_per_sec, match_actions_per_sec = bench_matches(args.matches)
+    print(f"matches/s           {matches_per_sec:>12,.0f}")
+    print(f"match actions/s     {match_actions_per_sec:>12,.0f}")
+    print(f"process_traps/s     {bench_traps(args.traps):>12,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Zátěžový test serveru - páry simulovaných klientů mluví skutečným protokolem /ws (join, select_loadout,
+set_ready, action_move/attack, end_turn, náhodné odpojení a reconnect s last_seq) a hrají celé zápasy
+proti lokálně spuštěnému uvicornu. Vypíše propustnost, latenci akce -> broadcast (p50/p95/p99) a RSS serveru.
+
+S --server-workers N běží server v režimu více workerů (cluster.py) a klienti se připojují na jejich porty
+střídavě jako za round-robin balancerem; přesměrování na worker, který vlastní místnost, následují.
+
+S --flooders N běží navíc N zlomyslných klientů, kteří v lobby bez čekání chrlí select_loadout - dopad na
+latenci poctivých zápasů s limity rychlosti a bez nich (--rate-limit-scale 0).
+
+Server běží s produkčními limity rychlosti. Skriptovaní hráči hrají rychlostí stroje, takže část jejich zpráv
+limity odmítnou a započítají se do errors; volnější limity jsou jen na vyžádání (např. --rate-limit-scale 10).
+
+Spuštění: python benchmarks/bench_load.py [--matches N] [--duration S] [--workers N] [--server-workers N] [--flooders N] [--url ws://...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import websockets
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+class Stats:
+    def __init__(self):
+        self.latencies: List[float] = []  # Action sent -> game_delta broadcast received, seconds
+        self.actions = 0
+        self.matches = 0
+        self.reconnects = 0
+        self.redirects = 0
+        self.resyncs = 0
+        self.rejected = 0
+        self.errors = 0
+        self.flood_sent = 0  # Messages sent by flooders
+        self.flood_drops = 0  # Flooder connections closed by the server
+
+    def merge(self, other: Dict):
+        self.latencies.extend(other["latencies"])
+        for field in ("actions", "matches", "reconnects", "redirects", "resyncs", "rejected", "errors",
+                      "flood_sent", "flood_drops"):
+            setattr(self, field, getattr(self, field) + other[field])
+
+class Client:
+    """Jeden hráč - udržuje stav z game_state/game_delta jako webový klient a hraje, když je na tahu"""
+    def __init__(self, url: str, name: str, stats: Stats, rng: random.Random, disconnect: float, deadline: float):
+        self.url = url
+        self.name = name
+        self.stats = stats
+        self.rng = rng
+        self.disconnect = disconnect
+        self.deadline = deadline
+        self.ws = None
+        self.player_id: Optional[str] = None
+        self.token: Optional[str] = None
+        self.room_id: Optional[str] = None
+        self.seed: Optional[Dict] = None
+        self.state: Optional[Dict] = None
+        self.last_seq = 0
+        self.pending: Optional[float] = None  # Send time of the action waiting for its broadcast
+        self.ready_sent = False
+
+    async def send(self, message: Dict):
+        await self.ws.send(json.dumps(message))
+
+    async def join(self):
+        """Připojí se do první volné místnosti - server sám páruje klienty po dvou"""
+        self.ws = await websockets.connect(self.url, max_size=None)
+        await self.send({"type": "join", "name": self.name})
+        while self.room_id is None:
+            message = json.loads(await self.ws.recv())
+            if message["type"] == "error":
+                raise RuntimeError(message["code"])
+            if message["type"] == "redirect":
+                # Somebody waits for an opponent on another worker
+                await self.switch_worker(message["url"])
+                await self.send({"type": "join", "name": self.name, "redirected": True})
+                continue
+            await self.handle(message)
+
+    async def switch_worker(self, url: str):
+        self.stats.redirects += 1
+        await self.ws.close()
+        self.url = url
+        self.ws = await websockets.connect(self.url, max_size=None)
+
+    async def reconnect(self):
+        """Spadlé spojení - nový socket a návrat s tokenem a poslední viděnou verzí"""
+        await self.ws.close()
+        self.stats.reconnects += 1
+        self.pending = None
+        self.ws = await websockets.connect(self.url, max_size=None)
+        last_seq = self.last_seq if self.state and self.state.get("status") == "playing" else None
+        await self.send({"type": "reconnect", "token": self.token, "seed_etag": self.seed["etag"], "last_seq": last_seq})
+
+    async def run(self):
+        try:
+            while time.monotonic() < self.deadline:
+                try:
+                    raw = await asyncio.wait_for(self.ws.recv(), min(1.0, self.deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    # Quiet socket, e.g. a resumed reconnect with nothing missed - play on from the state we have
+                    await self.act()
+                    continue
+                await self.handle(json.loads(raw))
+        except websockets.ConnectionClosed:
+            self.stats.errors += 1
+        finally:
+            await self.ws.close()
+
+    async def handle(self, message: Dict):
+        msg_type = message["type"]
+        if msg_type == "join_ok":
+            self.player_id, self.token, self.room_id = message["player_id"], message["token"], message["room_id"]
+        elif msg_type == "reconnect_ok":
+            if not message.get("resumed"):
+                self.state = None
+        elif msg_type == "seed":
+            self.seed = message
+        elif msg_type == "lobby_state":
+            await self.on_lobby(message)
+        elif msg_type == "game_state":
+            self.state, self.last_seq = message, message["seq"]
+            await self.on_update()
+        elif msg_type == "game_delta":
+            if self.state is None or message["seq"] != self.last_seq + 1:
+                self.stats.resyncs += 1
+                await self.send({"type": "resync"})
+                return
+            self.last_seq = message["seq"]
+            self.apply_delta(message)
+            # Every action changes ap_remaining or the turn; deltas without "state" are someone's connected flag
+            if "state" in message:
+                await self.on_update()
+        elif msg_type in ("action_rejected", "turn_rejected"):
+            self.stats.rejected += 1
+            self.pending = None
+            await self.act(give_up=True)
+        elif msg_type == "error":
+            self.stats.errors += 1
+            self.pending = None
+        elif msg_type == "game_over":
+            if self.state and self.state["players"][0]["player_id"] == self.player_id:
+                self.stats.matches += 1  # Counted by one side only
+            self.ready_sent = False
+        elif msg_type == "ping":
+            await self.send({"type": "pong"})
+        elif msg_type == "redirect":
+            await self.switch_worker(message["url"])
+            await self.send({"type": "reconnect", "token": self.token, "seed_etag": self.seed["etag"]})
+
+    async def on_lobby(self, message: Dict):
+        if message["status"] == "playing" or self.ready_sent or len(message["players"]) < 2:
+            return
+        if time.monotonic() >= self.deadline:
+            return
+        robot = self.rng.choice(self.seed["robots"])["id"]
+        weapon = self.rng.choice(self.seed["weapons"])["id"]
+        await self.send({"type": "select_loadout", "robot_id": robot, "weapon_id": weapon})
+        await self.send({"type": "set_ready", "ready": True})
+        self.ready_sent = True
+
+    def apply_delta(self, delta: Dict):
+        self.state.update(delta.get("state", {}))
+        if "turn_options" in delta:
+            self.state["turn_options"] = delta["turn_options"]
+        for player_id, changes in delta.get("players", {}).items():
+            player = next((p for p in self.state["players"] if p["player_id"] == player_id), None)
+            if player is not None:
+                player.update(changes)
+
+    async def on_update(self):
+        if self.pending is not None:
+            self.stats.latencies.append(time.perf_counter() - self.pending)
+            self.pending = None
+        await self.act()
+
+    async def act(self, give_up: bool = False):
+        state = self.state
+        if (self.pending is not None or state is None or state["status"] != "playing"
+                or state["turn_player_id"] != self.player_id):
+            return
+        if self.disconnect and self.rng.random() < self.disconnect:
+            await self.reconnect()
+            return
+        options = state.get("turn_options") or {}
+        me = next(p for p in state["players"] if p["player_id"] == self.player_id)
+        enemy = next(p for p in state["players"] if p["player_id"] != self.player_id)
+        steps = [move for move in options.get("moves", ()) if move[2] == 1]  # One AP per step
+        if give_up:
+            action = {"type": "end_turn"}
+        elif options.get("attack_targets"):
+            action = {"type": "action_attack", "target_player_id": options["attack_targets"][0]}
+        elif steps and state["ap_remaining"] > 0:
+            # Head for the opponent so matches end instead of wandering
+            def distance(move):
+                return abs(move[0] - enemy["pos"]["x"]) + abs(move[1] - enemy["pos"]["y"])
+            x, y, _ = min(steps, key=lambda move: (distance(move), self.rng.random()))
+            if distance([x, y]) >= abs(me["pos"]["x"] - enemy["pos"]["x"]) + abs(me["pos"]["y"] - enemy["pos"]["y"]):
+                action = {"type": "end_turn"}
+            else:
+                action = {"type": "action_move", "to_x": x, "to_y": y}
+        else:
+            action = {"type": "end_turn"}
+        self.pending = time.perf_counter()
+        self.stats.actions += 1
+        await self.send(action)
+
+async def play(url: str, number: int, stats: Stats, disconnect: float, deadline: float):
+    client = Client(url, f"p{number}", stats, random.Random(number), disconnect, deadline)
+    try:
+        await client.join()
+    except (OSError, RuntimeError, websockets.WebSocketException):
+        stats.errors += 1
+        return
+    await client.run()
+
+async def run_pairs(urls: List[str], first: int, count: int, disconnect: float, duration: float) -> Stats:
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    # Two clients per match; the server fills each open room before creating the next one
+    await asyncio.gather(*(
+        play(urls[number % len(urls)], number, stats, disconnect, deadline)
+        for number in range(first * 2, (first + count) * 2)
+    ))
+    return stats
+
+def worker(urls: List[str], first: int, count: int, disconnect: float, duration: float) -> Dict:
+    """Jeden proces generátoru - vlastní event loop, aby klienti nebyli úzkým hrdlem"""
+    return vars(asyncio.run(run_pairs(urls, first, count, disconnect, duration)))
+
+async def flood(url: str, number: int, stats: Stats, deadline: float):
+    """Zlomyslný klient - v místnosti s botem posílá select_loadout bez čekání na odpovědi (každý rozešle
+    stav lobby a uloží snapshot žurnálu); když ho server odpojí, připojí se znovu"""
+    loadout = json.dumps({"type": "select_loadout", "robot_id": "r1", "weapon_id": "w1"})
+    while time.monotonic() < deadline:
+        try:
+            async with websockets.connect(url, max_size=None) as ws:
+                await ws.send(json.dumps({"type": "join", "name": f"flood{number}"}))
+                # The bot fills the room so real players are not paired with the flooder
+                await ws.send(json.dumps({"type": "add_bot"}))
+                # Replies are read and thrown away - the flooder must not be evicted as a slow reader
+                reader = asyncio.create_task(drain(ws))
+                try:
+                    while time.monotonic() < deadline:
+                        await ws.send(loadout)
+                        stats.flood_sent += 1
+                        await asyncio.sleep(0)
+                finally:
+                    reader.cancel()
+        except websockets.ConnectionClosed:
+            stats.flood_drops += 1
+        except OSError:
+            stats.errors += 1
+            await asyncio.sleep(0.1)
+
+async def drain(ws):
+    try:
+        async for _ in ws:
+            pass
+    except websockets.ConnectionClosed:
+        pass
+
+async def run_flooders(url: str, count: int, duration: float) -> Stats:
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(flood(url, number, stats, deadline) for number in range(count)))
+    return stats
+
+def flood_worker(url: str, count: int, duration: float) -> Dict:
+    """Zlomyslní klienti ve vlastním procesu - nezpomalují generátor poctivých zápasů"""
+    return vars(asyncio.run(run_flooders(url, count, duration)))
+
+def start_server(port: int, matches: int, workdir: str, server_workers: int = 1,
+                 rate_limit_scale: float = 1) -> subprocess.Popen:
+    env = dict(os.environ, JOURNAL_DIR=os.path.join(workdir, "journal"), REPLAY_DIR=os.path.join(workdir, "replays"),
+               MAX_ROOMS=str(max(matches * 2, 100)), BOT_WORKERS="0", LOG_LEVEL="WARNING",
+               RATE_LIMIT_SCALE=str(rate_limit_scale),
+               HOST="127.0.0.1", PORT=str(port), WORKERS=str(server_workers),
+               CLUSTER_BACKEND="sqlite:///" + os.path.join(workdir, "cluster.db"))
+    server = subprocess.Popen([sys.executable, "cluster.py", "--log-level", "warning"], cwd=APP_DIR, env=env)
+    for worker_port in range(port, port + server_workers):
+        for _ in range(100):
+            if server.poll() is not None:
+                raise RuntimeError(f"Server skončil s kódem {server.returncode} (port {worker_port} obsazený?)")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{worker_port}/health", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            server.kill()
+            raise RuntimeError("Server se nespustil")
+    return server
+
+def server_pids(server: subprocess.Popen, server_workers: int) -> List[int]:
+    """Proces serveru, s více workery jeho potomci (jeden worker nahradí spouštěč přímo uvicornem)"""
+    if server_workers == 1:
+        return [server.pid]
+    try:
+        with open(f"/proc/{server.pid}/task/{server.pid}/children") as f:
+            children = [int(pid) for pid in f.read().split()]
+    except OSError:
+        children = []
+    return children or [server.pid]
+
+def rss_mb(pids: List[int], field: str = "VmRSS") -> Optional[float]:
+    """Součet RSS procesů z /proc (jen Linux)"""
+    total = None
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith(field + ":"):
+                        total = (total or 0) + int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    return total
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else float("nan")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=200, help="souběžných dvojic klientů")
+    parser.add_argument("--duration", type=float, default=30, help="sekund hry")
+    parser.add_argument("--workers", type=int, default=2, help="procesů generátoru zátěže")
+    parser.add_argument("--server-workers", type=int, default=1, help="workerů serveru (cluster.py)")
+    parser.add_argument("--disconnect", type=float, default=0.01, help="pravděpodobnost odpojení a reconnectu před akcí")
+    parser.add_argument("--flooders", type=int, default=0, help="klientů zahlcujících svou lobby zprávami select_loadout")
+    parser.add_argument("--rate-limit-scale", type=float, default=1,
+                        help="RATE_LIMIT_SCALE serveru - 1 = produkční limity, vyšší je volnější, 0 = bez limitů")
+    parser.add_argument("--url", help="běžící server (ws://host:port/ws); jinak se spustí lokální")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    server = None
+    urls = [args.url]
+    if args.url is None:
+        server = start_server(args.port, args.matches, workdir.name, args.server_workers, args.rate_limit_scale)
+        urls = [f"ws://127.0.0.1:{port}/ws" for port in range(args.port, args.port + args.server_workers)]
+    pids = server_pids(server, args.server_workers) if server else []
+    rss_start = rss_mb(pids) if server else None
+
+    try:
+        stats = Stats()
+        started = time.perf_counter()
+        per_worker = -(-args.matches // args.workers)
+        with ProcessPoolExecutor(args.workers + (1 if args.flooders else 0)) as pool:
+            futures = [
+                pool.submit(worker, urls, first, min(per_worker, args.matches - first), args.disconnect, args.duration)
+                for first in range(0, args.matches, per_worker)
+            ]
+            if args.flooders:
+                futures.append(pool.submit(flood_worker, urls[0], args.flooders, args.duration))
+            for future in futures:
+                stats.merge(future.result())
+        elapsed = time.perf_counter() - started
+        rss_end = rss_mb(pids) if server else None
+        rss_peak = rss_mb(pids, "VmHWM") if server else None
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        workdir.cleanup()
+
+    latencies = stats.latencies
+    print(f"{args.matches} concurrent matches, {elapsed:.1f} s, {args.workers} generator processes, "
+          f"{len(urls)} server workers")
+    print(f"matches finished {stats.matches:>8} ({stats.matches / elapsed:.1f}/s)")
+    print(f"actions          {stats.actions:>8} ({stats.actions / elapsed:.0f}/s)")
+    print(f"latency ms       p50 {percentile(latencies, 0.5) * 1e3:.2f}  p95 {percentile(latencies, 0.95) * 1e3:.2f}"
+          f"  p99 {percentile(latencies, 0.99) * 1e3:.2f}")
+    print(f"reconnects {stats.reconnects}, redirects {stats.redirects}, resyncs {stats.resyncs}, "
+          f"rejected {stats.rejected}, errors {stats.errors}")
+    if args.flooders:
+        print(f"flooders {args.flooders}: {stats.flood_sent} messages ({stats.flood_sent / elapsed:.0f}/s), "
+              f"{stats.flood_drops} disconnected by the server")
+    if rss_start is not None:
+        print(f"server RSS MB    start {rss_start:.1f}  end {rss_end:.1f}  peak {rss_peak:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Matchmaking fronta - cena vložení/odebrání, doba jednoho kola párování a čekání na soupeře
+při desítkách tisíc hráčů ve frontě (simulovaný čas, ratingy s normálním rozdělením)
+
+Spuštění: python benchmarks/bench_matchmaking.py [--players N] [--rate N | --burst]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from matchmaking import Matchmaker  # noqa: E402
+
+def bench_queue_ops(players: int):
+    """Vložení a odebrání bez párování"""
+    matchmaker = Matchmaker()
+    rng = random.Random(1)
+    start = time.perf_counter()
+    tickets = [matchmaker.enqueue(str(i), int(rng.gauss(1000, 200)), 0.0) for i in range(players)]
+    enqueue_us = (time.perf_counter() - start) / players * 1e6
+    rng.shuffle(tickets)
+    start = time.perf_counter()
+    for ticket in tickets:
+        matchmaker.remove(ticket)
+    remove_us = (time.perf_counter() - start) / players * 1e6
+    return enqueue_us, remove_us
+
+def simulate(players: int, rate: float, leave_ratio: float = 0.05):
+    """Hráči přichází rate za sekundu (0 = všichni naráz); část z nich frontu opustí dřív, než je spárována"""
+    matchmaker = Matchmaker()
+    rng = random.Random(2)
+    now = 0.0
+    arrived = 0
+    waiting = []
+    tick_times = []
+    match_waits = []
+    peak = 0
+    while arrived < players or len(matchmaker):
+        now += matchmaker.interval
+        arrivals = int(rate * matchmaker.interval) if rate else players
+        for _ in range(min(arrivals, players - arrived)):
+            waiting.append(matchmaker.enqueue(str(arrived), int(rng.gauss(1000, 200)), now))
+            arrived += 1
+        for _ in range(int(len(waiting) * leave_ratio * matchmaker.interval / 10)):
+            matchmaker.remove(waiting[rng.randrange(len(waiting))])
+        peak = max(peak, len(matchmaker))
+        start = time.perf_counter()
+        pairs = matchmaker.tick(now, limit=players)
+        tick_times.append(time.perf_counter() - start)
+        for pair in pairs:
+            match_waits.extend(now - ticket.enqueued_at for ticket in pair)
+        if arrived >= players and len(matchmaker) < 2:
+            break
+    waits = sorted(match_waits)
+    tick_times.sort()
+    return {
+        "peak_queue": peak,
+        "matched": matchmaker.matched,
+        "tick_p50_ms": tick_times[len(tick_times) // 2] * 1e3,
+        "tick_max_ms": tick_times[-1] * 1e3,
+        "wait_p50_s": waits[len(waits) // 2],
+        "wait_p99_s": waits[int(len(waits) * 0.99)],
+        "wait_max_s": waits[-1]
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=50000)
+    parser.add_argument("--rate", type=float, default=2000, help="arrivals per second")
+    parser.add_argument("--burst", action="store_true", help="all players enqueue at once")
+    args = parser.parse_args()
+
+    enqueue_us, remove_us = bench_queue_ops(args.players)
+    print(f"enqueue: {enqueue_us:.2f} us/op, remove: {remove_us:.2f} us/op ({args.players} tickets)")
+    result = simulate(args.players, 0 if args.burst else args.rate)
+    print(f"peak queue: {result['peak_queue']}, matches: {result['matched']}")
+    print(f"tick p50: {result['tick_p50_ms']:.2f} ms, max: {result['tick_max_ms']:.2f} ms")
+    print(f"time to match p50: {result['wait_p50_s']:.1f} s, p99: {result['wait_p99_s']:.1f} s, "
+          f"max: {result['wait_max_s']:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Záznamy zápasů - velikost souboru na zápas, načtení záznamu (jeden průchod + checkpointy)
+a skok na náhodný tah dlouhého zápasu; stav po skoku se ověřuje proti živému zápasu
+
+Spuštění: python benchmarks/bench_replay.py [--matches N] [--seeks N] [--long]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import engine  # noqa: E402
+from bench_engine import MAX_TURNS, new_match  # noqa: E402
+from policy import greedy_action  # noqa: E402
+from replay import ReplayStore  # noqa: E402
+
+class MatchRoom:
+    """Jen to, co ReplayStore od místnosti potřebuje"""
+    def __init__(self, room_id: str, state: engine.GameState):
+        self.room_id = room_id
+        self.state = state
+
+async def record_match(store: ReplayStore, seed: int, long: bool = False):
+    """Odehraje zápas se záznamem; vrací id záznamu a stav na začátku každého tahu"""
+    room = MatchRoom(f"r{seed}", new_match(seed))
+    if long:
+        # Nobody dies - the match runs to MAX_TURNS
+        for player in room.state.players:
+            player.hp = 10 ** 9
+    store.start_match(room)
+    turn_states = {room.state.turn_number: engine.clone_state(room.state).to_dict()}
+    while room.state.status == "playing" and room.state.turn_number < MAX_TURNS:
+        action = greedy_action(room.state)
+        engine.apply(room.state, action)
+        store.record_action(room, action)
+        if action["type"] == "end_turn" and room.state.status == "playing":
+            turn_states[room.state.turn_number] = engine.clone_state(room.state).to_dict()
+    return await store.finish_match(room), turn_states
+
+async def run(matches: int, seeks: int, long: bool):
+    with tempfile.TemporaryDirectory() as directory:
+        store = ReplayStore(directory, cache_size=matches)
+        recorded = [await record_match(store, seed, long) for seed in range(matches)]
+        sizes = [os.path.getsize(store.path(match_id)) for match_id, _ in recorded]
+
+        start = time.perf_counter()
+        loaded = [store.load(match_id) for match_id, _ in recorded]
+        load_ms = (time.perf_counter() - start) / matches * 1e3
+
+        rng = random.Random(1)
+        timings = []
+        for _ in range(seeks):
+            replay, (_, turn_states) = rng.choice(list(zip(loaded, recorded)))
+            turn = rng.randint(replay.first_turn, replay.last_turn)
+            start = time.perf_counter()
+            state, _ = replay.state_at(turn)
+            timings.append(time.perf_counter() - start)
+            assert state.to_dict() == turn_states[turn], f"{replay.match_id} turn {turn} diverged"
+        timings.sort()
+
+    turns = sum(replay.last_turn for replay in loaded) / matches
+    print(f"matches: {matches}, avg turns: {turns:.0f}, avg file: {sum(sizes) / matches:.0f} B")
+    print(f"load + checkpoints: {load_ms:.2f} ms/replay")
+    print(f"seek p50: {timings[len(timings) // 2] * 1e3:.3f} ms, p99: {timings[int(len(timings) * 0.99)] * 1e3:.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=20)
+    parser.add_argument("--seeks", type=int, default=2000)
+    parser.add_argument("--long", action="store_true", help=f"matches of {MAX_TURNS} turns")
+    args = parser.parse_args()
+    asyncio.run(run(args.matches, args.seeks, args.long))
+
+if __name__ == "__main__":
+    main()
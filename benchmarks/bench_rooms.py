@@ -0,0 +1,105 @@
+"""
+Benchmark registru místností - paměť na místnost a latence zprávy při 1k/5k/10k aktivních místnostech,
+cena broadcastu pro hráče a doručení divákům při 0/100/500 divácích
+
+Spuštění: python benchmarks/bench_rooms.py [počty místností...]
+"""
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from engine import Player  # noqa: E402
+from fanout import Connection  # noqa: E402
+from rooms import RoomRegistry  # noqa: E402
+
+class FakeWebSocket:
+    """Náhrada WebSocketu - pouze počítá odeslané bajty"""
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def send_text(self, frame):
+        self.bytes_sent += len(frame)
+
+def make_player(name: str, layout) -> Player:
+    return Player(str(uuid.uuid4()), name, "r1", "w1", 700, layout.cell(1, 9), ready=True)
+
+def populate(registry: RoomRegistry, room_count: int):
+    tokens = []
+    for i in range(room_count):
+        room = registry.find_open_room()
+        for name in ("A%d" % i, "B%d" % i):
+            tokens.append(registry.add_player(room, make_player(name, registry.layout), Connection(FakeWebSocket())))
+    return tokens
+
+async def measure_memory(room_count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    registry = RoomRegistry(max_rooms=room_count)
+    populate(registry, room_count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / room_count
+
+async def measure_latency(room_count: int, messages: int = 20000):
+    registry = RoomRegistry(max_rooms=room_count)
+    tokens = populate(registry, room_count)
+    step = max(1, len(tokens) // messages)
+    samples = []
+    for i in range(messages):
+        token = tokens[(i * step) % len(tokens)]
+        start = time.perf_counter()
+        room, player_id = registry.resolve_token(token)
+        player = room.get_player(player_id)
+        player.cell = room.state.layout.cell(2, 8)
+        room.broadcast({"type": "game_state", **room.state.to_dict()})
+        samples.append(time.perf_counter() - start)
+        # Let the writer tasks drain the queues
+        await asyncio.sleep(0)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+async def measure_spectators(viewers: int, messages: int = 2000):
+    """Broadcast na cestě akce hráče (p50) a čas, než zprávu dostanou všichni diváci"""
+    registry = RoomRegistry(max_rooms=1)
+    populate(registry, 1)
+    room = next(iter(registry.rooms.values()))
+    lobby = {"type": "lobby_state", "players": []}
+    sockets = [FakeWebSocket() for _ in range(viewers)]
+    for ws in sockets:
+        room.spectator_feed().subscribe(Connection(ws), lobby, None)
+    await asyncio.sleep(0.01)
+    broadcast, delivery = [], []
+    for i in range(messages):
+        start = time.perf_counter()
+        room.broadcast({"type": "game_delta", "seq": i, "players": {"a": {"pos": {"x": i % 18, "y": 8}}}})
+        broadcast.append(time.perf_counter() - start)
+        # Feed task releases the frame, writer tasks drain the queues
+        for _ in range(3):
+            await asyncio.sleep(0)
+        delivery.append(time.perf_counter() - start)
+    broadcast.sort()
+    delivery.sort()
+    return broadcast[len(broadcast) // 2], delivery[len(delivery) // 2]
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 5000, 10000]
+    print(f"{'rooms':>8} {'bytes/room':>12} {'p50 us':>10} {'p99 us':>10}")
+    for count in counts:
+        per_room = asyncio.run(measure_memory(count))
+        p50, p99 = asyncio.run(measure_latency(count))
+        print(f"{count:>8} {per_room:>12.0f} {p50 * 1e6:>10.1f} {p99 * 1e6:>10.1f}")
+    print()
+    print(f"{'viewers':>8} {'broadcast us':>14} {'delivered us':>14}")
+    for viewers in (0, 100, 500):
+        broadcast, delivered = asyncio.run(measure_spectators(viewers))
+        print(f"{viewers:>8} {broadcast * 1e6:>14.1f} {delivered * 1e6:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Časovače - hashovaný kruh proti jednomu asyncio tasku se sleep na každý časovač:
+cena naplánování/zrušení, paměť a CPU na sekundu provozu při tisících místností a spojení
+
+Spuštění: python benchmarks/bench_timers.py [--timers N]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from timers import TimerWheel  # noqa: E402
+
+def noop(*args):
+    pass
+
+def bench_wheel(count: int, delays):
+    wheel = TimerWheel()
+    tracemalloc.start()
+    start = time.perf_counter()
+    timers = [wheel.schedule(delay, noop, i) for i, delay in enumerate(delays)]
+    schedule_us = (time.perf_counter() - start) / count * 1e6
+    memory = tracemalloc.get_traced_memory()[0] / count
+    tracemalloc.stop()
+
+    # A turn ends long before its deadline - typical timers are cancelled and rescheduled
+    start = time.perf_counter()
+    for timer in timers[::2]:
+        timer.cancel()
+    cancel_us = (time.perf_counter() - start) / (count // 2) * 1e6
+
+    # 60 s of ticks: sweeping, firing the rest
+    ticks = int(60 / wheel.tick)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        wheel.advance()
+    cpu_per_second = (time.perf_counter() - start) / 60
+    return schedule_us, cancel_us, memory, cpu_per_second, wheel.fired
+
+async def bench_tasks(count: int, delays):
+    """Baseline - jeden task se sleep na každý časovač"""
+    async def sleeper(delay):
+        await asyncio.sleep(delay)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(sleeper(delay)) for delay in delays]
+    await asyncio.sleep(0)  # Let every task reach its sleep
+    schedule_us = (time.perf_counter() - start) / count * 1e6
+    memory = tracemalloc.get_traced_memory()[0] / count
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for task in tasks[::2]:
+        task.cancel()
+    await asyncio.sleep(0)
+    cancel_us = (time.perf_counter() - start) / (count // 2) * 1e6
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return schedule_us, cancel_us, memory
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timers", type=int, default=30000, help="e.g. 10k rooms (turn deadline) + 20k sockets (heartbeat)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    delays = [rng.uniform(1, 60) for _ in range(args.timers)]
+    schedule_us, cancel_us, memory, cpu, fired = bench_wheel(args.timers, delays)
+    print(f"{'':<12} {'schedule us':>12} {'cancel us':>10} {'bytes/timer':>12}")
+    print(f"{'wheel':<12} {schedule_us:>12.2f} {cancel_us:>10.2f} {memory:>12.0f}")
+    schedule_us, cancel_us, memory = asyncio.run(bench_tasks(args.timers, delays))
+    print(f"{'task+sleep':<12} {schedule_us:>12.2f} {cancel_us:>10.2f} {memory:>12.0f}")
+    print(f"wheel: {cpu * 1e3:.3f} ms CPU per second of running, {fired} timers fired")
+
+if __name__ == "__main__":
+    main()
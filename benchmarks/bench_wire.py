@@ -0,0 +1,73 @@
+"""
+Porovnání kódování na drátě - JSON vs MessagePack (s kompaktními klíči i bez nich):
+bajty na zprávu a CPU na kódování/dekódování pro typický provoz game_state/game_delta
+
+Spuštění: python benchmarks/bench_wire.py [--matches N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import msgpack
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import codec  # noqa: E402
+import engine  # noqa: E402
+from bench_engine import MAX_TURNS, new_match  # noqa: E402
+from delta import StateTracker  # noqa: E402
+from policy import greedy_action  # noqa: E402
+
+FORMATS = {
+    "json": (lambda m: codec.encode(m, codec.JSON), json.loads),
+    "msgpack": (lambda m: codec.encode(m, codec.MSGPACK), codec.decode_msgpack),
+    "msgpack-raw": (msgpack.packb, msgpack.unpackb),  # Plain string keys, for reference
+}
+
+def collect_traffic(matches: int):
+    """Zprávy, které server rozešle během skriptovaných zápasů (plné snapshoty a delty)"""
+    full, deltas = [], []
+    for seed in range(matches):
+        state = new_match(seed)
+        tracker = StateTracker()
+        full.append(json.loads(json.dumps(tracker.full(state))))
+        while state.status == "playing" and state.turn_number < MAX_TURNS:
+            engine.apply(state, greedy_action(state))
+            message = tracker.delta(state)
+            if message is not None:
+                # Detach from live state, as a queued frame would be
+                deltas.append(json.loads(json.dumps(message)))
+    return {"game_state": full, "game_delta": deltas}
+
+def measure(messages, encode, decode, repeat: int):
+    frames = [encode(m) for m in messages]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            encode(message)
+    encode_us = (time.perf_counter() - start) / (repeat * len(messages)) * 1e6
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            decode(frame)
+    decode_us = (time.perf_counter() - start) / (repeat * len(messages)) * 1e6
+    size = sum(len(f.encode("utf-8") if isinstance(f, str) else f) for f in frames) / len(frames)
+    return size, encode_us, decode_us
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    traffic = collect_traffic(args.matches)
+    print(f"{'message':<12} {'format':<12} {'count':>7} {'bytes':>8} {'enc us':>8} {'dec us':>8}")
+    for kind, messages in traffic.items():
+        for name, (encode, decode) in FORMATS.items():
+            size, encode_us, decode_us = measure(messages, encode, decode, args.repeat)
+            print(f"{kind:<12} {name:<12} {len(messages):>7} {size:>8.0f} {encode_us:>8.2f} {decode_us:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Monte Carlo simulátor vyváženosti - matice výher přes všechny kombinace robot/zbraň
+
+Hraje dávky zápasů naráz nad NumPy poli (pozice, HP, stavy pastí) se skriptovanou
+strategií policy.greedy_action. Aréna, pasti, spawny a pravidla se čtou z enginu,
+takže simulace sleduje stejná pravidla jako živý server. Pasti používají vlastní
+RNG proud odvozený z --seed (statisticky shodný, ne bit po bitu jako random.Random
+v process_traps) - shodu s enginem ověří přepínač --verify.
+
+Vyžaduje NumPy (pip install numpy). Spuštění:
+    python tools/balance_sim.py --matches 100 --workers 8 --out balance.csv
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("balance_sim vyžaduje NumPy: pip install numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import engine  # noqa: E402
+from policy import greedy_action  # noqa: E402
+
+MAX_TURNS = 200
+TRAP_IDLE, TRAP_ARMING, TRAP_ACTIVE = 0, 1, 2
+# Neighbour scan order of policy.greedy_action (dx outer, dy inner)
+OFFSETS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int16)
+
+def loadouts():
+    """Všechny kombinace (robot, zbraň) v pořadí seed.json"""
+    return [(robot, weapon) for robot in engine.CATALOG.robots for weapon in engine.CATALOG.weapons]
+
+def arena_tables():
+    """Zkompiluje arénu z enginu do masek gridu: spawny, zóny pastí, startovní pozice"""
+    state = engine.GameState()
+    state.players = [engine.new_player("a", "a"), engine.new_player("b", "b")]
+    engine.start_game(state)
+    layout = state.layout
+    cols, rows = layout.cols, layout.rows
+    spawn = np.zeros((2, cols, rows), dtype=bool)
+    for index in range(2):
+        for x in range(cols):
+            for y in range(rows):
+                spawn[index, x, y] = layout.spawn_owner[layout.cell(x, y)] == index
+    traps = layout.traps
+    zones = np.zeros((len(traps), cols, rows), dtype=bool)
+    for i, trap in enumerate(traps):
+        for x, y in trap.zone:
+            zones[i, x, y] = True
+    return {
+        "cols": cols,
+        "rows": rows,
+        "spawn": spawn,
+        "start": np.array([layout.coords[p.cell] for p in state.players], dtype=np.int16),
+        "zones": zones,
+        "damage": np.array([t.damage for t in traps], dtype=np.float64),
+        "arm_chance": np.array([t.weight * 0.3 for t in traps]),
+        "min_active": np.array([t.min_active for t in traps], dtype=np.int16),
+        "max_active": np.array([t.max_active for t in traps], dtype=np.int16),
+    }
+
+def simulate(pair_a, pair_b, seed, arena):
+    """Odehraje dávku zápasů; vrací vítěze (0, 1, -1 = remíza) pro každý zápas"""
+    table = loadouts()
+    n = len(pair_a)
+    rng = np.random.default_rng(seed)
+    hp_max = np.array([r["hpMax"] for r, _ in table], dtype=np.float64)
+    ranges = np.array([engine.CATALOG.range_of(w["id"]) for _, w in table], dtype=np.int16)
+    damage = np.array([w["damage"] for _, w in table], dtype=np.float64)
+    loadout = np.stack([pair_a, pair_b])  # (2, n)
+
+    pos = np.repeat(arena["start"][:, None, :], n, axis=1).astype(np.int16)  # (2, n, xy)
+    hp = hp_max[loadout].copy()
+    rng_ = ranges[loadout]
+    dmg = damage[loadout]
+    trap_state = np.zeros((len(arena["damage"]), n), dtype=np.int8)
+    trap_left = np.zeros_like(trap_state, dtype=np.int16)
+    winner = np.full(n, -1, dtype=np.int8)
+    live = np.arange(n)  # original match index of every row still simulated
+    playing = np.ones(n, dtype=bool)
+    cols, rows = arena["cols"], arena["rows"]
+
+    for turn in range(1, MAX_TURNS + 1):
+        me, enemy = (turn + 1) % 2, turn % 2
+        acting = playing.copy()
+        for _ in range(engine.AP_PER_TURN):
+            if not acting.any():
+                break
+            d = pos[enemy] - pos[me]
+            dist = np.abs(d).sum(axis=1)
+            # Attack: cardinal direction within weapon range (is_valid_attack)
+            attack = acting & ((d[:, 0] == 0) | (d[:, 1] == 0)) & (dist > 0) & (dist <= rng_[me])
+            hp[enemy] = np.where(attack, np.maximum(0, hp[enemy] - dmg[me]), hp[enemy])
+            killed = attack & (hp[enemy] <= 0)
+            winner[live[killed]] = me
+            playing &= ~killed
+            acting &= ~killed
+            # Move: first strictly closer valid neighbour (is_valid_move), otherwise end turn
+            moving = acting & ~attack
+            cand = pos[me][:, None, :] + OFFSETS[None, :, :]  # (n, 9, xy)
+            valid = ((cand[..., 0] >= 0) & (cand[..., 0] < cols) & (cand[..., 1] >= 0) & (cand[..., 1] < rows)
+                     & ~np.all(cand == pos[me][:, None, :], axis=2) & ~np.all(cand == pos[enemy][:, None, :], axis=2))
+            cand_dist = np.abs(pos[enemy][:, None, :] - cand).sum(axis=2)
+            cand_dist = np.where(valid, cand_dist, np.iinfo(np.int16).max)
+            best = cand_dist.argmin(axis=1)
+            improves = moving & (cand_dist[np.arange(n), best] < dist)
+            pos[me] = np.where(improves[:, None], cand[np.arange(n), best], pos[me])
+            acting &= improves | attack
+            # Heal on spawn unless the enemy is within its own weapon range (heal_on_spawn)
+            x, y = pos[me][:, 0], pos[me][:, 1]
+            new_dist = np.abs(pos[enemy] - pos[me]).sum(axis=1)
+            heal = improves & arena["spawn"][me, x, y] & (new_dist > rng_[enemy])
+            hp[me] = np.where(heal, np.minimum(hp_max[loadout[me]], hp[me] + hp_max[loadout[me]] * 0.25), hp[me])
+
+        # End of turn: traps (process_traps)
+        for t in range(len(arena["damage"])):
+            arming = trap_state[t] == TRAP_ARMING
+            active = trap_state[t] == TRAP_ACTIVE
+            duration = rng.integers(arena["min_active"][t], arena["max_active"][t] + 1, size=n, dtype=np.int16)
+            for side in (0, 1):
+                x, y = pos[side][:, 0], pos[side][:, 1]
+                hit = playing & active & (hp[side] > 0) & arena["zones"][t, x, y]
+                hp[side] = np.where(hit, np.maximum(0, hp[side] - arena["damage"][t]), hp[side])
+                died = hit & (hp[side] <= 0) & (hp[1 - side] > 0)
+                winner[live[died]] = 1 - side
+                playing &= ~died
+            trap_left[t] = np.where(arming, duration, trap_left[t] - active)
+            trap_state[t] = np.where(arming, TRAP_ACTIVE, np.where(active & (trap_left[t] <= 0), TRAP_IDLE, trap_state[t]))
+            trap_left[t] = np.where(trap_state[t] == TRAP_IDLE, 0, trap_left[t])
+        arm = (trap_state == TRAP_IDLE) & (rng.random(trap_state.shape) < arena["arm_chance"][:, None])
+        trap_state[arm] = TRAP_ARMING
+
+        if not playing.any():
+            break
+        # Drop finished matches once they are the majority of the batch
+        if playing.sum() * 2 < n:
+            live, pos, hp, rng_, dmg, loadout = live[playing], pos[:, playing], hp[:, playing], rng_[:, playing], dmg[:, playing], loadout[:, playing]
+            trap_state, trap_left = trap_state[:, playing], trap_left[:, playing]
+            n = len(live)
+            playing = np.ones(n, dtype=bool)
+    return winner
+
+def run_shard(args):
+    """Jeden shard pro ProcessPoolExecutor - vrací počty výher a remíz na dvojici"""
+    pairs, matches, seed = args
+    arena = arena_tables()
+    pair_count = len(loadouts()) ** 2
+    pair_idx = np.repeat(pairs, matches)
+    side = len(loadouts())
+    winner = simulate(pair_idx // side, pair_idx % side, seed, arena)
+    wins0 = np.bincount(pair_idx[winner == 0], minlength=pair_count)
+    wins1 = np.bincount(pair_idx[winner == 1], minlength=pair_count)
+    draws = np.bincount(pair_idx[winner == -1], minlength=pair_count)
+    return wins0, wins1, draws
+
+def win_matrix(matches: int, workers: int, seed: int, shard_pairs: int = 512):
+    """Matice výher hráče na tahu jako první (řádek) proti soupeři (sloupec)"""
+    side = len(loadouts())
+    pairs = np.arange(side * side)
+    shards = [(pairs[i:i + shard_pairs], matches, seed + i) for i in range(0, len(pairs), shard_pairs)]
+    totals = [np.zeros(side * side, dtype=np.int64) for _ in range(3)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_shard, shards))
+    else:
+        results = [run_shard(shard) for shard in shards]
+    for result in results:
+        for total, part in zip(totals, result):
+            total += part
+    return [total.reshape(side, side) / matches for total in totals]
+
+def verify(pairs: int, matches: int, seed: int):
+    """Porovná vektorovou simulaci se skalárním enginem (engine.apply + greedy_action)"""
+    table = loadouts()
+    arena = arena_tables()
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for a, b in rng.integers(0, len(table), size=(pairs, 2)):
+        (robot_a, weapon_a), (robot_b, weapon_b) = table[a], table[b]
+        scalar_wins = 0
+        for match in range(matches):
+            state = engine.GameState()
+            state.rng_seed = seed * 100000 + match
+            state.players = [engine.new_player("a", "a", robot_a["id"], weapon_a["id"]),
+                             engine.new_player("b", "b", robot_b["id"], weapon_b["id"])]
+            engine.start_game(state)
+            while state.status == "playing" and state.turn_number <= MAX_TURNS:
+                engine.apply(state, greedy_action(state))
+            scalar_wins += state.winner_id == "a"
+        winner = simulate(np.full(matches, a), np.full(matches, b), seed, arena)
+        scalar, vector = scalar_wins / matches, float((winner == 0).mean())
+        worst = max(worst, abs(scalar - vector))
+        print(f"{robot_a['id']}/{weapon_a['id']} vs {robot_b['id']}/{weapon_b['id']}: engine {scalar:.3f}  numpy {vector:.3f}")
+    print(f"max rozdíl {worst:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=100, help="zápasů na dvojici loadoutů")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="CSV s maticí výher (řádek = hráč na tahu jako první)")
+    parser.add_argument("--verify", type=int, metavar="PAIRS", help="ověřit proti enginu na PAIRS náhodných dvojicích")
+    args = parser.parse_args()
+
+    if args.verify:
+        verify(args.verify, args.matches, args.seed)
+        return
+
+    table = loadouts()
+    start = time.perf_counter()
+    wins0, wins1, draws = win_matrix(args.matches, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+    total = len(table) ** 2 * args.matches
+    print(f"{total:,} zápasů za {elapsed:.1f} s ({total / elapsed:,.0f} zápasů/s), remízy {draws.mean():.1%}")
+
+    # Seat-independent strength: win rate as first player and as second player
+    strength = (wins0.mean(axis=1) + wins1.mean(axis=0)) / 2
+    order = np.argsort(-strength)
+    names = [f"{robot['name']} + {weapon['name']}" for robot, weapon in table]
+    print("Nejsilnější:")
+    for i in order[:10]:
+        print(f"  {strength[i]:6.1%}  {names[i]}")
+    print("Nejslabší:")
+    for i in order[-10:]:
+        print(f"  {strength[i]:6.1%}  {names[i]}")
+
+    if args.out:
+        labels = [f"{robot['id']}/{weapon['id']}" for robot, weapon in table]
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write("loadout," + ",".join(labels) + "\n")
+            for label, row in zip(labels, wins0):
+                f.write(label + "," + ",".join(f"{v:.4f}" for v in row) + "\n")
+
+if __name__ == "__main__":
+    main()
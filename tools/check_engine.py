@@ -0,0 +1,110 @@
+"""
+Regresní kontrola enginu - odehraje sadu zápasů s pevnými seedy a porovná jejich průběh
+s uloženými otisky v tools/engine_golden.json
+
+Každý zápas hraje policy.greedy_action; část zápasů posílá celé tahy přes apply_turn.
+Otisk zahrnuje události všech akcí, proud zpráv StateTracker (plný stav + delty),
+konečný stav, turn_options a kódy odmítnutých akcí. Změna pravidel enginu je záměrná
+jen s --update (přepíše otisky aktuálním průběhem).
+
+Spuštění: python tools/check_engine.py [--matches N] [--update]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+import engine  # noqa: E402
+from delta import StateTracker  # noqa: E402
+from policy import greedy_action  # noqa: E402
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "engine_golden.json")
+MAX_TURNS = 300
+ROBOTS = ["r1", "r2", "r3", "r4"]
+WEAPONS = ["w1", "w2", "w5", "w9"]
+
+def new_match(seed: int) -> engine.GameState:
+    state = engine.GameState()
+    state.rng_seed = seed
+    state.players.append(engine.new_player("a", "a", ROBOTS[seed % 4], WEAPONS[seed % 4]))
+    state.players.append(engine.new_player("b", "b", ROBOTS[(seed // 4) % 4], WEAPONS[(seed // 3) % 4]))
+    engine.start_game(state)
+    return state
+
+def plan_turn(state: engine.GameState):
+    """Akce greedy strategie až po end_turn (nebo konec hry), spočtené na kopii stavu"""
+    work = engine.clone_state(state)
+    actions = []
+    while work.status == "playing":
+        action = greedy_action(work)
+        actions.append(action)
+        engine.apply(work, action)
+        if action["type"] == "end_turn":
+            break
+    return actions
+
+def play(seed: int):
+    """Průběh jednoho zápasu po záznamech; zprávy mohou sdílet data se stavem, serializují se hned"""
+    state = new_match(seed)
+    tracker = StateTracker()
+    yield tracker.delta(state)
+    # Rejected actions must leave the state untouched (the next delta is None)
+    idle = "b" if state.turn_player_id == "a" else "a"
+    for rejected in ([{"type": "move", "player_id": state.turn_player_id, "to_x": 99, "to_y": 0}],
+                     [{"type": "attack", "player_id": state.turn_player_id, "target_player_id": "x"}],
+                     [{"type": "end_turn", "player_id": idle}],
+                     [{"type": "end_turn", "player_id": state.turn_player_id}] * (engine.AP_PER_TURN + 2)):
+        try:
+            engine.apply_turn(state, rejected)
+        except engine.ActionError as e:
+            yield [e.code, e.index]
+        yield tracker.delta(state)
+    # Every third match plays whole turns at once
+    batched = seed % 3 == 0
+    while state.status == "playing" and state.turn_number < MAX_TURNS:
+        if batched:
+            _, events = engine.apply_turn(state, plan_turn(state))
+        else:
+            _, events = engine.apply(state, greedy_action(state))
+        yield events
+        yield tracker.delta(state)
+    yield state.to_dict()
+    yield engine.turn_options(state)
+
+def fingerprint(seed: int) -> str:
+    digest = hashlib.sha256()
+    for record in play(seed):
+        digest.update(json.dumps(record, sort_keys=True, separators=(",", ":"), default=str).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=120)
+    parser.add_argument("--update", action="store_true", help="overwrite the golden fingerprints")
+    args = parser.parse_args()
+
+    digests = [fingerprint(seed) for seed in range(args.matches)]
+    if args.update:
+        with open(GOLDEN, "w", encoding="utf-8") as f:
+            json.dump({"matches": args.matches, "max_turns": MAX_TURNS, "digests": digests}, f, indent=1)
+            f.write("\n")
+        print(f"{len(digests)} matches written to {GOLDEN}")
+        return
+
+    with open(GOLDEN, encoding="utf-8") as f:
+        golden = json.load(f)["digests"]
+    if len(golden) < args.matches:
+        sys.exit(f"golden file has only {len(golden)} matches")
+    differ = [seed for seed, digest in enumerate(digests) if digest != golden[seed]]
+    if differ:
+        print(f"{len(differ)} of {args.matches} matches differ, seeds: {', '.join(map(str, differ))}")
+        sys.exit(1)
+    print(f"{args.matches} matches identical")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Kontrola obnovy místností ze žurnálu - server v podprocesu odehraje část zápasu a připraví
+lobby, pak „spadne“ bez úklidu; druhý podproces se stejným JOURNAL_DIR místnosti obnoví.
+
+Ověřuje: poškozený poslední řádek logu se přeskočí, za snapshotem se přehraje konec logu
+(akce i submit_turn), obnovený stav odpovídá stavu před pádem, seq neklesne, hráč se vrátí
+přes token, nepřipojení hráči dostanou lhůtu na návrat a v lobby nezůstanou připravení.
+
+Spuštění: python tools/check_journal.py [--actions N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+SNAPSHOT_EVERY = 8
+
+def receive(ws, *types):
+    while True:
+        message = ws.receive_json()
+        if message["type"] in types:
+            return message
+
+def join(ws, name: str, robot_id: str, weapon_id: str) -> dict:
+    ws.send_json({"type": "join", "name": name})
+    joined = receive(ws, "join_ok")
+    ws.send_json({"type": "select_loadout", "robot_id": robot_id, "weapon_id": weapon_id})
+    ws.send_json({"type": "set_ready", "ready": True})
+    return joined
+
+def crash(directory: str, actions: int):
+    """Zápas A proti B a lobby s připraveným C; zapíše žurnál a skončí bez odpojení hráčů"""
+    import main
+    from fastapi.testclient import TestClient
+    from policy import greedy_action
+
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as a, client.websocket_connect("/ws") as b, \
+                client.websocket_connect("/ws") as c:
+            joined_a = join(a, "A", "r1", "w1")
+            joined_b = join(b, "B", "r2", "w2")
+            receive(a, "game_state")
+            receive(b, "game_state")
+            sockets = {joined_a["player_id"]: a, joined_b["player_id"]: b}
+            room = main.registry.get(joined_a["room_id"])
+            state = room.state
+
+            for i in range(actions):
+                if state.status != "playing":
+                    break
+                action = greedy_action(state)
+                ws = sockets[action.pop("player_id")]
+                if i % 5 == 4 and action["type"] != "end_turn":
+                    # Some records are whole turns
+                    ws.send_json({"type": "submit_turn", "actions": [action, {"type": "end_turn"}]})
+                    receive(ws, "turn_ok")
+                elif action["type"] == "end_turn":
+                    ws.send_json(action)
+                else:
+                    ws.send_json({**action, "type": "action_" + action["type"]})
+                # Both players get every delta - reading them keeps the state here in step with the server
+                receive(a, "game_delta")
+                receive(b, "game_delta")
+
+            joined_c = join(c, "C", "r3", "w3")
+            while not all(p["ready"] for p in receive(c, "lobby_state")["players"]):
+                pass
+
+            main.journal._write_batch(main.journal._take_batch())
+            expected = {
+                "room_id": room.room_id,
+                "state": state.to_dict(),
+                "seq": room.tracker.seq,
+                "token": joined_a["token"],
+                "lobby_id": joined_c["room_id"],
+            }
+            with open(os.path.join(directory, "expected.json"), "w", encoding="utf-8") as f:
+                json.dump(expected, f)
+            with open(main.journal.path(room.room_id), encoding="utf-8") as f:
+                records = sum(1 for _ in f)
+            # Torn line - the crash hit in the middle of a write
+            with open(main.journal.path(room.room_id), "a", encoding="utf-8") as f:
+                f.write('["a",{"type":"mo')
+            print(f"match at turn {state.turn_number}, seq {room.tracker.seq}, log: snapshot + {records - 1} records")
+            sys.stdout.flush()
+            os._exit(0)
+
+def restore(directory: str):
+    """Obnova po restartu; vrací seznam (popis, výsledek)"""
+    import main
+    from fastapi.testclient import TestClient
+
+    with open(os.path.join(directory, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    checks = []
+    with TestClient(main.app) as client:
+        room = main.registry.get(expected["room_id"])
+        checks.append(("match room restored despite the torn line", room is not None))
+        if room is None:
+            return checks
+        state = room.state.to_dict()
+        for player in expected["state"]["players"]:
+            player["connected"] = False
+        checks.append(("restored state equals the state before the crash", state == expected["state"]))
+        checks.append(("seq does not go back", room.tracker.seq >= expected["seq"]))
+        checks.append(("disconnected players get a grace period",
+                       all(p.player_id in main.grace_timers for p in room.state.players)))
+
+        lobby = main.registry.get(expected["lobby_id"])
+        checks.append(("lobby restored", lobby is not None))
+        if lobby is not None:
+            checks.append(("absent lobby player is not ready", not any(p.ready for p in lobby.state.players)))
+            checks.append(("absent lobby player gets a grace period",
+                           all(p.player_id in main.grace_timers for p in lobby.state.players)))
+
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "reconnect", "token": expected["token"]})
+            reply = receive(ws, "reconnect_ok", "error")
+            checks.append(("token from before the crash reconnects", reply["type"] == "reconnect_ok"))
+            if reply["type"] == "reconnect_ok":
+                full = receive(ws, "game_state")
+                checks.append(("reconnect gets the restored match", full["seq"] >= expected["seq"]))
+    return checks
+
+def run_phase(phase: str, directory: str, actions: int) -> subprocess.CompletedProcess:
+    env = dict(os.environ, JOURNAL_DIR=directory, JOURNAL_SNAPSHOT_EVERY=str(SNAPSHOT_EVERY),
+               REPLAY_DIR="", BOT_WORKERS="0", RATE_LIMIT_SCALE="0",
+               ASSET_BUILD_DIR=os.path.join(directory, "build"))
+    return subprocess.run([sys.executable, os.path.abspath(__file__), "--phase", phase, "--dir", directory,
+                           "--actions", str(actions)], env=env, capture_output=True, text=True)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actions", type=int, default=30, help="actions played before the crash")
+    parser.add_argument("--phase", choices=("crash", "restore"), help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        sys.path.insert(0, APP_DIR)
+        if args.phase == "crash":
+            crash(args.dir, args.actions)
+        else:
+            print(json.dumps(restore(args.dir)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        first = run_phase("crash", directory, args.actions)
+        if first.returncode != 0 or not os.path.exists(os.path.join(directory, "expected.json")):
+            sys.exit(f"crash phase failed:\n{first.stderr}")
+        print(first.stdout.strip())
+        second = run_phase("restore", directory, args.actions)
+        if second.returncode != 0:
+            sys.exit(f"restore phase failed:\n{second.stderr}")
+        checks = json.loads(second.stdout.strip().splitlines()[-1])
+
+    for description, ok in checks:
+        print(f"{'ok  ' if ok else 'FAIL'} {description}")
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Kontrola odvety proti AI soupeři - hráč odehraje zápas proti botovi až do konce, znovu
+potvrdí připravenost a v novém zápase musí oba roboti začínat s plným HP
+
+Bot zůstává po zápase připravený a svůj loadout znovu nevybírá, takže HP mu musí obnovit start hry.
+
+Spuštění: python tools/check_rematch.py [--level easy|normal|hard]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+MAX_MESSAGES = 5000
+
+def receive(ws, *types):
+    while True:
+        message = ws.receive_json()
+        if message["type"] in types:
+            return message
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--level", default="easy", choices=("easy", "normal", "hard"))
+    args = parser.parse_args()
+
+    build = tempfile.TemporaryDirectory()
+    os.environ.update(JOURNAL_DIR="", REPLAY_DIR="", RATE_LIMIT_SCALE="0", BOT_WORKERS="1",
+                      ASSET_BUILD_DIR=build.name)
+    sys.path.insert(0, APP_DIR)
+    import main as server
+    from engine import CATALOG
+    from fastapi.testclient import TestClient
+    from policy import greedy_action
+
+    with TestClient(server.app) as client, client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "join", "name": "Hráč"})
+        joined = receive(ws, "join_ok")
+        ws.send_json({"type": "select_loadout", "robot_id": "r1", "weapon_id": "w1"})
+        ws.send_json({"type": "add_bot", "level": args.level})
+        ws.send_json({"type": "set_ready", "ready": True})
+        message = receive(ws, "game_state")
+        room = server.registry.get(joined["room_id"])
+
+        # Play until game over - the bot moves on its own, the human plays greedy on the latest state only
+        for _ in range(MAX_MESSAGES):
+            state = room.state
+            if message["seq"] == room.tracker.seq and state.turn_player_id == joined["player_id"]:
+                action = greedy_action(state)
+                if action["type"] == "end_turn":
+                    ws.send_json({"type": "end_turn"})
+                else:
+                    ws.send_json({**action, "type": "action_" + action["type"]})
+            message = receive(ws, "game_delta", "game_over")
+            if message["type"] == "game_over":
+                break
+        else:
+            sys.exit("match did not finish")
+        hp = {p.name: p.hp for p in room.state.players}
+        print(f"game over, winner {message['winner_name']}, hp {hp}")
+
+        ws.send_json({"type": "set_ready", "ready": True})
+        rematch = receive(ws, "game_state")
+        ok = True
+        for player in rematch["players"]:
+            full = CATALOG.robot(player["robot_id"])["hpMax"]
+            print(f"{'ok  ' if player['hp'] == full else 'FAIL'} {player['name']} starts the rematch at {player['hp']}/{full} HP")
+            ok = ok and player["hp"] == full
+    build.cleanup()
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()